@@ -1,2 +1,13 @@
-from .parser import parse, ParseError
-from .arma_generator import generate
+from .parser import (parse, parse_file, iterparse, CaseInsensitiveClass, ConfigClass, IncrementalParser, InternTable,
+                     LazyClass, ParseError, backend)
+from .arma_generator import generate, generate_iter, dump
+from .cache import ParseCache
+from .rap_parser import parse_rap
+from .rap_generator import generate_rap
+from .inheritance import resolve, ResolvedConfig
+from .merge import merge, ConfigMerger
+from .load_order import resolve_load_order, read_required_addons, LoadOrder
+from .preprocessor import preprocess, Preprocessor
+from .tree import ConfigTree, ClassNode, ArrayNode
+from .positions import SourcePositions
+from .document import ConfigDocument
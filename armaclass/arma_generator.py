@@ -1,7 +1,15 @@
 import textwrap
 
+from .arma_writer import ArmaWriter
 from .generator import Generator
 
+# dump() writes the text once this many characters have been generated, generate_iter() yields chunks of this size
+DUMP_BUFFER_SIZE = 1 << 16
+
+# ArmaWriter writes what these methods would return without calling them when a generator overrides none of them
+_WRITER_METHODS = ('generate_item', 'generate_number', 'generate_bool', 'generate_float', 'generate_int',
+                   'generate_class', 'generate_array', 'generate_string', '_escape_string', '_indent', '_noindent')
+
 
 class ArmaGenerator(Generator):
     def generate_bool(self, name, data):
@@ -22,16 +30,39 @@ class ArmaGenerator(Generator):
 
         return '{}={};\n'.format(name, data)
 
-    def generate_class(self, name, data):
-        inner = [self.generate_item(key, val) for key, val in data.items()]
-        template = textwrap.dedent('''\
-            class {name}
-            {{
-            {contents}}};
-            ''')
+    def generate(self, data):
+        writer = self._writer()
+        writer.writeDocument(data)
+        return writer.getvalue()
 
-        retval = template.format(name=name, contents=self._indent(''.join(inner)))
-        return retval
+    def generate_class(self, name, data):
+        writer = self._writer()
+        writer.writeClass(name, data)
+        return writer.getvalue()
+
+    def generate_iter(self, data):
+        """Yield the text of generate(data) in chunks, without building it as a whole."""
+        writer = self._writer(buffer_size=DUMP_BUFFER_SIZE)
+        writer.startDocument(data)
+        while writer.writeSome():
+            yield writer.take()
+        text = writer.take()
+        if text:
+            yield text
+
+    def _uses_writer(self):
+        cls = type(self)
+        return cls is ArmaGenerator or all(getattr(cls, name) is getattr(ArmaGenerator, name)
+                                           for name in _WRITER_METHODS)
+
+    def _writer(self, fp=None, buffer_size=0):
+        # Classes and arrays that are generated by methods of a subclass are written by calling them and
+        # indented afterwards, like everything else when the subclass overrides any of the writer methods
+        cls = type(self)
+        own_item = cls.generate_item is Generator.generate_item
+        return ArmaWriter(self, fp, buffer_size, self._uses_writer(),
+                          own_item and cls.generate_class is ArmaGenerator.generate_class,
+                          own_item and cls.generate_array is ArmaGenerator.generate_array)
 
     def generate_array(self, name, data):
         inner = [self.generate_item(None, val) for val in data]
@@ -69,3 +100,15 @@ class ArmaGenerator(Generator):
 def generate(data, **kwargs):
     g = ArmaGenerator(**kwargs)
     return g.generate(data)
+
+
+def generate_iter(data, **kwargs):
+    g = ArmaGenerator(**kwargs)
+    return g.generate_iter(data)
+
+
+def dump(data, fp, **kwargs):
+    """Write generate(data, **kwargs) to the text file object fp, a few chunks at a time."""
+    writer = ArmaGenerator(**kwargs)._writer(fp, DUMP_BUFFER_SIZE)
+    writer.writeDocument(data)
+    writer.flush()
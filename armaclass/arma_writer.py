@@ -0,0 +1,242 @@
+import re
+import textwrap
+from collections.abc import Mapping
+
+try:
+    import cython
+except ModuleNotFoundError:
+    from .cython_stubs import cython
+
+if not cython.compiled:
+    from .cython_stubs import cython
+
+# Everything str.splitlines(), and so textwrap.indent(), breaks lines at
+_LINE_BREAK = re.compile('[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+# Values that are not written as arrays, even if they have a tolist() method like numpy floats
+_NOT_SCALARS = (bool, float, int, str, Mapping)
+
+
+def indent_text(text, prefix):
+    """Same as textwrap.indent(), without splitting text that has no line break before its end."""
+    if not prefix:
+        return text
+    if text and not text.isspace() and _LINE_BREAK.search(text, 0, len(text) - 1) is None:
+        return prefix + text
+    return textwrap.indent(text, prefix)
+
+
+@cython.cclass
+class ArmaWriter:
+    """Write the same text as the methods of an ArmaGenerator, into a list of pieces joined at the end.
+
+    Classes are written one entry at a time, each line with the prefix of its depth, which is only built once
+    per depth. With direct set, values of the built-in types are written directly. Anything else is passed to
+    the generator and indented afterwards. Names and strings that are not printable (line breaks...) are
+    handled by the generator too, so that they are indented the way textwrap.indent() does.
+    When the generator overrides some of its methods, direct is not set and the values go through
+    generate_item(), except for the classes when own_classes is set and the arrays when own_arrays is set.
+
+    When fp is given, the pieces are written to it every time they add up to buffer_size characters.
+    Otherwise writeSome() can be used to get the text in chunks of about buffer_size characters.
+    """
+    generator: object
+    direct: cython.bint
+    own_classes: cython.bint
+    own_arrays: cython.bint
+    unit: str
+    prefixes: list
+    pieces: list
+    size: cython.Py_ssize_t
+    fp: object
+    buffer_size: cython.Py_ssize_t
+    # Iterators over the entries of the classes being written, innermost last, and the depth of its entries
+    stack: list
+    depth: cython.Py_ssize_t
+    # Top-level entries of a document are separated with empty lines
+    document: cython.bint
+    first: cython.bint
+
+    def __init__(self, generator, fp=None, buffer_size=0, direct=True, own_classes=True, own_arrays=True):
+        self.generator = generator
+        self.direct = direct
+        self.own_classes = own_classes
+        self.own_arrays = own_arrays
+        self.unit = generator.indent_character * generator.indent_value
+        self.prefixes = ['']
+        self.pieces = []
+        self.size = 0
+        self.fp = fp
+        self.buffer_size = buffer_size
+        self.stack = []
+        self.depth = 0
+        self.document = False
+        self.first = True
+
+    def getvalue(self):
+        return ''.join(self.pieces)
+
+    def take(self):
+        """Return the text written since the last call and forget it."""
+        text = ''.join(self.pieces)
+        self.pieces.clear()
+        self.size = 0
+        return text
+
+    def flush(self):
+        if self.pieces:
+            self.fp.write(self.take())
+
+    def startDocument(self, data):
+        # Like Generator.generate(): entries separated with empty lines
+        self.stack = [iter(data.items())]
+        self.depth = 0
+        self.document = True
+        self.first = True
+
+    def startClass(self, name, data):
+        self.stack = []
+        self.document = False
+        self.openClass(name, data, 0)
+
+    def writeSome(self):
+        """Write entries until buffer_size characters are pending. Return False once everything is written."""
+        return self.writeEntries(True)
+
+    def writeDocument(self, data):
+        self.startDocument(data)
+        self.writeEntries(False)
+
+    def writeClass(self, name, data):
+        self.startClass(name, data)
+        self.writeEntries(False)
+
+    @cython.cfunc
+    def writeEntries(self, chunked: cython.bint) -> cython.bint:
+        while self.stack:
+            entry = next(self.stack[len(self.stack) - 1], None)
+            if entry is None:
+                self.stack.pop()
+                if self.stack or not self.document:
+                    self.depth -= 1
+                    self.write(self.prefix(self.depth) + '};\n')
+            else:
+                if self.document and len(self.stack) == 1:
+                    if not self.first:
+                        self.write('\n')
+                    self.first = False
+                name, value = entry
+                self.writeEntry(name, value, self.depth)
+
+            if chunked and self.size >= self.buffer_size:
+                return True
+        return False
+
+    @cython.cfunc
+    def write(self, text: str) -> cython.void:
+        self.pieces.append(text)
+        self.size += len(text)
+        if self.fp is not None and self.size >= self.buffer_size:
+            self.flush()
+
+    @cython.cfunc
+    def prefix(self, depth: cython.Py_ssize_t) -> str:
+        while len(self.prefixes) <= depth:
+            self.prefixes.append(self.prefixes[len(self.prefixes) - 1] + self.unit)
+        return self.prefixes[depth]
+
+    @cython.cfunc
+    def writeEntry(self, name, value, depth: cython.Py_ssize_t) -> cython.void:
+        prefix: str = self.prefix(depth)
+        value_type = type(value)
+
+        if not self.direct:
+            if self.own_classes and isinstance(value, Mapping):
+                self.openClass(name, value, depth)
+            elif self.own_arrays and (value_type is list or value_type is tuple):
+                self.writeArray(name, self.generatedContents(value), depth)
+            elif self.own_arrays and hasattr(value, 'tolist') and not isinstance(value, _NOT_SCALARS):
+                self.writeArray(name, self.generatedContents(value.tolist()), depth)
+            else:
+                self.writeOther(name, value, prefix)
+        elif type(name) is not str or not name.isprintable():
+            self.writeOther(name, value, prefix)
+        elif value_type is str:
+            if value.isprintable():
+                escaped: str = value.replace('"', '""')
+                self.write(f'{prefix}{name}="{escaped}";\n')
+            else:
+                self.writeOther(name, value, prefix)
+        elif value_type is int:
+            self.write(f'{prefix}{name}={value};\n')
+        elif value_type is float:
+            self.write(f'{prefix}{name}={self.formatFloat(value)};\n')
+        elif value_type is bool:
+            self.write(f'{prefix}{name}={"true" if value else "false"};\n')
+        elif value_type is list or value_type is tuple:
+            self.writeArray(name, self.arrayContents(value), depth)
+        elif isinstance(value, Mapping):  # dicts, LazyClass, ClassNode...
+            self.openClass(name, value, depth)
+        elif hasattr(value, 'tolist') and not isinstance(value, _NOT_SCALARS):  # array.array or numpy arrays
+            self.writeArray(name, self.arrayContents(value.tolist()), depth)
+        else:
+            self.writeOther(name, value, prefix)
+
+    @cython.cfunc
+    def writeOther(self, name, value, prefix: str) -> cython.void:
+        self.write(indent_text(self.generator.generate_item(name, value), prefix))
+
+    @cython.cfunc
+    def openClass(self, name, data, depth: cython.Py_ssize_t) -> cython.void:
+        # Writes the header of the class, its entries are written next
+        prefix: str = self.prefix(depth)
+        base = getattr(data, 'base', None)
+        self.write(indent_text(f'class {name}{": " + base if base else ""}\n', prefix))
+        self.write(prefix + '{\n')
+        self.stack.append(iter(data.items()))
+        self.depth = depth + 1
+
+    @cython.cfunc
+    def writeArray(self, name, contents: str, depth: cython.Py_ssize_t) -> cython.void:
+        prefix: str = self.prefix(depth)
+        inner: str = self.prefix(depth + 1)
+
+        if type(name) is str and name.isprintable():
+            self.write(f'{prefix}{name}[]=\n{prefix}{{\n')
+        else:
+            self.write(indent_text(f'{name}[]=\n', prefix) + prefix + '{\n')
+        if contents and contents.isprintable() and not contents.isspace():
+            self.write(inner + contents)
+        else:
+            self.write(indent_text(contents, inner))
+        self.write(f'\n{prefix}}};\n')
+
+    @cython.cfunc
+    def generatedContents(self, data) -> str:
+        return ', '.join([self.generator.generate_item(None, item) for item in data])
+
+    @cython.cfunc
+    def arrayContents(self, data) -> str:
+        return ', '.join([self.arrayItem(item) for item in data])
+
+    @cython.cfunc
+    def arrayItem(self, item) -> str:
+        item_type = type(item)
+        if item_type is str:
+            escaped: str = item.replace('"', '""')
+            return f'"{escaped}"'
+        elif item_type is int:
+            return f'{item}'
+        elif item_type is float:
+            return self.formatFloat(item)
+        elif item_type is bool:
+            return 'true' if item else 'false'
+        elif item_type is list or item_type is tuple:
+            return '{' + self.arrayContents(item) + '}'
+        return self.generator.generate_item(None, item)
+
+    @cython.cfunc
+    def formatFloat(self, value) -> str:
+        # Like Generator.generate_number(): integral values are written without decimals
+        if value == int(value):
+            return f'{int(value)}'
+        return f'{value}'
@@ -0,0 +1,218 @@
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+
+from .parser import parse_file
+
+# Bump whenever the parser output changes, so that stale entries are not used
+CACHE_VERSION = 2
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+# Most file signatures kept, the least recently used ones are removed first
+DEFAULT_MAX_STATS = 10000
+# Files are hashed in blocks of this size instead of being read at once
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _package_version():
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:  # Python 3.7
+        return None
+    try:
+        return version('armaclass')
+    except PackageNotFoundError:  # Running from a source tree
+        return None
+
+
+PACKAGE_VERSION = _package_version()
+
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        h.update(part)
+    return h.hexdigest()
+
+
+def _file_digest(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _options_key(translations, select):
+    # Everything that changes what parse_file returns for the same file contents
+    return repr((
+        CACHE_VERSION,
+        PACKAGE_VERSION,
+        sorted((translations or {}).items()),
+        None if select is None else sorted(select),
+    )).encode('utf8')
+
+
+class ParseCache:
+    """Keeps the results of parse_file() on disk, keyed by the hash of the file contents.
+
+    Unchanged files (same size, mtime and inode) are not even hashed again. Entries are written atomically
+    so the same directory can be shared by multiple processes, and the least recently used ones are removed
+    once the entries take more than max_size bytes. The signatures of the files are pruned at the same time,
+    keeping at most max_stats of them. Entries written by another version of armaclass or with
+    other parse options are never used.
+
+    Entries are pickles and loading a pickle can run arbitrary code, so the directory must not be writable
+    by anyone you do not trust. Directories created here are only accessible by their owner.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE, max_stats=DEFAULT_MAX_STATS):
+        self.directory = os.fspath(directory)
+        self.max_size = max_size
+        self.max_stats = max_stats
+        self.hits = 0
+        self.misses = 0
+        self._entries = os.path.join(self.directory, 'entries')
+        self._stats = os.path.join(self.directory, 'stats')
+        for directory in (self.directory, self._entries, self._stats):
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def parse_file(self, path, *, translations=None, select=None, workers=None):
+        path = os.path.abspath(path)
+        options = _options_key(translations, select)
+
+        stat = os.stat(path)
+        signature = '{} {} {}'.format(stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        stat_path = os.path.join(self._stats, _digest(os.fsencode(path)))
+
+        content_digest = self._read_stat(stat_path, signature)
+        if content_digest is None:
+            content_digest = _file_digest(path)
+            self._write(stat_path, '{} {}'.format(signature, content_digest).encode('ascii'))
+
+        entry_path = os.path.join(self._entries, _digest(content_digest.encode('ascii'), options) + '.pickle')
+        try:
+            result = self._load(entry_path)
+        except Exception:  # Missing, truncated or corrupted entry
+            pass
+        else:
+            self.hits += 1
+            self._touch(entry_path)
+            self._touch(stat_path)  # After the entry, so that it is not pruned before it
+            return result
+
+        self.misses += 1
+        result = parse_file(path, translations=translations, select=select, workers=workers)
+
+        self._write(entry_path, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        self._touch(stat_path)
+        self._evict()
+        return result
+
+    def size(self):
+        """Return the total size of the cached entries, in bytes."""
+        return sum(entry.stat().st_size for entry in self._scan())
+
+    def clear(self):
+        for directory in (self._entries, self._stats):
+            for entry in os.scandir(directory):
+                self._remove(entry.path)
+
+    def _scan(self):
+        return [entry for entry in os.scandir(self._entries) if entry.name.endswith('.pickle')]
+
+    @staticmethod
+    def _load(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        # Unpickling creates millions of containers that would otherwise trigger lots of useless collections
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return pickle.loads(data)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    @staticmethod
+    def _read_stat(stat_path, signature):
+        try:
+            with open(stat_path, 'rb') as f:
+                stored_signature, _, content_digest = f.read().decode('ascii').rpartition(' ')
+        except (OSError, UnicodeDecodeError):
+            return None
+
+        if stored_signature != signature or not content_digest:
+            return None
+        return content_digest
+
+    @staticmethod
+    def _write(path, data):
+        # Write to a temporary file first so that other processes never see a partially written file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            ParseCache._remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _touch(path):
+        # The modification time is used for LRU as access times are often not updated
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in self._scan():
+            try:
+                stat = entry.stat()
+            except OSError:  # Removed by another process in the meantime
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        oldest = None
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                oldest = mtime
+                break
+            self._remove(path)
+            total -= size
+
+        self._prune_stats(oldest)
+
+    def _prune_stats(self, oldest):
+        # Signatures not used since the oldest entry was are most likely of files whose entries are gone.
+        # Removing one that is still useful only means hashing the file again
+        stats = []
+        for entry in os.scandir(self._stats):
+            if entry.name.endswith('.tmp'):  # Being written by another process
+                continue
+            try:
+                stats.append((entry.stat().st_mtime_ns, entry.path))
+            except OSError:
+                continue
+
+        stats.sort(reverse=True)
+        for index, (mtime, path) in enumerate(stats):
+            if index >= self.max_stats or oldest is None or mtime < oldest:
+                self._remove(path)
@@ -1,19 +1,21 @@
 from . import Shadow as cython
 
-PyUnicode_4BYTE_KIND = None
+PyUnicode_1BYTE_KIND = 1
 
 def PyUnicode_KIND(data):
     return None
 
 
-def PyUnicode_FromKindAndData(kind, data, size):
-    return data[:size]
-
-
 def PyUnicode_READ(kind, data, pos):
+    if kind == PyUnicode_1BYTE_KIND:  # Raw bytes buffer
+        return chr(data[pos])
     return data[pos]
 
 
+def PyUnicode_DecodeUTF8(data, size, errors):
+    return bytes(data[:size]).decode('utf8', errors)
+
+
 def PyUnicode_DATA(data):
     return data
 
@@ -25,11 +27,11 @@ class vector:
     def push_back(self, elem):
         self._data.append(elem)
 
-    def data(self):
-        return ''.join(self._data)
-
     def size(self):
         return len(self._data)
 
+    def __iter__(self):
+        return iter(self._data)
+
     def reserve(self, x):
         pass
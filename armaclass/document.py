@@ -0,0 +1,218 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+from .arma_generator import ArmaGenerator
+from .parser import ConfigClass, ParseError, Parser, parse
+
+
+def _snapshot(data):
+    # Copies the classes and arrays but shares the values, which are immutable
+    if isinstance(data, Mapping):
+        base = getattr(data, 'base', None)
+        result = {} if base is None else ConfigClass(base=base)
+        for name, value in data.items():
+            result[name] = _snapshot(value)
+        return result
+    if isinstance(data, list):
+        return [_snapshot(value) for value in data]
+    return data
+
+
+_INDENTED_LINE = re.compile(r'^([ \t]+)\S', re.MULTILINE)
+
+
+def _same(old, new):
+    # 1 == 1.0 == True, but they are not written the same way
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, list):
+        return len(old) == len(new) and all(map(_same, old, new))
+    if isinstance(old, Mapping):
+        return getattr(old, 'base', None) == getattr(new, 'base', None) and list(old) == list(new) and \
+            all(_same(value, new[name]) for name, value in old.items())
+    return old == new
+
+
+class ConfigDocument:
+    """A parsed config that can be changed and written back with the rest of its source left untouched.
+
+    Change `data` like the result of parse(). generate() compares it with what was parsed and only rewrites
+    the entries that have changed: the comments, formatting, number spellings and string line breaks of
+    everything else are copied from the source as they are.
+    New entries are added at the end of their class and deleted ones are removed together with their line
+    when it contains nothing else.
+
+    apply_edit() changes the source itself, and only parses again the smallest class containing the edit.
+    """
+
+    def __init__(self, source, *, translations=None, indent=None, use_tabs=None):
+        if not isinstance(source, str):
+            source = bytes(source).decode('utf8', 'surrogateescape')
+
+        if indent is None:
+            # Indent like the first indented line of the source
+            match = _INDENTED_LINE.search(source)
+            unit = match.group(1) if match else '    '
+            indent = len(unit)
+            if use_tabs is None:
+                use_tabs = unit[0] == '\t'
+
+        self.source = source
+        self.translations = translations
+        self.data, self.positions = parse(source, translations=translations, positions=True)
+        self._original = _snapshot(self.data)
+        self._generator = ArmaGenerator(indent=indent, use_tabs=bool(use_tabs))
+        self._indent_unit = self._generator.indent_character * self._generator.indent_value
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, 'rb') as f:
+            return cls(f.read(), **kwargs)
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf8', errors='surrogateescape', newline='') as f:
+            f.write(self.generate())
+
+    def apply_edit(self, offset, removed, inserted):
+        """Replace removed characters at offset in the source with inserted, and update data accordingly.
+
+        Only the body of the smallest class that contains the edit and still ends where it did is parsed
+        again, the whole source is only parsed if there is no such class. Changes made to data in the parsed
+        again part are lost. On a ParseError, the document is left unchanged.
+        Returns the class that has been parsed again, or data after a full parse.
+        """
+        source = self.source[:offset] + inserted + self.source[offset + removed:]
+        delta = len(inserted) - removed
+        positions = self.positions
+
+        index = bisect_right(positions.starts, offset) - 1
+        while index != -1:
+            start, end = positions.starts[index], positions.ends[index]
+            if self.source.startswith('class', start) and self.source[start + 5:start + 6].isspace():
+                brace = self.source.find('{', start, end)
+                close = self.source.rfind('}', start, end)
+                if brace != -1 and brace < offset and offset + removed <= close:
+                    try:
+                        body = Parser().classBodyAt(source, start)
+                    except ParseError:  # The class doesn't end anymore
+                        body = None
+                    if body is not None and body[3] == close + delta + 1:
+                        return self._reparse_class(index, source, body, delta)
+            index = positions.parents[index]
+
+        return self._reparse_all(source)
+
+    def _reparse_all(self, source):
+        data, self.positions = parse(source, translations=self.translations, positions=True)
+        self.source = source
+        self.data = data
+        self._original = _snapshot(data)
+        return data
+
+    def _reparse_class(self, index, source, body, delta):
+        name, base, body_start, body_end = body
+        parsed, positions = parse(source[body_start + 1:body_end - 1], translations=self.translations,
+                                  positions=True)
+        value = parsed if base is None else ConfigClass(parsed, base=base)
+
+        path = []
+        parent = self.positions.parents[index]
+        while parent != -1:
+            path.append(self.positions.names[parent])
+            parent = self.positions.parents[parent]
+
+        data, original = self.data, self._original
+        for key in reversed(path):
+            data, original = data.get(key), original[key]
+            if not isinstance(data, Mapping):  # Removed from data in the meantime
+                return self._reparse_all(source)
+        data[name] = value
+        original[name] = _snapshot(value)
+
+        last = bisect_left(self.positions.starts, self.positions.ends[index], index + 1)
+        self.positions.splice(index + 1, last, positions, body_start + 1, delta, source)
+        self.source = source
+        return value
+
+    def changes(self):
+        """Return the (start, end, text) replacements that generate() applies to the source, in order."""
+        edits = []
+        self._diff_class(-1, self._original, self.data, edits)
+        edits.sort(key=lambda edit: edit[0])
+        return edits
+
+    def generate(self):
+        pieces = []
+        position = 0
+        for start, end, text in self.changes():
+            pieces.append(self.source[position:start])
+            pieces.append(text)
+            position = end
+        pieces.append(self.source[position:])
+        return ''.join(pieces)
+
+    def _line_indent(self, offset):
+        line_start = self.source.rfind('\n', 0, offset) + 1
+        prefix = self.source[line_start:offset]
+        return prefix[:len(prefix) - len(prefix.lstrip(' \t'))]
+
+    def _render(self, name, value, indent):
+        text = self._generator.generate_item(name, value).rstrip('\n')
+        return text.replace('\n', '\n' + indent)
+
+    def _diff_class(self, index, old, new, edits):
+        positions = self.positions
+        for name, old_value in old.items():
+            child = positions.child(index, name)
+            if name not in new:
+                edits.append(self._removal(child))
+                continue
+
+            new_value = new[name]
+            if isinstance(old_value, Mapping) and isinstance(new_value, Mapping) and \
+                    getattr(old_value, 'base', None) == getattr(new_value, 'base', None) and \
+                    self.source.find('{', positions.starts[child], positions.ends[child]) != -1:
+                self._diff_class(child, old_value, new_value, edits)
+            elif not _same(old_value, new_value):
+                start = positions.starts[child]
+                edits.append((start, positions.ends[child], self._render(name, new_value, self._line_indent(start))))
+
+        added = [name for name in new if name not in old]
+        if added:
+            edits.append(self._insertion(index, [(name, new[name]) for name in added]))
+
+    def _removal(self, child):
+        start, end = self.positions.starts[child], self.positions.ends[child]
+        line_start = self.source.rfind('\n', 0, start) + 1
+        line_end = self.source.find('\n', end)
+        if line_end == -1:
+            line_end = len(self.source)
+
+        # Take the whole line when the entry is alone on it
+        if not self.source[line_start:start].strip() and not self.source[end:line_end].strip():
+            return line_start, min(line_end + 1, len(self.source)), ''
+        return start, end, ''
+
+    def _insertion(self, index, entries):
+        if index == -1:
+            text = '\n'.join(self._render(name, value, '') for name, value in entries) + '\n'
+            end = len(self.source)
+            if end and not self.source.endswith('\n'):
+                text = '\n' + text
+            return end, end, text
+
+        start = self.positions.starts[index]
+        brace = self.source.rfind('}', start, self.positions.ends[index])
+        outer = self._line_indent(start)
+        inner = outer + self._indent_unit
+        lines = ''.join(inner + self._render(name, value, inner) + '\n' for name, value in entries)
+
+        line_start = self.source.rfind('\n', 0, brace) + 1
+        if not self.source[line_start:brace].strip():
+            return line_start, line_start, lines
+        # The closing brace shares its line with other entries
+        cut = brace
+        while self.source[cut - 1] in ' \t':
+            cut -= 1
+        return cut, brace, '\n' + lines + outer
@@ -1,4 +1,5 @@
 import textwrap
+from collections.abc import Mapping
 
 
 class Generator:
@@ -47,12 +48,14 @@ class Generator:
             text = self.generate_bool(name, data)
         elif issubclass(item_type, (float, int)):
             text = self.generate_number(name, data)
-        elif issubclass(item_type, dict):
+        elif issubclass(item_type, Mapping):
             text = self.generate_class(name, data)
         elif issubclass(item_type, (list, tuple)):
             text = self.generate_array(name, data)
         elif issubclass(item_type, str):
             text = self.generate_string(name, data)
+        elif hasattr(data, 'tolist'):  # array.array or numpy arrays
+            text = self.generate_array(name, data.tolist())
         else:
             raise Exception('Can\'t handle item type: {}'.format(item_type))
 
@@ -0,0 +1,145 @@
+from collections.abc import Mapping
+
+_MISSING = object()
+_RESOLVING = object()
+
+
+class ResolvedConfig(Mapping):
+    """Read-only view of a parsed class that also contains everything it inherits.
+
+    Names are case-insensitive, like in Arma. The base of `class Foo : Bar` is looked up among the classes
+    declared before Foo in the same class, then among the classes inherited by that class, and then the
+    same way in the enclosing classes. Bases and looked up values are memoized, so each inherited value
+    is only searched for once, whatever the number of classes inheriting it.
+    """
+    __slots__ = ('data', 'parent', 'name', '_base', '_keys', '_positions', '_values', '_all_keys')
+
+    def __init__(self, data, parent=None, name=None):
+        self.data = data
+        self.parent = parent
+        self.name = name
+        self._base = _MISSING
+        self._keys = None
+        self._positions = None
+        self._values = {}
+        self._all_keys = None
+
+    @property
+    def base(self):
+        """Name of the parent class, as written in the config."""
+        return getattr(self.data, 'base', None)
+
+    @property
+    def base_class(self):
+        """ResolvedConfig of the parent class, or None if there is none or it cannot be found."""
+        if self._base is _MISSING:
+            self._base = _RESOLVING
+            self._base = self._resolve_base()
+        elif self._base is _RESOLVING:  # Inheritance loop
+            return None
+        return self._base
+
+    def inherits_from(self, name):
+        """Return True if name is one of the classes this class inherits from, directly or not."""
+        name = name.lower()
+        base = self.base_class
+        while base is not None:
+            if base.name.lower() == name:
+                return True
+            base = base.base_class
+        return False
+
+    def _index(self):
+        if self._keys is None:
+            self._keys = {}
+            self._positions = {}
+            for position, key in enumerate(self.data):
+                folded = key.lower()
+                self._keys[folded] = key
+                self._positions[folded] = position
+        return self._keys
+
+    def _resolve_base(self):
+        base = self.base
+        if not base:
+            return None
+
+        folded = base.lower()
+        scope = self.parent
+        entry = self.name.lower()
+        while scope is not None:
+            # A class declared before, in the same scope
+            keys = scope._index()
+            if folded in keys and scope._positions[folded] < scope._positions[entry]:
+                candidate = scope._lookup(folded)
+                if isinstance(candidate, ResolvedConfig) and not candidate._inherits(self):
+                    return candidate
+
+            # A class that the scope inherits
+            scope_base = scope.base_class
+            if scope_base is not None:
+                candidate = scope_base._lookup(folded)
+                if isinstance(candidate, ResolvedConfig) and not candidate._inherits(self):
+                    return candidate
+
+            entry = scope.name.lower() if scope.name is not None else None
+            scope = scope.parent
+        return None
+
+    def _inherits(self, other):
+        view = self
+        while view is not None:
+            if view is other:
+                return True
+            view = view.base_class
+        return False
+
+    def _lookup(self, folded):
+        value = self._values.get(folded, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        key = self._index().get(folded)
+        if key is not None:
+            value = self.data[key]
+            if isinstance(value, Mapping):
+                value = ResolvedConfig(value, self, key)
+        else:
+            base = self.base_class
+            value = base._lookup(folded) if base is not None else _MISSING
+
+        self._values[folded] = value
+        return value
+
+    def __getitem__(self, key):
+        value = self._lookup(key.lower())
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self._lookup(key.lower()) is not _MISSING
+
+    def __iter__(self):
+        if self._all_keys is None:
+            keys = list(self.data)
+            base = self.base_class
+            if base is not None:
+                own = self._index()
+                keys.extend(key for key in base if key.lower() not in own)
+            self._all_keys = keys
+        return iter(self._all_keys)
+
+    def __len__(self):
+        if self._all_keys is None:
+            iter(self)
+        return len(self._all_keys)
+
+    def __repr__(self):
+        return '<{} {}{}>'.format(type(self).__name__, self.name or '(root)',
+                                  ' : ' + self.base if self.base else '')
+
+
+def resolve(data):
+    """Return a ResolvedConfig view of a parsed config."""
+    return ResolvedConfig(data)
@@ -0,0 +1,173 @@
+import heapq
+import os
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
+from .parser import parse_file
+
+
+def read_required_addons(path):
+    """Return {patch name: [required addons]} for the CfgPatches classes of a config file.
+
+    Only CfgPatches is parsed, the rest of the file is skipped.
+    """
+    config = parse_file(path, select=['CfgPatches/*'])
+    patches = {}
+    for key, value in config.items():
+        if key.lower() != 'cfgpatches' or not isinstance(value, Mapping):
+            continue
+
+        for name, patch in value.items():
+            if not isinstance(patch, Mapping):
+                continue
+
+            required = next((v for k, v in patch.items() if k.lower() == 'requiredaddons'), [])
+            if isinstance(required, str):
+                required = [required]
+            elif not isinstance(required, list):
+                required = []
+            patches[name] = [addon for addon in required if isinstance(addon, str)]
+    return patches
+
+
+class LoadOrder:
+    """Result of resolve_load_order().
+
+    order: the files, in the order in which they should be loaded
+    addons: {addon name: file declaring it}
+    requirements: {file: [addons it requires that are declared in other files]}
+    missing: {addon name: [required addons that no file declares]}
+    cycles: lists of files that require each other. Each cycle is loaded as a group, in the original order of
+            its files, once everything the group requires has been loaded.
+    """
+
+    def __init__(self, order, addons, requirements, missing, cycles):
+        self.order = order
+        self.addons = addons
+        self.requirements = requirements
+        self.missing = missing
+        self.cycles = cycles
+
+    def __repr__(self):
+        return '<{} {} files, {} missing, {} cycles>'.format(
+            type(self).__name__, len(self.order), len(self.missing), len(self.cycles))
+
+
+def _read_all(paths, workers):
+    if workers == 1 or len(paths) < 2:
+        return [read_required_addons(path) for path in paths]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_required_addons, paths, chunksize=max(1, len(paths) // 64)))
+
+
+def _strongly_connected(nodes, edges):
+    # Iterative Tarjan, returns every component, dependencies before their dependents, each one sorted
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    for root in nodes:
+        if root in index:
+            continue
+
+        work = [(root, iter(edges[root]))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(edges[child])))
+                    break
+                elif child in on_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+    return components
+
+
+def resolve_load_order(paths, *, workers=None):
+    """Read CfgPatches from every file and return a LoadOrder honouring requiredAddons.
+
+    Files are read in parallel by `workers` processes (by default, one per CPU). Addon names are matched
+    case-insensitively, and files that do not depend on each other keep their relative order.
+    """
+    paths = [os.fspath(path) for path in paths]
+    patches_per_file = _read_all(paths, workers)
+
+    addons = {}
+    providers = {}
+    for position, patches in enumerate(patches_per_file):
+        for name in patches:
+            providers.setdefault(name.lower(), position)
+            addons.setdefault(name, paths[position])
+
+    missing = {}
+    edges = [set() for _ in paths]
+    for position, patches in enumerate(patches_per_file):
+        for name, required in patches.items():
+            for addon in required:
+                provider = providers.get(addon.lower())
+                if provider is None:
+                    missing.setdefault(name, []).append(addon)
+                elif provider != position:
+                    edges[position].add(provider)
+
+    # Files that require each other are condensed into one group. Kahn's algorithm on the groups, always
+    # picking the one whose first file comes earliest
+    components = _strongly_connected(range(len(paths)), edges)
+    group = [0] * len(paths)
+    for number, component in enumerate(components):
+        for position in component:
+            group[position] = number
+
+    dependents = [set() for _ in components]
+    pending = [0] * len(components)
+    for position, required in enumerate(edges):
+        for provider in required:
+            if group[provider] != group[position] and group[position] not in dependents[group[provider]]:
+                dependents[group[provider]].add(group[position])
+                pending[group[position]] += 1
+
+    ready = [(component[0], number) for number, component in enumerate(components) if pending[number] == 0]
+    heapq.heapify(ready)
+    order = []
+    cycles = []
+    while ready:
+        _, number = heapq.heappop(ready)
+        order.extend(components[number])
+        if len(components[number]) > 1:
+            cycles.append([paths[position] for position in components[number]])
+        for dependent in dependents[number]:
+            pending[dependent] -= 1
+            if pending[dependent] == 0:
+                heapq.heappush(ready, (components[dependent][0], dependent))
+
+    requirements = {}
+    for position, patches in enumerate(patches_per_file):
+        own = {name.lower() for name in patches}
+        required = [addon for names in patches.values() for addon in names
+                    if addon.lower() not in own and addon.lower() in providers]
+        if required:
+            requirements[paths[position]] = required
+
+    return LoadOrder([paths[position] for position in order], addons, requirements, missing, cycles)
@@ -0,0 +1,144 @@
+import mmap
+from collections.abc import Mapping
+
+from .parser import ConfigClass, Parser, _Append, _DELETE, _EXTERN, _PatchClass
+from .rap_parser import RAP_MAGIC, RapReader
+
+
+class ConfigMerger:
+    """Applies configs on top of each other, the way the game merges addons in load order.
+
+    `delete Foo;` removes a class, `arr[] += {...}` appends to the existing array and redefining an existing
+    class extends it instead of replacing it. Names are matched case-insensitively.
+
+    The merged config is updated in place. Each class gets an index of its lower-cased names the first time a
+    patch touches it, and the indexes are kept up to date between patches, so applying a patch only costs
+    time proportional to the size of that patch. The indexes of the classes that are deleted or replaced
+    are dropped.
+    """
+
+    def __init__(self, config=None, *, translations=None):
+        self.config = {} if config is None else config
+        self.translations = translations
+        self._indexes = {}
+
+    def apply(self, patch):
+        """Apply the source of a config (str, bytes or mmap), text or binarized, or an already parsed config."""
+        if isinstance(patch, (bytes, bytearray, mmap.mmap)) and patch[:4] == RAP_MAGIC:
+            patch = RapReader(patch, self.translations, patch=True).read()
+        elif isinstance(patch, (str, bytes, bytearray, mmap.mmap)):
+            patch = Parser().parse(patch, self.translations, None, False, True)
+        self._apply(self.config, patch)
+        return self.config
+
+    def apply_file(self, path):
+        with open(path, 'rb') as f:
+            try:
+                source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Empty files cannot be mapped
+                return self.config
+
+        with source:
+            return self.apply(source)
+
+    def _index(self, target):
+        entry = self._indexes.get(id(target))
+        # The index keeps a reference to its class, so a stored id cannot be reused by another object
+        if entry is None:
+            entry = self._indexes[id(target)] = (target, {key.lower(): key for key in target})
+        return entry[1]
+
+    def _drop(self, value):
+        # Forget the indexes of a class that has been removed from the config, and of its subclasses.
+        # Only the subclasses of indexed classes can have an index
+        stack = [value]
+        while stack:
+            entry = self._indexes.pop(id(stack.pop()), None)
+            if entry is not None:
+                stack.extend(child for child in entry[0].values() if isinstance(child, dict))
+
+    def _rebase(self, data, base):
+        # A plain dict gets a base class: replace it with a ConfigClass, keeping its index
+        replacement = ConfigClass(data, base=base)
+        entry = self._indexes.pop(id(data), None)
+        if entry is not None:
+            self._indexes[id(replacement)] = (replacement, entry[1])
+        return replacement
+
+    @staticmethod
+    def _materialize(lazy):
+        base = getattr(lazy, 'base', None)
+        return dict(lazy) if base is None else ConfigClass(lazy, base=base)
+
+    def _apply(self, target, patch):
+        index = self._index(target)
+        ops = patch.ops if isinstance(patch, _PatchClass) else patch.items()
+
+        for name, value in ops:
+            folded = name.lower()
+            key = index.get(folded)
+
+            if value is _DELETE:
+                if key is not None:
+                    self._drop(target.pop(key))
+                    del index[folded]
+
+            elif value is _EXTERN:
+                if key is None:
+                    target[name] = {}
+                    index[folded] = name
+
+            elif isinstance(value, (_PatchClass, Mapping)):
+                existing = target[key] if key is not None else None
+                if key is None:
+                    key = index[folded] = name
+
+                if isinstance(existing, Mapping) and not isinstance(existing, dict):  # A LazyClass
+                    existing = target[key] = self._materialize(existing)
+
+                base = getattr(value, 'base', None)
+                if not isinstance(existing, dict):
+                    existing = target[key] = {} if base is None else ConfigClass(base=base)
+                elif base is not None:
+                    if isinstance(existing, ConfigClass):
+                        existing.base = base
+                    else:
+                        existing = target[key] = self._rebase(existing, base)
+
+                self._apply(existing, value)
+
+            elif isinstance(value, _Append):
+                existing = target[key] if key is not None else None
+                if key is None:
+                    key = index[folded] = name
+                # Lists may be shared with the patches, so they are never extended in place
+                if isinstance(existing, dict):
+                    self._drop(existing)
+                if isinstance(existing, list):
+                    target[key] = existing + value
+                elif hasattr(existing, 'tolist') and not isinstance(existing, (Mapping, str)):  # Numeric arrays
+                    target[key] = existing.tolist() + value
+                else:
+                    target[key] = list(value)
+
+            else:
+                if key is None:
+                    key = index[folded] = name
+                else:
+                    self._drop(target[key])
+                target[key] = value
+
+
+def merge(base, *patches, translations=None):
+    """Merge patches into base, in order, and return the result.
+
+    base and patches can be config sources (str, bytes or mmap) or parsed configs. A parsed base is updated in
+    place.
+    """
+    if isinstance(base, (str, bytes, bytearray, mmap.mmap)):
+        base, patches = None, (base,) + patches
+
+    merger = ConfigMerger(base, translations=translations)
+    for patch in patches:
+        merger.apply(patch)
+    return merger.config
@@ -0,0 +1,84 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from .parser import ConfigClass, Parser, ParseError, parse
+
+# Spans smaller than this are not worth sending to another process
+MIN_CHUNK_SIZE = 1 << 16
+
+
+def _parse_chunk(raw, translations, select):
+    return parse(raw, translations=translations, select=select)
+
+
+def _plan(parser, raw, start, end, boundaries, target, descend):
+    """Group the statements between start and end into work items.
+
+    A work item is either a (start, end) span to parse or a (name, base, items) tuple for a class that
+    was too big to be parsed as a whole and whose body is split into items itself.
+    """
+    items = []
+    chunk_start = start
+    for boundary in boundaries:
+        body = None
+        if descend and boundary - start > target:
+            body = parser.classBodyAt(raw, start)
+
+        if body is not None:
+            name, base, body_start, body_end = body
+            if chunk_start < start:
+                items.append((chunk_start, start))
+
+            body_boundaries = parser.statementBoundaries(raw, body_start + 1)
+            items.append((name, base, _plan(parser, raw, body_start + 1, body_end - 1, body_boundaries,
+                                            target, descend)))
+            chunk_start = boundary
+        elif boundary - chunk_start >= target:
+            items.append((chunk_start, boundary))
+            chunk_start = boundary
+
+        start = boundary
+
+    if chunk_start < end:
+        items.append((chunk_start, end))
+    return items
+
+
+def _submit(executor, raw, items, translations, select):
+    futures = []
+    for item in items:
+        if isinstance(item[0], str):
+            futures.append((item[0], item[1], _submit(executor, raw, item[2], translations, select)))
+        else:
+            futures.append(executor.submit(_parse_chunk, raw[item[0]:item[1]], translations, select))
+    return futures
+
+
+def _assemble(futures, context):
+    for future in futures:
+        if isinstance(future, tuple):
+            name, base, children = future
+            context[name] = _assemble(children, {} if base is None else ConfigClass(base=base))
+        else:
+            context.update(future.result())
+    return context
+
+
+def parse_parallel(raw, *, translations=None, select=None, workers=2):
+    """Parse raw by splitting it at statement boundaries and parsing the parts in worker processes.
+
+    Classes bigger than a chunk are split further, along their own statements, unless select is used.
+    The parts are merged in order so the result is the same as the one of parse().
+    """
+    parser = Parser()
+    size = len(raw)
+    target = max(size // (workers * 4), MIN_CHUNK_SIZE)
+    try:
+        items = _plan(parser, raw, 0, size, parser.statementBoundaries(raw), target, select is None)
+        if len(items) < 2:
+            return parse(raw, translations=translations, select=select)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return _assemble(_submit(executor, raw, items, translations, select), {})
+    except ParseError:
+        # Positions in error messages are relative to the chunk, so report the error the way parse() would
+        return parse(raw, translations=translations, select=select)
@@ -17,4 +17,19 @@ cdef Py_UCS4 NEWLINE
 cdef unicode NEWLINE_U
 cdef unicode END_COMMENT_U
 cdef unicode QUOTE_U
+cdef unicode SLASH_U
 cdef unicode STR
+
+cdef bytes NEWLINE_B
+cdef bytes END_COMMENT_B
+cdef bytes QUOTE_B
+cdef bytes SLASH_B
+
+cdef Py_ssize_t INT_MAX_DIGITS
+cdef Py_ssize_t FLOAT_MAX_LENGTH
+cdef long long FLOAT_EXACT_INT
+
+cdef int SCAN_CODE
+cdef int SCAN_STRING
+cdef int SCAN_LINE_COMMENT
+cdef int SCAN_BLOCK_COMMENT
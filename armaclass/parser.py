@@ -1,22 +1,33 @@
 # distutils: language=c++
+import codecs
+import fnmatch
+import mmap
+import os
+import re
+from array import array
+from collections.abc import Mapping
+
+from .positions import SourcePositions
 
 try:
     import cython
 except ModuleNotFoundError:
     from .cython_stubs import (cython,
-                               PyUnicode_FromKindAndData, PyUnicode_4BYTE_KIND, PyUnicode_DATA,
-                               PyUnicode_KIND, PyUnicode_READ,
-                               vector)
+                               PyUnicode_1BYTE_KIND, PyUnicode_DATA, PyUnicode_DecodeUTF8, PyUnicode_KIND,
+                               PyUnicode_READ, vector)
 
 if cython.compiled:
-    from cython.cimports.cpython import (PyUnicode_FromKindAndData, PyUnicode_4BYTE_KIND, PyUnicode_DATA,
-                                         PyUnicode_KIND, PyUnicode_READ)
+    from cython.cimports.cpython import (PyUnicode_1BYTE_KIND, PyUnicode_DATA, PyUnicode_DecodeUTF8, PyUnicode_KIND,
+                                         PyUnicode_READ)
     from cython.cimports.libcpp.vector import vector
+    from cython.cimports.cpython.conversion import PyOS_string_to_double
 else:
     from .cython_stubs import (cython,
-                               PyUnicode_FromKindAndData, PyUnicode_4BYTE_KIND, PyUnicode_DATA,
-                               PyUnicode_KIND, PyUnicode_READ,
-                               vector)
+                               PyUnicode_1BYTE_KIND, PyUnicode_DATA, PyUnicode_DecodeUTF8, PyUnicode_KIND,
+                               PyUnicode_READ, vector)
+
+# The engine used by parse(): 'cython' when this module is compiled, otherwise 'regex' for RegexParser
+backend = 'cython' if cython.compiled else 'regex'
 
 QUOTE = '"'
 SEMICOLON = ';'
@@ -37,8 +48,32 @@ NEWLINE = '\n'
 NEWLINE_U = '\n'
 END_COMMENT_U = '*/'
 QUOTE_U = '"'
+SLASH_U = '/'
 STR = 'STR'
 
+NEWLINE_B = b'\n'
+END_COMMENT_B = b'*/'
+QUOTE_B = b'"'
+SLASH_B = b'/'
+
+WHITESPACE_RUN_U = re.compile('[\x00-\x20]*')
+WHITESPACE_RUN_B = re.compile(b'[\x00-\x20]*')
+
+# Numbers that are stored in packed arrays. Integers with more digits than INT_MAX_DIGITS and longer
+# floats are left to guessExpression()
+NUMBER_U = re.compile(r'[+-]?(?:[0-9]+(?:\.[0-9]*(?:[eE][+-]?[0-9]+)?)?|\.[0-9]+(?:[eE][+-]?[0-9]+)?)')
+NUMBER_B = re.compile(rb'[+-]?(?:[0-9]+(?:\.[0-9]*(?:[eE][+-]?[0-9]+)?)?|\.[0-9]+(?:[eE][+-]?[0-9]+)?)')
+INT_MAX_DIGITS = 18
+FLOAT_MAX_LENGTH = 64
+# Where skipStatements() stopped at the end of the input: in code, or in a string or comment that isn't closed yet
+SCAN_CODE = 0
+SCAN_STRING = 1
+SCAN_LINE_COMMENT = 2
+SCAN_BLOCK_COMMENT = 3
+
+# Arrays mixing floats with integers above this are not packed, doubles would round the integers
+FLOAT_EXACT_INT = 2 ** 53
+
 # VALID_NAME_CHAR = string.ascii_letters + string.digits + '_.\\'
 
 
@@ -46,23 +81,317 @@ class ParseError(RuntimeError):
     pass
 
 
+class ConfigClass(dict):
+    """A parsed class that inherits from another one. base holds the name of the parent class."""
+    __slots__ = ('base',)
+
+    def __init__(self, *args, base=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.base = base
+
+    def __repr__(self):
+        return '{}({}, base={!r})'.format(type(self).__name__, dict.__repr__(self), self.base)
+
+
+class CaseInsensitiveClass(ConfigClass):
+    """A parsed class whose names can be looked up in any case, like in Arma.
+
+    Keys keep the spelling they were first assigned with, so the class generates back unchanged.
+    Lookups using that spelling cost the same as in a regular dict, other spellings go through an index
+    of case-folded names that is kept up to date as the class is filled.
+    """
+    __slots__ = ('_folded',)
+
+    def __init__(self, *args, base=None, **kwargs):
+        super().__init__(base=base)
+        self._folded = {}
+        self.update(*args, **kwargs)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Convert parsed dicts and their nested classes, recursively."""
+        result = cls(base=getattr(data, 'base', None))
+        for name, value in data.items():
+            result[name] = cls.from_dict(value) if isinstance(value, Mapping) else value
+        return result
+
+    def key(self, name):
+        """Return the spelling name is stored with, or None if there is no such entry."""
+        return self._folded.get(name.lower())
+
+    def __missing__(self, name):
+        original = self._folded.get(name.lower()) if isinstance(name, str) else None
+        if original is None:
+            raise KeyError(name)
+        return dict.__getitem__(self, original)
+
+    def __setitem__(self, name, value):
+        original = self._folded.setdefault(name.lower(), name)
+        dict.__setitem__(self, original, value)
+
+    def __delitem__(self, name):
+        original = self._folded.pop(name.lower(), None) if isinstance(name, str) else None
+        if original is None:
+            raise KeyError(name)
+        dict.__delitem__(self, original)
+
+    def __contains__(self, name):
+        return isinstance(name, str) and name.lower() in self._folded
+
+    def get(self, name, default=None):
+        original = self._folded.get(name.lower()) if isinstance(name, str) else None
+        return default if original is None else dict.__getitem__(self, original)
+
+    def pop(self, name, *default):
+        original = self._folded.pop(name.lower(), None) if isinstance(name, str) else None
+        if original is None:
+            if default:
+                return default[0]
+            raise KeyError(name)
+        return dict.pop(self, original)
+
+    def setdefault(self, name, default=None):
+        if name in self:
+            return self[name]
+        self[name] = default
+        return default
+
+    def update(self, *args, **kwargs):
+        for name, value in dict(*args, **kwargs).items():
+            self[name] = value
+
+    def popitem(self):
+        name, value = dict.popitem(self)
+        del self._folded[name.lower()]
+        return name, value
+
+    def clear(self):
+        dict.clear(self)
+        self._folded.clear()
+
+    def copy(self):
+        return type(self)(self, base=self.base)
+
+    def __reduce__(self):
+        return type(self), (dict(self),), (None, {'base': self.base})
+
+
+# What parsing a patch produces, see armaclass.merge
+_DELETE = object()  # delete Foo;
+_EXTERN = object()  # class Foo;
+
+
+class _Append(list):
+    """Array declared with `name[] += {...}`."""
+    __slots__ = ()
+
+
+class _PatchClass:
+    """Class body of a patch. Keeps the statements in order, as (name, value) pairs."""
+    __slots__ = ('base', 'ops')
+
+    def __init__(self, base=None):
+        self.base = base
+        self.ops = []
+
+    def __setitem__(self, name, value):
+        self.ops.append((name, value))
+
+
+class InternTable:
+    """Makes identical names and short string values share a single object.
+
+    Pass the same table to several parse() calls to share the strings between the configs as well.
+    Values longer than max_length characters are not interned.
+    """
+
+    def __init__(self, max_length=64):
+        self.max_length = max_length
+        self.strings = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, s):
+        return self.strings.setdefault(s, s)
+
+    def intern_all(self, data):
+        """Intern the names and values of an already parsed config, in place."""
+        strings = self.strings
+        max_length = self.max_length
+        stack = [data]
+        while stack:
+            container = stack.pop()
+            if isinstance(container, list):
+                for i, value in enumerate(container):
+                    if isinstance(value, str):
+                        if len(value) <= max_length:
+                            container[i] = strings.setdefault(value, value)
+                    elif isinstance(value, list):
+                        stack.append(value)
+                continue
+
+            if not isinstance(container, dict):  # A LazyClass
+                continue
+            if getattr(container, 'base', None):
+                container.base = strings.setdefault(container.base, container.base)
+            items = list(container.items())
+            container.clear()
+            for name, value in items:
+                if isinstance(value, str):
+                    if len(value) <= max_length:
+                        value = strings.setdefault(value, value)
+                elif isinstance(value, (list, Mapping)):
+                    stack.append(value)
+                container[strings.setdefault(name, name)] = value
+        return data
+
+
+class _Selector:
+    """Matches class paths against patterns like `CfgVehicles/*/displayName` or `CfgWeapons/**`.
+
+    A state is a tuple of (pattern index, segment index) pairs that are still matching.
+    """
+
+    def __init__(self, patterns):
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        self.patterns = [tuple(pattern.lower().strip('/').split('/')) for pattern in patterns]
+        self.initial = self._closure((index, 0) for index in range(len(self.patterns)))
+        self._cache = {}
+
+    def _closure(self, states):
+        # `**` may also match zero segments
+        result = []
+        for pattern_index, segment_index in states:
+            pattern = self.patterns[pattern_index]
+            result.append((pattern_index, segment_index))
+            while segment_index < len(pattern) and pattern[segment_index] == '**':
+                segment_index += 1
+                result.append((pattern_index, segment_index))
+        return tuple(sorted(set(result)))
+
+    def child(self, state, name):
+        """Return True if name matches completely, None if it can't match or the state for its children."""
+        key = (state, name)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+
+        lowered = name.lower()
+        advanced = []
+        for pattern_index, segment_index in state:
+            pattern = self.patterns[pattern_index]
+            if segment_index == len(pattern):
+                continue
+
+            segment = pattern[segment_index]
+            if segment == '**':
+                advanced.append((pattern_index, segment_index))
+            elif segment == lowered or segment == '*' or fnmatch.fnmatchcase(lowered, segment):
+                advanced.append((pattern_index, segment_index + 1))
+
+        result = self._closure(advanced)
+        if any(segment_index == len(self.patterns[pattern_index]) for pattern_index, segment_index in result):
+            result = True
+        elif not result:
+            result = None
+
+        self._cache[key] = result
+        return result
+
+
 @cython.cclass
 class Parser:
     currentPosition: cython.Py_ssize_t
     input_string: cython.unicode
     input_string_len: cython.Py_ssize_t
+    nextComment: cython.Py_ssize_t
+    # Comment starts are only looked for up to there, the end of the class when parsing one with parseClassAt()
+    commentLimit: cython.Py_ssize_t
+    input_buffer: object
+    input_view: object
     translations: dict
 
+    # Path filtering. selection is None when everything is being parsed
+    selector: object
+    selection: object
+    lazy: cython.bint
+    patch: cython.bint
+    # Build CaseInsensitiveClass objects instead of dicts
+    fold: cython.bint
+
+    # Entry offsets are recorded in a SourcePositions, None when not tracking them.
+    # parseProperty() marks the entry it has stored and where its statement ends.
+    positions: object
+    positionParent: cython.Py_ssize_t
+    positionStored: cython.Py_ssize_t
+    positionName: object
+    positionEnd: cython.Py_ssize_t
+
+    # Arrays made of numbers only are returned as array.array, or as ndarray if numpy is set
+    numericArrays: cython.bint
+    numpy: object
+    # Last number read by scanNumber()
+    numberIsFloat: cython.bint
+    numberInt: cython.longlong
+    numberDouble: cython.double
+
+    # Scratch list for parseString()
+    stringPieces: list
+
+    # State of skipStatements() when it reached the end of the input: the position to resume from, the brace
+    # depth there and one of the SCAN_* modes
+    scanResume: cython.Py_ssize_t
+    scanDepth: cython.Py_ssize_t
+    scanMode: cython.int
+
+    # Strings shared through an InternTable, None when not interning
+    interned: dict
+    intern_max: cython.Py_ssize_t
+
     data: cython.p_void
     data_kind: cython.int
 
+    def __init__(self):
+        # Entry points other than parse() and parseClassAt() never intern nor track positions
+        self.interned = None
+        self.intern_max = 0
+        self.positions = None
+        self.numericArrays = False
+        self.numpy = None
+        self.stringPieces = []
+
     @cython.cfunc
     def ensure(self, condition: cython.bint, message='Error'):
         if condition:
             return
 
         raise ParseError('{} at position {}. Before: {}'.format(
-            message, self.currentPosition, self.input_string[self.currentPosition:self.currentPosition + 50]))
+            message, self.currentPosition, self.slice(self.currentPosition, self.currentPosition + 50)))
+
+    @cython.cfunc
+    def find(self, needle: cython.unicode, needle_b: bytes, start: cython.Py_ssize_t) -> cython.Py_ssize_t:
+        if self.input_buffer is not None:
+            return self.input_buffer.find(needle_b, start)
+        return self.input_string.find(needle, start)
+
+    @cython.cfunc
+    def slice(self, start: cython.Py_ssize_t, stop: cython.Py_ssize_t) -> cython.unicode:
+        if self.input_buffer is None:
+            return self.input_string[start:stop]
+
+        # Raw UTF-8 input: only decode the spans that end up in the result
+        stop = min(stop, self.input_string_len)
+        if start >= stop:
+            return ''
+        if cython.compiled:
+            return PyUnicode_DecodeUTF8(cython.cast(cython.p_char, self.data) + start, stop - start,
+                                        b'surrogateescape')
+        else:
+            return PyUnicode_DecodeUTF8(self.input_buffer[start:stop], stop - start, 'surrogateescape')
 
     @cython.cfunc
     @cython.inline
@@ -71,23 +400,51 @@ class Parser:
         indexCommentEnd: cython.Py_ssize_t
         indexOfLinefeed: cython.Py_ssize_t
 
+        # Comment starts are located ahead of time, so most calls end here
+        if self.currentPosition < self.nextComment:
+            return
+
         if self.currentPosition >= self.input_string_len:
             return
 
+        if self.currentPosition > self.nextComment:
+            self.nextComment = self.findCommentStart(self.currentPosition)
+            if self.currentPosition != self.nextComment:
+                return
+
         if PyUnicode_READ(self.data_kind, self.data, self.currentPosition) == SLASH:
             if self.currentPosition + 1 >= self.input_string_len:
                 return
 
             if PyUnicode_READ(self.data_kind, self.data, self.currentPosition + 1) == SLASH:
-                indexOfLinefeed = self.input_string.find(NEWLINE_U, self.currentPosition)
+                indexOfLinefeed = self.find(NEWLINE_U, NEWLINE_B, self.currentPosition)
                 if indexOfLinefeed == -1:
                     self.currentPosition = self.input_string_len
                 else:
                     self.currentPosition = indexOfLinefeed
             elif PyUnicode_READ(self.data_kind, self.data, self.currentPosition + 1) == ASTERISK:
-                indexCommentEnd = self.input_string.find(END_COMMENT_U, self.currentPosition)
+                indexCommentEnd = self.find(END_COMMENT_U, END_COMMENT_B, self.currentPosition)
                 self.currentPosition = self.input_string_len if indexCommentEnd == -1 else indexCommentEnd + 2
 
+    @cython.cfunc
+    def findCommentStart(self, pos: cython.Py_ssize_t) -> cython.Py_ssize_t:
+        # Returns the position of the first `//` or `/*` at or after pos, or the limit of the search if there is
+        # none before it
+        c: cython.Py_UCS4
+        limit: cython.Py_ssize_t = self.commentLimit if pos < self.commentLimit else self.input_string_len
+        while True:
+            if self.input_buffer is not None:
+                pos = self.input_buffer.find(SLASH_B, pos, limit)
+            else:
+                pos = self.input_string.find(SLASH_U, pos, limit)
+            if pos == -1 or pos + 1 >= self.input_string_len:
+                return limit
+
+            c = PyUnicode_READ(self.data_kind, self.data, pos + 1)
+            if c == SLASH or c == ASTERISK:
+                return pos
+            pos += 1
+
     @cython.cfunc
     @cython.inline
     @cython.exceptval(check=False)
@@ -114,72 +471,70 @@ class Parser:
     @cython.cfunc
     @cython.inline
     @cython.exceptval(check=False)
-    def weHaveADoubleQuote(self) -> cython.bint:
-        if self.input_string_len >= self.currentPosition + 2 and \
-                PyUnicode_READ(self.data_kind, self.data, self.currentPosition) == QUOTE and \
-                PyUnicode_READ(self.data_kind, self.data, self.currentPosition + 1) == QUOTE:
-            return True
-        return False
+    def isStringLineBreak(self, pos: cython.Py_ssize_t) -> cython.bint:
+        # `" \n "` between two parts of a string
+        return (
+            self.input_string_len >= pos + 6 and
+            PyUnicode_READ(self.data_kind, self.data, pos + 1) == ' ' and
+            PyUnicode_READ(self.data_kind, self.data, pos + 2) == '\\' and
+            PyUnicode_READ(self.data_kind, self.data, pos + 3) == 'n' and
+            PyUnicode_READ(self.data_kind, self.data, pos + 4) == ' ' and
+            PyUnicode_READ(self.data_kind, self.data, pos + 5) == QUOTE
+        )
 
     @cython.cfunc
-    @cython.inline
-    @cython.exceptval(check=False)
-    def weHaveAStringLineBreak(self) -> cython.bint:
-        if (
-                self.input_string_len >= self.currentPosition + 6 and
-                PyUnicode_READ(self.data_kind, self.data, self.currentPosition) == QUOTE and
-                PyUnicode_READ(self.data_kind, self.data, self.currentPosition + 1) == ' ' and
-                PyUnicode_READ(self.data_kind, self.data, self.currentPosition + 2) == '\\' and
-                PyUnicode_READ(self.data_kind, self.data, self.currentPosition + 3) == 'n' and
-                PyUnicode_READ(self.data_kind, self.data, self.currentPosition + 4) == ' ' and
-                PyUnicode_READ(self.data_kind, self.data, self.currentPosition + 5) == QUOTE
-        ):
-            return True
-        return False
-
-    @cython.cfunc
-    @cython.inline
-    @cython.exceptval(check=False)
-    def forwardToNextQuote(self) -> cython.void:
-        self.currentPosition = self.input_string.find(QUOTE_U, self.currentPosition + 1)
-        if self.currentPosition == -1:
-            self.currentPosition = self.input_string_len
-
-    @cython.cfunc
-    @cython.inline
     def parseString(self) -> cython.unicode:
-        result: vector[cython.Py_UCS4]# = vector[cython.Py_UCS4]()
-        if not cython.compiled:
-            result = vector()
-        result.reserve(100)
+        """Parse the string starting at the current position.
+
+        The parts between quotes are located with find() and sliced out of the input, so they keep the
+        narrowest possible kind and no character is handled on its own. Strings without `""` escapes or
+        string line breaks are a single slice. The others are joined from the pieces kept in stringPieces,
+        which is reused for every string.
+        """
+        pos: cython.Py_ssize_t
+        start: cython.Py_ssize_t
+        pieces: list = None
 
         self.ensure(self.current() == QUOTE)
-        self.nextWithoutCommentDetection()
+        start = pos = self.currentPosition + 1
         while True:
-            if self.weHaveADoubleQuote():
-                result.push_back(self.current())
-                self.nextWithoutCommentDetection()
-            elif self.weHaveAStringLineBreak():
-                result.push_back(NEWLINE)
-                self.next()
-                self.forwardToNextQuote()
-            elif self.current() == QUOTE:
-                break
+            pos = self.find(QUOTE_U, QUOTE_B, pos)
+            if pos == -1:
+                self.currentPosition = self.input_string_len
+                raise ParseError('Got EOF while parsing a string')
+
+            if pos + 1 < self.input_string_len and PyUnicode_READ(self.data_kind, self.data, pos + 1) == QUOTE:
+                if pieces is None:
+                    pieces = self.stringPieces
+                pieces.append(self.slice(start, pos + 1))
+                start = pos = pos + 2
+            elif self.isStringLineBreak(pos):
+                if pieces is None:
+                    pieces = self.stringPieces
+                pieces.append(self.slice(start, pos))
+                pieces.append(NEWLINE_U)
+                start = pos = pos + 6
             else:
-                if self.currentPosition >= self.input_string_len:
-                    raise ParseError('Got EOF while parsing a string')
+                break
 
-                result.push_back(self.current())
+        self.currentPosition = pos + 1
+        if pieces is None:
+            return self.slice(start, pos)
 
-            self.nextWithoutCommentDetection()
+        pieces.append(self.slice(start, pos))
+        result: cython.unicode = ''.join(pieces)
+        pieces.clear()
+        return result
 
-        self.ensure(self.current() == QUOTE)
-        self.nextWithoutCommentDetection()
-        unicode_obj = PyUnicode_FromKindAndData(PyUnicode_4BYTE_KIND, result.data(), result.size())
-        return unicode_obj
+    @cython.cfunc
+    def internString(self, s: cython.unicode) -> cython.unicode:
+        existing = self.interned.get(s)
+        if existing is None:
+            self.interned[s] = s
+            return s
+        return existing
 
     @cython.cfunc
-    @cython.exceptval(check=False)
     def guessExpression(self, s: cython.unicode):
         s_len: cython.Py_ssize_t
         s = s.strip()
@@ -203,7 +558,6 @@ class Parser:
                 return s
 
     @cython.cfunc
-    @cython.exceptval(check=False)
     def parseUnknownExpression(self):
         pos: cython.Py_ssize_t
         c: cython.Py_UCS4
@@ -219,10 +573,13 @@ class Parser:
 
             pos += 1
 
-        expression = self.input_string[self.currentPosition:pos]
+        expression = self.slice(self.currentPosition, pos)
         self.currentPosition = pos
 
-        return self.guessExpression(expression)
+        value = self.guessExpression(expression)
+        if self.interned is not None and isinstance(value, str) and len(value) <= self.intern_max:
+            return self.internString(value)
+        return value
 
     @cython.cfunc
     def parseNonArrayPropertyValue(self):
@@ -230,7 +587,10 @@ class Parser:
         if current == CURLY_OPEN:
             return self.parseArray()
         elif current == QUOTE:
-            return self.parseString()
+            value = self.parseString()
+            if self.interned is not None and len(value) <= self.intern_max:
+                return self.internString(value)
+            return value
         elif current == DOLLAR:
             return self.parseTranslationString()
         else:
@@ -254,18 +614,30 @@ class Parser:
 
         self.detectComment()
 
-        return self.input_string[start:stop]
+        if self.interned is not None:
+            return self.internString(self.slice(start, stop))
+        return self.slice(start, stop)
 
     @cython.cfunc
-    def parseClassValue(self):
-        result: dict = {}
+    def parseClassValue(self, base=None):
+        if self.patch:
+            result = _PatchClass(base)
+        elif self.fold:
+            result = CaseInsensitiveClass(base=base)
+        elif base is None:
+            result = {}
+        else:
+            result = ConfigClass(base=base)
 
         self.ensure(self.current() == CURLY_OPEN)
         self.next()
         self.parseWhitespace()
 
         while(self.current() != CURLY_CLOSE):
-            self.parseProperty(result)
+            if self.positions is not None:
+                self.parseRecordedProperty(result)
+            else:
+                self.parseProperty(result)
             self.parseWhitespace()
 
         self.next()
@@ -274,13 +646,21 @@ class Parser:
 
     @cython.cfunc
     def parseArray(self):
+        if self.numericArrays:
+            packed = self.parseNumericArray()
+            if packed is not None:
+                return packed
+
         result = []
         self.ensure(self.current() == CURLY_OPEN)
         self.next()
         self.parseWhitespace()
 
         while self.currentPosition < self.input_string_len and self.current() != CURLY_CLOSE:
-            result.append(self.parseNonArrayPropertyValue())
+            if self.positions is not None:
+                result.append(self.parseRecordedArrayItem(len(result)))
+            else:
+                result.append(self.parseNonArrayPropertyValue())
             self.parseWhitespace()
 
             if self.current() == COMMA:
@@ -292,12 +672,207 @@ class Parser:
         self.next()
         return result
 
+    @cython.cfunc
+    def parseNumericArray(self):
+        """Read an array of decimal numbers into an array.array, or return None if it is anything else.
+
+        The numbers may only be separated by whitespace and commas, so nothing has to be undone when
+        something else is found. Empty arrays are not numeric, nor are arrays mixing floats with integers
+        that doubles cannot represent exactly.
+        """
+        pos: cython.Py_ssize_t
+        end: cython.Py_ssize_t
+        c: cython.Py_UCS4
+        is_float: cython.bint = False
+        inexact: cython.bint = False
+        doubles: vector[cython.double]
+        ints: vector[cython.longlong]
+        if not cython.compiled:
+            doubles = vector()
+            ints = vector()
+
+        self.ensure(self.current() == CURLY_OPEN)
+        pos = self.blankRunEnd(self.currentPosition + 1)
+        if pos >= self.input_string_len or PyUnicode_READ(self.data_kind, self.data, pos) == CURLY_CLOSE:
+            return None
+
+        while True:
+            end = self.scanNumber(pos)
+            if end == -1:
+                return None
+            if self.numberIsFloat:
+                is_float = True
+                doubles.push_back(self.numberDouble)
+            else:
+                doubles.push_back(self.numberInt)
+                ints.push_back(self.numberInt)
+                if self.numberInt > FLOAT_EXACT_INT or self.numberInt < -FLOAT_EXACT_INT:
+                    inexact = True
+
+            pos = self.blankRunEnd(end)
+            if pos >= self.input_string_len:
+                return None
+            c = PyUnicode_READ(self.data_kind, self.data, pos)
+            if c == COMMA:
+                pos = self.blankRunEnd(pos + 1)
+                if pos >= self.input_string_len:
+                    return None
+                if PyUnicode_READ(self.data_kind, self.data, pos) == CURLY_CLOSE:
+                    break
+            elif c == CURLY_CLOSE:
+                break
+            else:
+                return None
+
+        if is_float and inexact:
+            return None
+
+        self.currentPosition = pos
+        self.next()
+
+        if is_float:
+            packed = array('d')
+            if cython.compiled:
+                packed.frombytes(cython.cast(cython.p_char, doubles.data())[:doubles.size() * cython.sizeof(cython.double)])
+            else:
+                packed.extend(doubles)
+        else:
+            packed = array('q')
+            if cython.compiled:
+                packed.frombytes(cython.cast(cython.p_char, ints.data())[:ints.size() * cython.sizeof(cython.longlong)])
+            else:
+                packed.extend(ints)
+
+        if self.numpy is not None:
+            return self.numpy.frombuffer(packed, packed.typecode)
+        return packed
+
+    @cython.cfunc
+    def scanNumber(self, pos: cython.Py_ssize_t) -> cython.Py_ssize_t:
+        """Read the decimal number at pos into numberInt or numberDouble, and return the position after it.
+
+        Returns -1 if there is no such number, or if it is an integer that may not fit in 64 bits.
+        Integers look like `-12` and floats always have a dot, like `1.5e-3` or `.5`, just like for
+        guessExpression(). The compiled version creates no objects at all.
+        """
+        start: cython.Py_ssize_t = pos
+        digits: cython.Py_ssize_t = 0
+        value: cython.longlong = 0
+        is_float: cython.bint = False
+        c: cython.Py_UCS4
+        i: cython.Py_ssize_t
+        buffer: cython.char[65]  # FLOAT_MAX_LENGTH + 1
+
+        if not cython.compiled:
+            if self.input_buffer is None:
+                number, dot, signs = NUMBER_U.match(self.input_string, pos), '.', '+-'
+            else:
+                number, dot, signs = NUMBER_B.match(self.input_buffer, pos), b'.', b'+-'
+            if number is None:
+                return -1
+            text = number.group()
+            if dot in text:
+                if len(text) > FLOAT_MAX_LENGTH:
+                    return -1
+                self.numberIsFloat = True
+                self.numberDouble = float(text)
+            else:
+                if len(text.lstrip(signs)) > INT_MAX_DIGITS:
+                    return -1
+                self.numberIsFloat = False
+                self.numberInt = int(text)
+            return number.end()
+
+        if pos < self.input_string_len:
+            c = PyUnicode_READ(self.data_kind, self.data, pos)
+            if c == PLUS or c == MINUS:
+                pos += 1
+
+        while pos < self.input_string_len:
+            c = PyUnicode_READ(self.data_kind, self.data, pos)
+            if c < '0' or c > '9':
+                break
+            if digits < INT_MAX_DIGITS:
+                value = value * 10 + (ord(c) - 48)
+            digits += 1
+            pos += 1
+
+        if pos < self.input_string_len and PyUnicode_READ(self.data_kind, self.data, pos) == '.':
+            is_float = True
+            pos += 1
+            i = pos
+            while pos < self.input_string_len and '0' <= PyUnicode_READ(self.data_kind, self.data, pos) <= '9':
+                pos += 1
+            if digits == 0 and pos == i:
+                return -1
+
+            if pos < self.input_string_len and PyUnicode_READ(self.data_kind, self.data, pos) in 'eE':
+                pos += 1
+                if pos < self.input_string_len and PyUnicode_READ(self.data_kind, self.data, pos) in '+-':
+                    pos += 1
+                i = pos
+                while pos < self.input_string_len and '0' <= PyUnicode_READ(self.data_kind, self.data, pos) <= '9':
+                    pos += 1
+                if pos == i:
+                    return -1
+        elif digits == 0 or digits > INT_MAX_DIGITS:
+            return -1
+
+        self.numberIsFloat = is_float
+        if is_float:
+            if pos - start > FLOAT_MAX_LENGTH:
+                return -1
+            for i in range(pos - start):
+                buffer[i] = cython.cast(cython.char, PyUnicode_READ(self.data_kind, self.data, start + i))
+            buffer[pos - start] = 0
+            self.numberDouble = PyOS_string_to_double(buffer, cython.NULL, cython.NULL)
+        elif PyUnicode_READ(self.data_kind, self.data, start) == MINUS:
+            self.numberInt = -value
+        else:
+            self.numberInt = value
+        return pos
+
+    @cython.cfunc
+    @cython.exceptval(check=False)
+    def blankRunEnd(self, pos: cython.Py_ssize_t) -> cython.Py_ssize_t:
+        # Like skipWhitespaceRun(), but from pos and without moving
+        if cython.compiled:
+            while pos < self.input_string_len and PyUnicode_READ(self.data_kind, self.data, pos) <= 32:
+                pos += 1
+            return pos
+        elif pos >= self.input_string_len:
+            return pos
+        elif self.input_buffer is None:
+            return WHITESPACE_RUN_U.match(self.input_string, pos).end()
+        else:
+            return WHITESPACE_RUN_B.match(self.input_buffer, pos).end()
+
     @cython.cfunc
     @cython.inline
     @cython.exceptval(check=False)
     def parseWhitespace(self) -> cython.void:
-        while self.isWhitespace():
-            self.next()
+        start: cython.Py_ssize_t
+        while True:
+            start = self.currentPosition
+            self.skipWhitespaceRun()
+            if self.currentPosition == start:
+                return
+            self.detectComment()
+
+    @cython.cfunc
+    @cython.inline
+    @cython.exceptval(check=False)
+    def skipWhitespaceRun(self) -> cython.void:
+        pos: cython.Py_ssize_t = self.currentPosition
+        if cython.compiled:
+            while pos < self.input_string_len and PyUnicode_READ(self.data_kind, self.data, pos) <= 32:
+                pos += 1
+            self.currentPosition = pos
+        elif pos < self.input_string_len:
+            if self.input_buffer is None:
+                self.currentPosition = WHITESPACE_RUN_U.match(self.input_string, pos).end()
+            else:
+                self.currentPosition = WHITESPACE_RUN_B.match(self.input_buffer, pos).end()
 
     @cython.cfunc
     @cython.inline
@@ -311,17 +886,20 @@ class Parser:
         return c in ' \t\r\n' or ord(c) < 32
 
     @cython.cfunc
-    def parseProperty(self, context: dict) -> cython.void:
+    def parseProperty(self, context) -> cython.void:
         value = None
+        base = None
         name = self.parsePropertyName()
 
         self.parseWhitespace()
 
         if name == 'delete':
-            self.parsePropertyName()
+            name = self.parsePropertyName()
             self.parseWhitespace()
             self.ensure(self.current() == SEMICOLON)
             self.next()
+            if self.patch:
+                context[name] = _DELETE
             return
 
         if name == 'import':
@@ -340,14 +918,41 @@ class Parser:
             if self.current() == COLON:
                 self.next()
                 self.parseWhitespace()
-                self.parsePropertyName()
+                base = self.parsePropertyName()
                 self.parseWhitespace()
 
             current = self.current()
             if current == CURLY_OPEN:
-                value = self.parseClassValue()
+                if self.lazy:
+                    start = self.currentPosition
+                    value = LazyClass(self.input_string if self.input_buffer is None else self.input_buffer,
+                                      start, self.skipClassValue(), self.translations, base, self.interned,
+                                      self.intern_max)
+                elif self.selection is None:
+                    value = self.parseClassValue(base)
+                else:
+                    value = self.parseSelectedClassValue(name, base)
+                    if value is None:
+                        self.parseWhitespace()
+                        self.ensure(self.current() == SEMICOLON)
+                        self.next()
+                        return
             elif current == SEMICOLON:
-                value = {}
+                if self.selection is not None and self.selector.child(self.selection, name) is not True:
+                    self.next()
+                    return
+                if self.patch:
+                    value = _EXTERN
+                elif self.fold:
+                    value = CaseInsensitiveClass(base=base)
+                elif base is None:
+                    value = {}
+                else:
+                    value = ConfigClass(base=base)
+
+        elif self.selection is not None and self.selector.child(self.selection, name) is not True:
+            self.skipPropertyValue()
+            return
 
         elif current == SQUARE_OPEN:
             self.ensure(self.next() == SQUARE_CLOSE)
@@ -355,13 +960,16 @@ class Parser:
             self.parseWhitespace()
 
             self.ensure(self.current() == EQUALS or self.current() == PLUS)
-            if self.current() == PLUS:
+            append: cython.bint = self.current() == PLUS
+            if append:
                 self.ensure(self.next() == EQUALS)
 
             self.next()
             self.parseWhitespace()
 
             value = self.parseArray()
+            if append and self.patch:
+                value = _Append(value)
 
         elif current == EQUALS:
             self.next()
@@ -370,7 +978,7 @@ class Parser:
 
         elif current == SLASH:
             if self.next() == SLASH:
-                self.currentPosition = self.input_string.find(NEWLINE_U, self.currentPosition)
+                self.currentPosition = self.find(NEWLINE_U, NEWLINE_B, self.currentPosition)
                 if self.currentPosition == -1:
                     self.currentPosition = self.input_string_len
 
@@ -384,8 +992,42 @@ class Parser:
 
         self.parseWhitespace()
         self.ensure(self.current() == SEMICOLON)
+        if self.positions is not None:
+            self.positionStored = self.positionParent
+            self.positionName = name
+            self.positionEnd = self.currentPosition + 1
         self.next()
 
+    @cython.cfunc
+    def parseRecordedProperty(self, context) -> cython.void:
+        parent: cython.Py_ssize_t = self.positionParent
+        index: cython.Py_ssize_t = self.positions.open(parent, self.currentPosition)
+
+        self.positionParent = index
+        self.parseProperty(context)
+        self.positionParent = parent
+
+        if self.positionStored == index:
+            self.positions.close(index, self.positionName, self.positionEnd)
+        else:  # delete, import or a statement that has not been selected
+            self.positions.truncate(index)
+
+    @cython.cfunc
+    def parseRecordedArrayItem(self, item: cython.Py_ssize_t):
+        parent: cython.Py_ssize_t = self.positionParent
+        index: cython.Py_ssize_t = self.positions.open(parent, self.currentPosition)
+        end: cython.Py_ssize_t
+
+        self.positionParent = index
+        value = self.parseNonArrayPropertyValue()
+        self.positionParent = parent
+
+        end = self.currentPosition
+        while end > 0 and PyUnicode_READ(self.data_kind, self.data, end - 1) <= ' ':
+            end -= 1
+        self.positions.close(index, item, end)
+        return value
+
     @cython.cfunc
     def translateString(self, txt: str) -> str:
         translated: str = self.translations.get(txt)
@@ -395,50 +1037,785 @@ class Parser:
 
     @cython.cfunc
     def parseTranslationString(self):
-        result = []
+        start: cython.Py_ssize_t
+        stop: cython.Py_ssize_t
         assert self.current() == DOLLAR
         self.next()
 
-        if self.input_string[self.currentPosition: self.currentPosition + 3] != STR:
+        if self.slice(self.currentPosition, self.currentPosition + 3) != STR:
             raise ParseError('Invalid translation string beginning')
 
+        start = self.currentPosition
         while self.currentPosition < self.input_string_len:
             current: cython.Py_UCS4 = self.current()
             if current in ';,}':
                 break
             else:
                 if self.isWhitespace():
-                    self.parseWhitespace()
                     break
-                else:
-                    result.append(current)
             self.nextWithoutCommentDetection()
 
+        stop = self.currentPosition
+        self.parseWhitespace()
+
         if self.currentPosition >= self.input_string_len or self.current() not in ';,}':
             raise ParseError('Syntax error next translation string')
 
-        return self.translateString(''.join(result))
+        return self.translateString(self.slice(start, stop))
 
-    def parse(self, raw, translations):
-        self.currentPosition = 0
-        self.input_string = raw
-        self.input_string_len = len(raw)
-        self.translations = translations or {}
+    @cython.cfunc
+    def skipStatements(self, first_only: cython.bint, depth: cython.Py_ssize_t = 0,
+                       mode: cython.int = SCAN_CODE) -> cython.Py_ssize_t:
+        """Scan complete statements without parsing them and return the position right after the last one.
+
+        Stops at the end of the input or at the closing brace of the current class. depth and mode are the
+        state to start in, from scanDepth and scanMode, when resuming a scan that reached the end of the input.
+        """
+        pos: cython.Py_ssize_t = self.currentPosition
+        boundary: cython.Py_ssize_t = pos
+        resume: cython.Py_ssize_t = -1
+        end: cython.Py_ssize_t
+        c: cython.Py_UCS4
 
-        self.data = PyUnicode_DATA(self.input_string)
-        self.data_kind = PyUnicode_KIND(self.input_string)
+        while pos < self.input_string_len:
+            if mode != SCAN_CODE:
+                if mode == SCAN_STRING:
+                    end = self.find(QUOTE_U, QUOTE_B, pos)
+                elif mode == SCAN_LINE_COMMENT:
+                    end = self.find(NEWLINE_U, NEWLINE_B, pos)
+                else:
+                    # pos is on the asterisk, so that `/*/` is a whole comment
+                    end = self.find(END_COMMENT_U, END_COMMENT_B, pos)
+                    if end != -1:
+                        end += 1
+                if end == -1:
+                    # Only the last character can be the start of the end of a block comment
+                    resume = self.input_string_len - 1 if mode == SCAN_BLOCK_COMMENT else self.input_string_len
+                    pos = self.input_string_len
+                    break
+                mode = SCAN_CODE
+                pos = end + 1
+                continue
 
-        result = {}
+            c = PyUnicode_READ(self.data_kind, self.data, pos)
+            if c == QUOTE:
+                mode = SCAN_STRING
+            elif c == SLASH:
+                if pos + 1 >= self.input_string_len:
+                    resume = pos
+                    break
+                c = PyUnicode_READ(self.data_kind, self.data, pos + 1)
+                if c == SLASH:
+                    mode = SCAN_LINE_COMMENT
+                elif c == ASTERISK:
+                    mode = SCAN_BLOCK_COMMENT
+            elif c == CURLY_OPEN:
+                depth += 1
+            elif c == CURLY_CLOSE:
+                if depth == 0:
+                    break
+                depth -= 1
+            elif c == SEMICOLON and depth == 0:
+                boundary = pos + 1
+                if first_only:
+                    break
+            pos += 1
 
+        self.scanResume = pos if resume == -1 else resume
+        self.scanDepth = depth
+        self.scanMode = mode
+        self.currentPosition = pos
+        return boundary
+
+    @cython.cfunc
+    def skipClassValue(self) -> cython.Py_ssize_t:
+        # Returns the position right after the closing brace
+        end: cython.Py_ssize_t
+        self.ensure(self.current() == CURLY_OPEN)
+        self.nextWithoutCommentDetection()
+        self.skipStatements(False)
+        self.ensure(self.current() == CURLY_CLOSE, 'Got EOF while skipping a class')
+        end = self.currentPosition + 1
+        self.next()
+        return end
+
+    @cython.cfunc
+    def skipPropertyValue(self) -> cython.void:
+        # Skips everything up to and including the semicolon ending the current property
+        end: cython.Py_ssize_t = self.skipStatements(True)
+        self.ensure(self.current() == SEMICOLON, 'Got EOF while skipping a value')
+        self.currentPosition = end
         self.detectComment()
+
+    @cython.cfunc
+    def parseSelectedClassValue(self, name, base):
+        # Returns None if nothing inside the class has been selected
+        saved = self.selection
+        child = self.selector.child(saved, name)
+        if child is None:
+            self.skipClassValue()
+            return None
+
+        self.selection = None if child is True else child
+        value = self.parseClassValue(base)
+        self.selection = saved
+
+        if child is True or value:
+            return value
+        return None
+
+    @cython.cfunc
+    def setInput(self, raw) -> cython.void:
+        self.nextComment = -1  # Unknown yet
+
+        if isinstance(raw, str):
+            self.input_string = raw
+            self.input_string_len = len(raw)
+            self.commentLimit = self.input_string_len
+            self.input_buffer = None
+            self.input_view = None
+            self.data = PyUnicode_DATA(self.input_string)
+            self.data_kind = PyUnicode_KIND(self.input_string)
+            return
+
+        if not isinstance(raw, (bytes, bytearray, mmap.mmap)):
+            raise TypeError('Expected str, bytes, bytearray or mmap, got {}'.format(type(raw).__name__))
+
+        # Scan the UTF-8 encoded buffer in place, as a 1-byte kind string.
+        # Keeping the memoryview around pins the buffer for as long as we use it.
+        self.input_string = None
+        self.input_buffer = raw
+        self.input_view = memoryview(raw)
+        self.input_string_len = len(self.input_view)
+        self.commentLimit = self.input_string_len
+        self.data_kind = PyUnicode_1BYTE_KIND
+        if cython.compiled:
+            view = cython.declare(cython.const[cython.uchar][::1], self.input_view)
+            if self.input_string_len:
+                self.data = cython.cast(cython.p_void, cython.address(view[0]))
+        else:
+            self.data = raw
+
+    @cython.cfunc
+    def releaseInput(self) -> cython.void:
+        if self.input_view is not None:
+            self.input_view.release()
+            self.input_view = None
+        self.input_buffer = None
+        self.input_string = None
+        self.data = cython.NULL
+
+    def statementsEnd(self, raw, start, first_only=False, resume=None):
+        """Return the position right after the last complete statement from start, start if there is none.
+
+        When the input ends in the middle of a statement, lastScan() returns the state to pass as resume when
+        calling again with more input, so that the statement is not scanned again from start.
+        """
+        resume_position: cython.Py_ssize_t = start
+        depth: cython.Py_ssize_t = 0
+        mode: cython.int = SCAN_CODE
+        if resume is not None:
+            resume_position, depth, mode = resume
+
+        self.currentPosition = resume_position
+        self.setInput(raw)
+        try:
+            end = self.skipStatements(first_only, depth, mode)
+            return start if end == resume_position else end
+        finally:
+            self.releaseInput()
+
+    def lastScan(self):
+        """(position, depth, mode) of the last statementsEnd() call, where it reached the end of the input."""
+        return self.scanResume, self.scanDepth, self.scanMode
+
+    def statementBoundaries(self, raw, start=0):
+        """Return the end positions of the statements starting at start, up to the end of the current class."""
+        boundaries = []
+        end: cython.Py_ssize_t
+
+        self.currentPosition = start
+        self.setInput(raw)
+        try:
+            while True:
+                end = self.skipStatements(True)
+                if end == start:
+                    return boundaries
+                boundaries.append(end)
+                self.currentPosition = start = end
+        finally:
+            self.releaseInput()
+
+    def classBodyAt(self, raw, start):
+        """If a class with a body is declared at start, return (name, base, body start, body end), otherwise None.
+
+        The body span includes the braces.
+        """
+        self.currentPosition = start
+        self.setInput(raw)
+        try:
+            self.parseWhitespace()
+            if self.parsePropertyName() != 'class':
+                return None
+
+            self.parseWhitespace()
+            name = self.parsePropertyName()
+            base = None
+            self.parseWhitespace()
+            if self.current() == COLON:
+                self.next()
+                self.parseWhitespace()
+                base = self.parsePropertyName()
+                self.parseWhitespace()
+
+            if self.current() != CURLY_OPEN:
+                return None
+
+            start = self.currentPosition
+            end = self.skipClassValue()
+            self.parseWhitespace()
+            self.ensure(self.current() == SEMICOLON)
+            return name, base, start, end
+        finally:
+            self.releaseInput()
+
+    def parseClassAt(self, raw, start, translations, interned=None, intern_max=0, end=-1):
+        """Parse the body of the class whose opening brace is at start.
+
+        end is the position right after its closing brace, when it is known.
+        """
+        self.currentPosition = start
+        self.translations = translations or {}
+        self.interned = interned
+        self.intern_max = intern_max
+        self.selector = self.selection = None
+        self.lazy = True
+        self.patch = False
+        self.fold = False
+        self.positions = None
+        self.numericArrays = False
+        self.numpy = None
+        self.setInput(raw)
+        if end != -1:
+            self.commentLimit = end
+        try:
+            return self.parseClassValue()
+        finally:
+            self.releaseInput()
+
+    def openInput(self, raw, translations, interned=None, intern_max=0, case_insensitive=False):
+        """Prepare parseStatementAt() calls on raw. closeInput() must be called once done."""
+        self.translations = translations or {}
+        self.interned = interned
+        self.intern_max = intern_max
+        self.selector = self.selection = None
+        self.lazy = False
+        self.patch = False
+        self.fold = case_insensitive
+        self.positions = None
+        self.numericArrays = False
+        self.numpy = None
+        self.setInput(raw)
+
+    def parseStatementAt(self, context, start):
+        """Parse the statement at start into context and return the position of the next statement.
+
+        start must be where parse() would be before that statement, after the whitespace and comment preceding it.
+        """
+        self.currentPosition = start
+        self.parseProperty(context)
         self.parseWhitespace()
-        while self.currentPosition < self.input_string_len:
-            self.parseProperty(result)
+        return self.currentPosition
+
+    def closeInput(self):
+        self.releaseInput()
+
+    def parse(self, raw, translations, select=None, lazy=False, patch=False, intern=None, case_insensitive=False,
+              positions=None, numeric_arrays=None):
+        """Parse raw and return the resulting dict.
+
+        With patch=True, a _PatchClass recording the statements in order is returned instead, with
+        `delete` and `+=` statements kept as _DELETE and _Append values.
+        intern is an optional InternTable.
+        With case_insensitive=True, classes are returned as CaseInsensitiveClass objects.
+        positions is an optional SourcePositions in which the offsets of the entries are recorded.
+        numeric_arrays can be 'array' or 'numpy' to return the arrays of numbers as array.array or ndarray.
+        """
+        if lazy and select is not None:
+            raise ValueError('Lazy parsing does not support select')
+        if patch and (lazy or select is not None):
+            raise ValueError('Patches cannot be parsed lazily or partially')
+        if case_insensitive and (lazy or patch):
+            raise ValueError('Lazy classes and patches cannot be case-insensitive')
+        if positions is not None and (lazy or patch):
+            raise ValueError('Lazy classes and patches have no source positions')
+        if numeric_arrays not in (None, 'array', 'numpy'):
+            raise ValueError('Unknown numeric_arrays: {!r}'.format(numeric_arrays))
+        if numeric_arrays is not None and (lazy or patch or positions is not None):
+            raise ValueError('Lazy classes, patches and source positions cannot use numeric arrays')
+
+        self.currentPosition = 0
+        self.translations = translations or {}
+        self.selector = _Selector(select) if select is not None else None
+        self.selection = self.selector.initial if select is not None else None
+        self.lazy = lazy
+        self.patch = patch
+        self.fold = case_insensitive
+        self.positions = positions
+        self.positionParent = self.positionStored = -1
+        self.numericArrays = numeric_arrays is not None
+        self.numpy = None
+        if numeric_arrays == 'numpy':
+            import numpy
+            self.numpy = numpy
+        self.interned = intern.strings if intern is not None else None
+        self.intern_max = intern.max_length if intern is not None else 0
+        self.setInput(raw)
+
+        if patch:
+            result = _PatchClass()
+        elif case_insensitive:
+            result = CaseInsensitiveClass()
+        else:
+            result = {}
+
+        try:
+            self.detectComment()
             self.parseWhitespace()
+            while self.currentPosition < self.input_string_len:
+                if positions is not None:
+                    self.parseRecordedProperty(result)
+                else:
+                    self.parseProperty(result)
+                self.parseWhitespace()
+        finally:
+            self.releaseInput()
 
         return result
 
 
-def parse(raw, *, translations=None):
+class LazyClass(Mapping):
+    """Read-only mapping of a class whose body is only parsed the first time it is accessed.
+
+    Nested classes are lazy as well. The source text is kept alive for as long as the object is.
+    """
+    __slots__ = ('_source', '_start', '_end', '_translations', '_interned', '_intern_max', '_data', 'base')
+
+    def __init__(self, source, start, end, translations=None, base=None, interned=None, intern_max=0):
+        self._source = source
+        self._start = start
+        self._end = end
+        self._translations = translations
+        self._interned = interned
+        self._intern_max = intern_max
+        self._data = None
+        self.base = base
+
+    def _load(self):
+        if self._data is None:
+            self._data = Parser().parseClassAt(self._source, self._start, self._translations, self._interned,
+                                               self._intern_max, self._end)
+        return self._data
+
+    @property
+    def span(self):
+        """(start, end) offsets of the class body, braces included, in the source."""
+        return self._start, self._end
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __contains__(self, key):
+        return key in self._load()
+
+    def __repr__(self):
+        if self._data is None:
+            return '{}(<not parsed, {} characters>)'.format(type(self).__name__, self._end - self._start)
+        return '{}({!r})'.format(type(self).__name__, self._data)
+
+
+# Characters that matter when looking for statement boundaries
+_STRUCTURE = re.compile(r'[";{}/]')
+_WHITESPACE = re.compile(r'[\x00-\x20]*')
+_COMMENT = re.compile(r'//[^\n]*|/\*.*?(?:\*/|$)', re.DOTALL)
+_CLASS_HEADER = re.compile(r'class[\x00-\x20]+([a-zA-Z0-9_.\\]+)[\x00-\x20]*'
+                           r'(?::[\x00-\x20]*([a-zA-Z0-9_.\\]+)[\x00-\x20]*)?$')
+_NAME_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.\\'
+
+
+def _skip_trivia(buf, pos, final):
+    """Skip whitespace and comments. Returns (position, complete)."""
+    n = len(buf)
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos >= n or buf[pos] != SLASH:
+            return pos, True
+
+        if pos + 1 >= n:
+            return pos, final
+
+        following = buf[pos + 1]
+        if following == SLASH:
+            end = buf.find(NEWLINE_U, pos)
+        elif following == ASTERISK:
+            end = buf.find(END_COMMENT_U, pos)
+            if end != -1:
+                end += 2
+        else:
+            return pos, True
+
+        if end == -1:
+            return (n, True) if final else (pos, False)
+        pos = end
+
+
+def _find_class_header_end(buf, pos):
+    """Return the position of the `{` or `;` ending the class header at pos.
+
+    Returns -1 if there is no class declaration at pos and -2 if the header is incomplete.
+    """
+    if not buf.startswith('class', pos):
+        return -1 if len(buf) - pos >= 5 or not 'class'.startswith(buf[pos:]) else -2
+    if pos + 5 >= len(buf):
+        return -2
+    if buf[pos + 5] in _NAME_CHARS:
+        return -1
+
+    while True:
+        match = _STRUCTURE.search(buf, pos)
+        if match is None:
+            return -2
+
+        i = match.start()
+        c = buf[i]
+        if c == CURLY_OPEN or c == SEMICOLON:
+            return i
+        if c != SLASH:
+            return -1
+
+        pos, complete = _skip_trivia(buf, i, False)
+        if not complete:
+            return -2
+        if pos == i:
+            pos += 1
+
+
+def _parse_class_header(header):
+    match = _CLASS_HEADER.match(_COMMENT.sub(' ', header))
+    if match is None:
+        raise ParseError('Invalid class declaration: {}'.format(header[:50]))
+    return match.group(1), match.group(2)
+
+
+class _StatementScanner:
+    """Splits a stream of chunks into statements, tracking the classes that are still open.
+
+    Subclasses receive complete statements in _statements(), and the classes that had to be
+    entered in _start_class() and _end_class().
+    """
+    # Enter every class instead of handing complete classes over to _statements()
+    descend_classes = False
+
+    def __init__(self, translations):
+        self.translations = translations
+        self._parser = Parser()
+        self._decoder = None
+        self._buffer = ''
+        self._names = []
+        # lastScan() of the incomplete statement at the start of the buffer, relative to it
+        self._resume = None
+
+    def feed(self, data):
+        if not isinstance(data, str):
+            if self._decoder is None:
+                self._decoder = codecs.getincrementaldecoder('utf8')(errors='surrogateescape')
+            data = self._decoder.decode(data)
+
+        self._buffer += data
+        self._consume(final=False)
+
+    def _finish(self):
+        if self._decoder is not None:
+            self._buffer += self._decoder.decode(b'', final=True)
+
+        self._consume(final=True)
+        if self._buffer:
+            # Whatever is left is an incomplete statement. Let the parser report what's wrong with it
+            self._parser.parse(self._buffer, self.translations)
+            raise ParseError('Unexpected end of input: {}'.format(self._buffer[:50]))
+
+        if self._names:
+            raise ParseError('Got EOF while parsing class {}'.format(self._names[-1]))
+
+    def _consume(self, final):
+        buf = self._buffer
+        pos = 0
+        resume, self._resume = self._resume, None
+        while True:
+            pos, complete = _skip_trivia(buf, pos, final)
+            if not complete or pos >= len(buf):
+                break
+
+            if buf[pos] == CURLY_CLOSE:
+                end, complete = _skip_trivia(buf, pos + 1, final)
+                if not complete or end >= len(buf):
+                    break
+                if buf[end] != SEMICOLON or not self._names:
+                    raise ParseError('Unexpected value at pos {}'.format(pos))
+                self._end_class(self._names.pop())
+                pos = end + 1
+                continue
+
+            if self.descend_classes:
+                end = _find_class_header_end(buf, pos)
+                if end == -2:
+                    break
+                if end >= 0:
+                    name, base = _parse_class_header(buf[pos:end])
+                    self._start_class(name, base)
+                    if buf[end] == CURLY_OPEN:
+                        self._names.append(name)
+                    else:
+                        self._end_class(name)
+                    pos = end + 1
+                    continue
+
+            end = self._parser.statementsEnd(buf, pos, self.descend_classes, resume)
+            resume = None
+            if end > pos:
+                self._statements(buf[pos:end])
+                pos = end
+                continue
+
+            if self.descend_classes:
+                self._keepScan(pos)
+                break
+
+            # No complete statement: either more data is needed or a class doesn't fit in the buffer yet
+            end = _find_class_header_end(buf, pos)
+            if end < 0 or buf[end] != CURLY_OPEN:
+                self._keepScan(pos)
+                break
+
+            name, base = _parse_class_header(buf[pos:end])
+            self._start_class(name, base)
+            self._names.append(name)
+            pos = end + 1
+
+        self._buffer = buf[pos:]
+
+    def _keepScan(self, start):
+        # The next feed() only scans the new data of the statement at start, which becomes the start of the buffer
+        position, depth, mode = self._parser.lastScan()
+        self._resume = (position - start, depth, mode)
+
+
+class IncrementalParser(_StatementScanner):
+    """Push parser: feed() it chunks of text as they arrive, close() returns the parsed dict.
+
+    Complete statements are parsed as soon as they are available and dropped from the buffer,
+    so the buffer never holds more than the statement currently being received.
+    """
+
+    def __init__(self, *, translations=None):
+        super().__init__(translations)
+        self._stack = [{}]
+
+    def close(self):
+        self._finish()
+        return self._stack[0]
+
+    def _statements(self, text):
+        self._stack[-1].update(self._parser.parse(text, self.translations))
+
+    def _start_class(self, name, base):
+        self._stack[-1][name] = {} if base is None else ConfigClass(base=base)
+        self._stack.append(self._stack[-1][name])
+
+    def _end_class(self, name):
+        self._stack.pop()
+
+
+class _EventParser(_StatementScanner):
+    descend_classes = True
+
+    def __init__(self, translations):
+        super().__init__(translations)
+        self.events = []
+
+    def close(self):
+        self._finish()
+
+    def _statements(self, text):
+        for name, value in self._parser.parse(text, self.translations).items():
+            if isinstance(value, list):
+                self.events.append(('array_start', name))
+                self.events.extend([('array_item', item) for item in value])
+                self.events.append(('array_end', name))
+            else:
+                self.events.append(('property', name, value))
+
+    def _start_class(self, name, base):
+        self.events.append(('start_class', name, base))
+
+    def _end_class(self, name):
+        self.events.append(('end_class', name))
+
+
+def _iter_chunks(source, chunk_size):
+    if isinstance(source, os.PathLike):
+        with open(source, 'rb') as f:
+            yield from _iter_chunks(f, chunk_size)
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for i in range(0, len(source), chunk_size):
+            yield source[i:i + chunk_size]
+
+
+def iterparse(source, *, translations=None, chunk_size=1 << 20):
+    """Parse source incrementally, yielding events instead of building the result.
+
+    source can be a str, bytes-like object, mmap, path or file object.
+    Yields tuples of:
+      ('start_class', name, base), ('end_class', name), ('property', name, value),
+      ('array_start', name), ('array_item', value), ('array_end', name)
+    """
+    parser = _EventParser(translations)
+    for chunk in _iter_chunks(source, chunk_size):
+        parser.feed(chunk)
+        events, parser.events = parser.events, []
+        yield from events
+
+    parser.close()
+    yield from parser.events
+
+
+def parse(raw, *, translations=None, select=None, lazy=False, workers=None, intern=None, container='dict',
+          case_insensitive=False, positions=False, numeric_arrays=None):
+    if positions and (container != 'dict' or (workers is not None and workers > 1)):
+        raise ValueError('Source positions are only tracked when parsing to dicts in a single process')
+    if numeric_arrays is not None and (container != 'dict' or (workers is not None and workers > 1)):
+        raise ValueError('Numeric arrays are only returned when parsing to dicts in a single process')
+
+    if container != 'dict':
+        if container != 'compact':
+            raise ValueError('Unknown container: {!r}'.format(container))
+        if lazy:
+            raise ValueError('Compact trees cannot be parsed lazily')
+        if case_insensitive:
+            raise ValueError('Compact trees cannot be case-insensitive')
+        if intern is not None:
+            raise ValueError('Compact trees store every distinct string once and cannot use an InternTable')
+
+        from .tree import ConfigTree
+        if select is None and (workers is None or workers <= 1):
+            return ConfigTree.from_source(raw, translations=translations)
+        return ConfigTree.from_dict(parse(raw, translations=translations, select=select, workers=workers))
+
+    if workers is not None and workers > 1:
+        if lazy:
+            raise ValueError('Lazy parsing cannot be done in parallel')
+
+        from .parallel import parse_parallel
+        result = parse_parallel(raw, translations=translations, select=select, workers=workers)
+        # Strings coming from other processes can only be interned and indexed afterwards
+        if intern is not None:
+            intern.intern_all(result)
+        return CaseInsensitiveClass.from_dict(result) if case_insensitive else result
+
+    if not cython.compiled and select is None and not lazy and not positions and numeric_arrays is None:
+        # Reading one character at a time is slow in pure Python, RegexParser reads whole statements
+        from .regex_parser import RegexParser
+        return RegexParser().parse(raw, translations, intern, case_insensitive)
+
     p = Parser()
-    return p.parse(raw, translations)
+    if positions:
+        # Returns (result, SourcePositions)
+        source_positions = SourcePositions(raw)
+        return p.parse(raw, translations, select, lazy, False, intern, case_insensitive, source_positions,
+                       numeric_arrays), source_positions
+    return p.parse(raw, translations, select, lazy, False, intern, case_insensitive, None, numeric_arrays)
+
+
+def parse_file(path, *, translations=None, select=None, lazy=False, workers=None, cache_dir=None, intern=None,
+               container='dict', case_insensitive=False, positions=False, numeric_arrays=None):
+    if positions and container != 'dict':
+        raise ValueError('Source positions are only tracked when parsing to dicts in a single process')
+    if numeric_arrays is not None and container != 'dict':
+        raise ValueError('Numeric arrays are only returned when parsing to dicts in a single process')
+    if (positions or numeric_arrays is not None) and cache_dir is not None:
+        raise ValueError('Cached results have no source positions nor numeric arrays')
+
+    if container != 'dict':
+        if container != 'compact':
+            raise ValueError('Unknown container: {!r}'.format(container))
+        if lazy:
+            raise ValueError('Compact trees cannot be parsed lazily')
+        if case_insensitive:
+            raise ValueError('Compact trees cannot be case-insensitive')
+        if intern is not None:
+            raise ValueError('Compact trees store every distinct string once and cannot use an InternTable')
+
+        from .tree import ConfigTree
+        if select is None and (workers is None or workers <= 1) and cache_dir is None:
+            with open(path, 'rb') as f:
+                if f.read(4) != b'\0raP':
+                    f.seek(0)
+                    return ConfigTree.from_source(f, translations=translations)
+        return ConfigTree.from_dict(parse_file(path, translations=translations, select=select, workers=workers,
+                                               cache_dir=cache_dir))
+
+    if cache_dir is not None:
+        if lazy:
+            raise ValueError('Lazy parsing results cannot be cached')
+
+        from .cache import ParseCache
+        result = ParseCache(cache_dir).parse_file(path, translations=translations, select=select, workers=workers)
+        if intern is not None:
+            intern.intern_all(result)
+        return CaseInsensitiveClass.from_dict(result) if case_insensitive else result
+
+    with open(path, 'rb') as f:
+        try:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files cannot be mapped
+            return parse(b'', translations=translations, select=select, case_insensitive=case_insensitive,
+                         positions=positions, numeric_arrays=numeric_arrays)
+
+        if source[:4] == b'\0raP':
+            from .rap_parser import parse_rap
+            if positions or numeric_arrays is not None:
+                source.close()
+                raise ValueError('raP files have no source positions nor numeric arrays')
+            try:
+                result = parse_rap(source, translations=translations, select=select, intern=intern)
+                return CaseInsensitiveClass.from_dict(result) if case_insensitive else result
+            finally:
+                source.close()
+
+        try:
+            result = parse(source, translations=translations, select=select, lazy=lazy, workers=workers,
+                           intern=intern, case_insensitive=case_insensitive, positions=positions,
+                           numeric_arrays=numeric_arrays)
+            if positions:
+                result[1].detach()  # The mapping is about to be closed
+            return result
+        finally:
+            # Lazy classes still need the mapping. It gets closed once they are all gone
+            if not lazy:
+                source.close()
@@ -0,0 +1,135 @@
+from array import array
+from bisect import bisect_right
+
+NEWLINE_U = '\n'
+NEWLINE_B = b'\n'
+
+
+class SourcePositions:
+    """Where each entry of a parsed config is located in its source.
+
+    Entries are numbered in the order they appear in the source. Entry i is described by parents[i] (the
+    number of the class or array containing it, -1 at the top level), names[i] (its name, or its index for
+    an array item) and the starts[i] and ends[i] offsets. A property spans from its name to its semicolon,
+    a class from the `class` keyword to its semicolon and an array item covers its value.
+
+    Offsets are in characters for str sources and in bytes for bytes-like ones. Lines and columns are
+    computed from an index of the line starts that is only built when first needed.
+    """
+
+    def __init__(self, source):
+        self.parents = array('q')
+        self.starts = array('q')
+        self.ends = array('q')
+        self.names = []
+        self._source = source
+        self._line_starts = None
+        self._index = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return '<{} of {} entries>'.format(type(self).__name__, len(self))
+
+    # Called by the parser. Entries are opened before their contents are parsed, so they stay in order
+    def open(self, parent, start):
+        self.parents.append(parent)
+        self.starts.append(start)
+        self.ends.append(-1)
+        self.names.append(None)
+        return len(self.names) - 1
+
+    def close(self, index, name, end):
+        self.names[index] = name
+        self.ends[index] = end
+
+    def truncate(self, index):
+        """Forget entry index and everything after it, for statements that turn out not to be kept."""
+        del self.parents[index:]
+        del self.starts[index:]
+        del self.ends[index:]
+        del self.names[index:]
+
+    def detach(self):
+        """Index the line starts now and release the source, which may be closed afterwards."""
+        self.line_starts()
+        self._source = None
+
+    def splice(self, first, last, other, base, delta, source):
+        """Replace entries first to last (excluded) with the entries of other, after the source was edited.
+
+        The offsets of other are relative to base and its top level entries become children of entry
+        first - 1, which contains the edit. The offsets of the entries after them, and the end of entry
+        first - 1 and of the entries containing it, are moved by delta.
+        """
+        shift = len(other) - (last - first)
+        parents, starts, ends = self.parents, self.starts, self.ends
+        index = first - 1
+        while index != -1:
+            ends[index] += delta
+            index = parents[index]
+
+        if shift:
+            parents[last:] = array('q', [parent + shift if parent >= last else parent for parent in parents[last:]])
+        if delta:
+            starts[last:] = array('q', [start + delta for start in starts[last:]])
+            ends[last:] = array('q', [end + delta for end in ends[last:]])
+
+        parents[first:last] = array('q', [first - 1 if parent == -1 else parent + first for parent in other.parents])
+        starts[first:last] = array('q', [start + base for start in other.starts])
+        ends[first:last] = array('q', [end + base for end in other.ends])
+        self.names[first:last] = other.names
+
+        self._source = source
+        self._line_starts = None
+        self._index = None
+
+    def line_starts(self):
+        if self._line_starts is None:
+            source = self._source
+            newline = NEWLINE_U if isinstance(source, str) else NEWLINE_B
+            starts = array('q', [0])
+            pos = source.find(newline)
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = source.find(newline, pos + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    def line_column(self, offset):
+        """Return the (line, column) of offset, both starting at 1."""
+        line_starts = self.line_starts()
+        line = bisect_right(line_starts, offset)
+        return line, offset - line_starts[line - 1] + 1
+
+    def child(self, parent, name):
+        """Return the number of the entry called name in entry parent (-1 for the top level), or -1.
+
+        Names are case-insensitive. When a name is defined several times, the last definition is found.
+        """
+        if self._index is None:
+            self._index = {(parent, name.lower() if isinstance(name, str) else str(name)): index
+                           for index, (parent, name) in enumerate(zip(self.parents, self.names))}
+        return self._index.get((parent, str(name).lower()), -1)
+
+    def find(self, path):
+        """Return the number of the entry at path, like `CfgVehicles/Car/sounds/0`, or a sequence of names."""
+        if isinstance(path, str):
+            path = path.strip('/').split('/')
+
+        index = -1
+        for name in path:
+            index = self.child(index, name)
+            if index == -1:
+                raise KeyError(name)
+        return index
+
+    def span(self, path):
+        """Return the (start, end) offsets of the entry at path."""
+        index = self.find(path)
+        return self.starts[index], self.ends[index]
+
+    def location(self, path):
+        """Return the (line, column) at which the entry at path starts."""
+        return self.line_column(self.starts[self.find(path)])
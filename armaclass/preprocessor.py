@@ -0,0 +1,385 @@
+import os
+import re
+
+from .parser import IncrementalParser, ParseError
+
+# Runs of code and strings are matched first, so that comment markers inside strings are left alone
+COMMENT = re.compile(r'((?:[^"/]+|"[^"\n]*"|/(?![/*]))+)|//[^\n]*|/\*.*?\*/', re.DOTALL)
+DIRECTIVE_LINE = re.compile(r'^[ \t]*#(?:\\\n|[^\n])*', re.MULTILINE)
+CONTINUED_LINES = re.compile(r'(?:[^\n]*\\\n)+[^\n]*')
+STRING_OR_NAME = re.compile(r'"[^"\n]*"|([A-Za-z_][A-Za-z0-9_]*)')
+BODY_TOKEN = re.compile(r'"[^"\n]*"|##|#\s*([A-Za-z_][A-Za-z0-9_]*)|([A-Za-z_][A-Za-z0-9_]*)')
+DIRECTIVE = re.compile(r'\s*#\s*([a-z]*)\s*(.*)', re.DOTALL)
+DEFINE = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)(\(([^)]*)\))?\s*(.*)', re.DOTALL)
+INCLUDE = re.compile(r'"([^"]+)"|<([^>]+)>')
+
+# Entries of a tokenised file
+TEXT = 0
+DEFINE_MACRO = 1
+UNDEF = 2
+IFDEF = 3
+IFNDEF = 4
+ELSE = 5
+ENDIF = 6
+INCLUDE_FILE = 7
+IF = 8
+UNKNOWN = 9
+
+# Parts of a macro body
+PARAM = 0
+STRINGIFY = 1
+
+MAX_INCLUDE_DEPTH = 32
+CHUNK_SIZE = 1 << 16
+
+
+class _Macro:
+    __slots__ = ('name', 'params', 'parts')
+
+    def __init__(self, name, params, body):
+        self.name = name
+        self.params = params
+        self.parts = self._compile(body, {param: i for i, param in enumerate(params or ())})
+        if params is None:
+            self.parts = ''.join(self.parts)
+
+    @staticmethod
+    def _compile(body, params):
+        parts = []
+        text = []
+        pos = 0
+        paste = False
+        for match in BODY_TOKEN.finditer(body):
+            text.append(body[pos:match.start()])
+            pos = match.end()
+            token = match.group()
+
+            if token == '##':
+                # Pasting just drops the whitespace around ## as the arguments are already expanded
+                text[-1] = text[-1].rstrip()
+                paste = True
+                continue
+
+            if paste:
+                text[-1] = text[-1].lstrip()
+                paste = False
+
+            index = params.get(match.group(1) or match.group(2))
+            if index is None:
+                text.append(token)
+                continue
+
+            parts.append(''.join(text))
+            text = []
+            parts.append((STRINGIFY if match.group(1) else PARAM, index))
+
+        text.append(body[pos:])
+        if paste:
+            text[-1] = text[-1].lstrip()
+        parts.append(''.join(text))
+        return [part for part in parts if part != '']
+
+
+class Preprocessor:
+    """Preprocesses configs the way Arma does: #include, #define (with # and ## in function-like macros),
+    #undef, #ifdef, #ifndef, #if, #else, #endif, comments and line continuations.
+
+    Like in Arma, macro arguments are expanded before they are substituted, also when they are
+    stringified or pasted. Nothing is expanded inside strings.
+
+    Included files are tokenised once and cached, so they can be included by any number of files preprocessed
+    by the same Preprocessor. Every file starts with the macros given in `defines`.
+    `include_paths` are the directories in which includes starting with a backslash (like
+    `\\x\\cba\\addons\\main\\script_macros_common.hpp`) and those not found next to the including file are
+    looked up.
+    """
+
+    def __init__(self, include_paths=(), defines=None):
+        self.include_paths = [os.fspath(path) for path in include_paths]
+        self.defines = {name: _Macro(name, None, body) for name, body in (defines or {}).items()}
+        self._files = {}
+        self._includes = {}
+
+    def preprocess(self, text, path=None):
+        """Return the preprocessed text. path is used to find the files included with relative paths."""
+        return ''.join(self.iter_preprocess(text, path))
+
+    def preprocess_file(self, path):
+        return ''.join(self.iter_preprocess_file(path))
+
+    def iter_preprocess(self, text, path=None):
+        """Yield the preprocessed text in chunks."""
+        entries = self.tokenise(text)
+        directory = os.path.dirname(os.path.abspath(path)) if path is not None else os.getcwd()
+        return self._chunks(self._run(entries, directory, dict(self.defines), 0))
+
+    def iter_preprocess_file(self, path):
+        path = os.path.abspath(os.fspath(path))
+        return self._chunks(self._run(self._load(path), os.path.dirname(path), dict(self.defines), 0))
+
+    def parse(self, text, path=None, *, translations=None):
+        return self._parse(self.iter_preprocess(text, path), translations)
+
+    def parse_file(self, path, *, translations=None):
+        """Preprocess the file and parse the result as it is produced."""
+        return self._parse(self.iter_preprocess_file(path), translations)
+
+    @staticmethod
+    def _parse(chunks, translations):
+        parser = IncrementalParser(translations=translations)
+        for chunk in chunks:
+            parser.feed(chunk)
+        return parser.close()
+
+    @staticmethod
+    def _chunks(pieces):
+        buffered = []
+        size = 0
+        for piece in pieces:
+            buffered.append(piece)
+            size += len(piece)
+            if size >= CHUNK_SIZE:
+                yield ''.join(buffered)
+                buffered = []
+                size = 0
+        if buffered:
+            yield ''.join(buffered)
+
+    def _load(self, path):
+        entries = self._files.get(path)
+        if entries is None:
+            with open(path, 'rb') as f:
+                text = f.read().decode('utf8', 'surrogateescape')
+            entries = self._files[path] = self.tokenise(text.lstrip('\ufeff'))
+        return entries
+
+    @staticmethod
+    def tokenise(text):
+        """Split text into blocks of text and parsed directives, with comments removed."""
+        if '\r' in text:
+            text = text.replace('\r\n', '\n')
+        if '//' in text or '/*' in text:
+            text = COMMENT.sub(_strip_comment, text)
+
+        entries = []
+        pos = 0
+        for match in DIRECTIVE_LINE.finditer(text) if '#' in text else ():
+            if match.start() > pos:
+                entries.append((TEXT, _join_continuations(text[pos:match.start()])))
+
+            line = match.group()
+            newlines = line.count('\n')
+            pos = match.end()
+            if pos < len(text):  # Skip the newline ending the directive
+                newlines += 1
+                pos += 1
+            entries.append(_directive(line.replace('\\\n', '')) + ('\n' * newlines,))
+
+        if pos < len(text):
+            entries.append((TEXT, _join_continuations(text[pos:])))
+        return entries
+
+    def _run(self, entries, directory, macros, depth):
+        stack = []
+        active = True
+        for entry in entries:
+            kind = entry[0]
+            if kind == TEXT:
+                if active:
+                    yield from self._expansion(entry[1], macros, frozenset())
+                else:
+                    yield '\n' * entry[1].count('\n')
+                continue
+
+            if kind == IFDEF or kind == IFNDEF:
+                stack.append(active)
+                active = active and (entry[1] in macros) == (kind == IFDEF)
+            elif kind == IF:
+                stack.append(active)
+                active = active and self._condition(entry[1], macros)
+            elif kind == ELSE:
+                if not stack:
+                    raise ParseError('#else without #if')
+                active = stack[-1] and not active
+            elif kind == ENDIF:
+                if not stack:
+                    raise ParseError('#endif without #if')
+                active = stack.pop()
+            elif not active:
+                pass
+            elif kind == UNKNOWN:
+                raise ParseError('Unknown preprocessor directive: {}'.format(entry[1]))
+            elif kind == DEFINE_MACRO:
+                macros[entry[1].name] = entry[1]
+            elif kind == UNDEF:
+                macros.pop(entry[1], None)
+            elif kind == INCLUDE_FILE:
+                if depth >= MAX_INCLUDE_DEPTH:
+                    raise ParseError('Too many nested includes: {}'.format(entry[1]))
+                path = self._resolve(entry[1], directory)
+                yield from self._run(self._load(path), os.path.dirname(path), macros, depth + 1)
+
+            yield entry[-1]
+
+        if stack:
+            raise ParseError('Unterminated #if')
+
+    def _condition(self, expression, macros):
+        # Arma only supports #if with a single value, such as #if __A3_DEBUG__
+        value = self._expand(expression, macros, frozenset()).strip()
+        try:
+            return int(value) != 0
+        except ValueError:
+            raise ParseError('Unsupported #if condition: {}'.format(expression)) from None
+
+    def _resolve(self, name, directory):
+        key = (name, directory)
+        path = self._includes.get(key)
+        if path is not None:
+            return path
+
+        relative = name.replace('\\', '/')
+        if relative.startswith('/'):
+            candidates = [os.path.join(root, relative.lstrip('/')) for root in self.include_paths]
+        else:
+            candidates = [os.path.join(root, relative) for root in [directory] + self.include_paths]
+
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                path = self._includes[key] = os.path.normpath(candidate)
+                return path
+        raise ParseError('Included file not found: {}'.format(name))
+
+    def _expand(self, text, macros, disabled):
+        return ''.join(self._expansion(text, macros, disabled))
+
+    def _expansion(self, text, macros, disabled):
+        # Yields the pieces of the expansion, so that big blocks of text can be streamed
+        pos = 0
+        get = macros.get
+        for match in STRING_OR_NAME.finditer(text):
+            name = match.group(1)
+            if name is None:
+                continue
+            macro = get(name)
+            if macro is None or match.start() < pos or name in disabled:
+                continue
+
+            yield text[pos:match.start()]
+            pos = match.end()
+            if macro.params is None:
+                yield from self._expansion(macro.parts, macros, disabled | {name})
+                continue
+
+            args, end = _arguments(text, pos)
+            if args is None:  # Not a macro call
+                yield name
+                continue
+            if len(args) != len(macro.params) and not (args == [''] and not macro.params):
+                raise ParseError('Macro {} expects {} arguments, got {}'.format(
+                    name, len(macro.params), len(args)))
+
+            pos = end
+            expanded = [self._expand(arg, macros, disabled) for arg in args]
+            body = []
+            for part in macro.parts:
+                if isinstance(part, str):
+                    body.append(part)
+                elif part[0] == PARAM:
+                    body.append(expanded[part[1]])
+                else:
+                    body.append('"{}"'.format(expanded[part[1]]))
+            yield from self._expansion(''.join(body), macros, disabled | {name})
+
+        yield text[pos:]
+
+
+def _strip_comment(match):
+    if match.group(1) is not None:
+        return match.group(1)
+    # Keep the line numbers of what follows a block comment
+    return '\n' * match.group().count('\n')
+
+
+def _join_lines(match):
+    lines = match.group()
+    return lines.replace('\\\n', '') + '\n' * lines.count('\n')
+
+
+def _join_continuations(text):
+    if '\\\n' not in text:
+        return text
+    return CONTINUED_LINES.sub(_join_lines, text)
+
+
+def _directive(line):
+    match = DIRECTIVE.match(line)
+    name, argument = match.group(1), match.group(2).strip()
+
+    if name == 'define':
+        definition = DEFINE.match(argument)
+        if definition is None:
+            raise ParseError('Invalid #define: {}'.format(line.strip()))
+        params = None
+        if definition.group(2) is not None:
+            params = tuple(param.strip() for param in definition.group(3).split(','))
+            if params == ('',):
+                params = ()
+        name = definition.group(1)
+        return DEFINE_MACRO, _Macro(name, params, definition.group(4).strip())
+    elif name == 'include':
+        include = INCLUDE.fullmatch(argument)
+        if include is None:
+            raise ParseError('Invalid #include: {}'.format(line.strip()))
+        return INCLUDE_FILE, include.group(1) or include.group(2)
+    elif name == 'if':
+        return IF, argument
+    elif name in ('ifdef', 'ifndef', 'undef'):
+        if not argument:
+            raise ParseError('Missing macro name: {}'.format(line.strip()))
+        return {'ifdef': IFDEF, 'ifndef': IFNDEF, 'undef': UNDEF}[name], argument.split()[0]
+    elif name == 'else':
+        return (ELSE,)
+    elif name == 'endif':
+        return (ENDIF,)
+    # Only an error if it is not skipped
+    return UNKNOWN, line.strip()
+
+
+def _arguments(text, pos):
+    # Return the arguments of the macro call starting at pos, and the position after it
+    length = len(text)
+    start = pos
+    while start < length and text[start] in ' \t':
+        start += 1
+    if start >= length or text[start] != '(':
+        return None, pos
+
+    args = []
+    depth = 0
+    arg_start = start + 1
+    i = start + 1
+    while i < length:
+        char = text[i]
+        if char == '"':
+            end = text.find('"', i + 1)
+            if end == -1:
+                break
+            i = end
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            if depth == 0:
+                args.append(text[arg_start:i].strip())
+                return args, i + 1
+            depth -= 1
+        elif char == ',' and depth == 0:
+            args.append(text[arg_start:i].strip())
+            arg_start = i + 1
+        i += 1
+    raise ParseError('Unterminated macro call: {}'.format(text[pos:pos + 50]))
+
+
+def preprocess(text, *, path=None, include_paths=(), defines=None):
+    """Preprocess text with a new Preprocessor. Use a Preprocessor directly to cache includes between calls."""
+    return Preprocessor(include_paths, defines).preprocess(text, path)
@@ -0,0 +1,172 @@
+import io
+import struct
+from collections.abc import Mapping
+
+from .arma_writer import _NOT_SCALARS
+from .rap_parser import (RAP_MAGIC, CLASS, VALUE, ARRAY, STRING, FLOAT, INT, NESTED_ARRAY, EXPRESSION,
+                         INT64)
+
+_UINT32 = struct.Struct('<I')
+_INT32 = struct.Struct('<i')
+_INT64 = struct.Struct('<q')
+_FLOAT = struct.Struct('<f')
+
+HEADER_SIZE = 16
+
+
+def _asciiz(s):
+    encoded = s.encode('utf8', 'surrogateescape')
+    if b'\0' in encoded:
+        raise ValueError('raP strings cannot contain NUL characters: {!r}'.format(s))
+    return encoded + b'\0'
+
+
+def _compressed_int(n):
+    result = bytearray()
+    while n >= 0x80:
+        result.append(n & 0x7f | 0x80)
+        n >>= 7
+    result.append(n)
+    return result
+
+
+def _float32(value):
+    # The packed float, None when it is too large for 32 bits
+    try:
+        return _FLOAT.pack(value)
+    except OverflowError:
+        return None
+
+
+def _number_expression(value):
+    # Text read back as the same number: floats need a dot, or `1e+300` would be read as a string
+    text = repr(value)
+    if isinstance(value, float) and '.' not in text:
+        mantissa, _, exponent = text.partition('e')
+        text = mantissa + '.0e' + exponent
+    return text
+
+
+def _array_items(value):
+    # The items of lists and tuples, or of array.array and ndarray values. None for anything else
+    if isinstance(value, (list, tuple)):
+        return value
+    if hasattr(value, 'tolist') and not isinstance(value, _NOT_SCALARS):
+        return value.tolist()
+    return None
+
+
+class RapGenerator:
+    """Writes data as a binarized (raP) config.
+
+    Class bodies are written in pre-order: a class body is followed by the bodies of its subclasses. The
+    sizes of all the subtrees are computed first, so that each body can be written as soon as it is encoded.
+    """
+
+    def __init__(self):
+        self._body_sizes = {}
+        self._subtree_sizes = {}
+
+    def generate(self, data, fp):
+        root_size = self.subtree_size(data)
+        fp.write(RAP_MAGIC + _UINT32.pack(0) + _UINT32.pack(8) + _UINT32.pack(HEADER_SIZE + root_size))
+        self.write_class(data, HEADER_SIZE, fp)
+        fp.write(_UINT32.pack(0))  # Empty enum table
+
+    def subtree_size(self, data):
+        key = id(data)
+        size = self._subtree_sizes.get(key)
+        if size is None:
+            # Offsets have a fixed size, so a dummy one is enough to get the size of the body
+            body_size = self._body_sizes[key] = len(self.encode_body(data, 0))
+            size = body_size
+            for value in data.values():
+                if isinstance(value, Mapping):
+                    size += self.subtree_size(value)
+            self._subtree_sizes[key] = size
+        return size
+
+    def write_class(self, data, offset, fp):
+        offset += self._body_sizes[id(data)]
+        fp.write(self.encode_body(data, offset))
+
+        for value in data.values():
+            if isinstance(value, Mapping):
+                self.write_class(value, offset, fp)
+                offset += self._subtree_sizes[id(value)]
+
+    def encode_body(self, data, child_offset):
+        # child_offset is the position of the body of the first subclass, the others follow it
+        body = bytearray(_asciiz(getattr(data, 'base', None) or ''))
+        body += _compressed_int(len(data))
+        for name, value in data.items():
+            name = _asciiz(name)
+            if isinstance(value, Mapping):
+                body.append(CLASS)
+                body += name
+                body += _UINT32.pack(child_offset)
+                if child_offset:
+                    child_offset += self._subtree_sizes[id(value)]
+            elif _array_items(value) is not None:
+                body.append(ARRAY)
+                body += name
+                self.encode_array(_array_items(value), body)
+            else:
+                body.append(VALUE)
+                body.append(self.value_subtype(value))
+                body += name
+                self.encode_value(value, body)
+        return body
+
+    def value_subtype(self, value):
+        if isinstance(value, bool):
+            return EXPRESSION
+        elif isinstance(value, int):
+            if -2**31 <= value < 2**31:
+                return INT
+            # Integers that do not fit in 64 bits are written as text, which reads back as the same int
+            return INT64 if -2**63 <= value < 2**63 else EXPRESSION
+        elif isinstance(value, float):
+            return FLOAT if _float32(value) is not None else EXPRESSION
+        elif isinstance(value, str):
+            return STRING
+        raise Exception('Can\'t handle item type: {}'.format(type(value)))
+
+    def encode_value(self, value, out):
+        subtype = self.value_subtype(value)
+        if subtype == INT:
+            out += _INT32.pack(value)
+        elif subtype == INT64:
+            out += _INT64.pack(value)
+        elif subtype == FLOAT:
+            out += _float32(value)
+        elif isinstance(value, bool):
+            out += b'true\0' if value else b'false\0'
+        elif subtype == EXPRESSION:
+            out += _asciiz(_number_expression(value))
+        else:
+            out += _asciiz(value)
+
+    def encode_array(self, data, out):
+        out += _compressed_int(len(data))
+        for value in data:
+            items = _array_items(value)
+            if items is not None:
+                out.append(NESTED_ARRAY)
+                self.encode_array(items, out)
+            else:
+                out.append(self.value_subtype(value))
+                self.encode_value(value, out)
+
+
+def generate_rap(data, fp=None):
+    """Write data as a binarized (raP) config to the binary file object fp.
+
+    Returns the bytes instead when fp is not given.
+    """
+    if fp is None:
+        fp = io.BytesIO()
+        RapGenerator().generate(data, fp)
+        return fp.getvalue()
+
+    RapGenerator().generate(data, fp)
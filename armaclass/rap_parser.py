@@ -0,0 +1,384 @@
+import gc
+import mmap
+import struct
+
+try:
+    import cython
+except ModuleNotFoundError:
+    from .cython_stubs import cython, PyUnicode_DecodeUTF8
+
+if cython.compiled:
+    from cython.cimports.cpython import PyUnicode_DecodeUTF8
+    from cython.cimports.libc.string import memchr, memcpy
+else:
+    from .cython_stubs import cython, PyUnicode_DecodeUTF8
+
+from .parser import ConfigClass, ParseError, _Append, _DELETE, _EXTERN, _PatchClass, _Selector
+
+RAP_MAGIC = b'\0raP'
+
+# Entry types
+CLASS = 0
+VALUE = 1
+ARRAY = 2
+EXTERN = 3
+DELETE = 4
+ARRAY_WITH_FLAGS = 5
+
+# Flags of ARRAY_WITH_FLAGS entries
+APPEND = 1
+
+# Value subtypes
+STRING = 0
+FLOAT = 1
+INT = 2
+NESTED_ARRAY = 3
+EXPRESSION = 4
+INT64 = 6
+
+# Deepest nesting of classes and arrays that is read, corrupt files could otherwise exhaust the stack
+MAX_DEPTH = 256
+
+_UINT32 = struct.Struct('<I')
+_INT32 = struct.Struct('<i')
+_INT64 = struct.Struct('<q')
+_FLOAT = struct.Struct('<f')
+
+
+def _shortest_float(bits, value):
+    # Return the shortest decimal that maps to the same float32, so that 0.1f gives 0.1 like the text parser
+    packed = _UINT32.pack(bits)
+    for precision in (6, 7, 8):
+        shortest = float('{:.{}g}'.format(value, precision))
+        if _FLOAT.pack(shortest) == packed:
+            return shortest
+    return float('{:.9g}'.format(value))
+
+
+def _guess_expression(s):
+    # Binarized expressions are whatever the text parser would have passed to guessExpression
+    s = s.strip()
+    lower = s.lower()
+    if lower == 'true':
+        return True
+    elif lower == 'false':
+        return False
+    elif s.startswith('0x'):
+        try:
+            return int(s, 16)
+        except ValueError:
+            return s
+    elif '.' in s:
+        try:
+            return float(s)
+        except ValueError:
+            return s
+    else:
+        try:
+            return int(s)
+        except ValueError:
+            return s
+
+
+@cython.cclass
+class RapReader:
+    pos: cython.Py_ssize_t
+    length: cython.Py_ssize_t
+    data: object
+    view: object
+    translations: dict
+    selector: object
+    floats: dict
+    interned: dict
+    intern_max: cython.Py_ssize_t
+    # Offsets of the class bodies read so far, each one can only be read once
+    classOffsets: set
+    depth: cython.Py_ssize_t
+    # Return _PatchClass objects keeping `delete`, `class Foo;` and `+=` like Parser does with patch=True
+    patch: cython.bint
+
+    buffer: cython.p_uchar
+
+    def __init__(self, data, translations=None, select=None, intern=None, patch=False):
+        if not isinstance(data, (bytes, bytearray, mmap.mmap)):
+            raise TypeError('Expected bytes, bytearray or mmap, got {}'.format(type(data).__name__))
+        if patch and select is not None:
+            raise ValueError('Patches cannot be read partially')
+
+        self.data = data
+        self.translations = translations or {}
+        self.selector = _Selector(select) if select is not None else None
+        self.floats = {}
+        self.interned = intern.strings if intern is not None else None
+        self.intern_max = intern.max_length if intern is not None else 0
+        self.pos = 0
+        self.classOffsets = set()
+        self.depth = 0
+        self.patch = patch
+
+    def read(self):
+        self.setBuffer()
+
+        # Only containers are created, none of which can be garbage yet, so collections would be wasted
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if self.length < 16 or self.data[:4] != RAP_MAGIC:
+                raise ParseError('Not a raP file')
+
+            self.pos = 16
+            self.classOffsets = {16}
+            self.depth = 0
+            return self.readClass(self.selector.initial if self.selector is not None else None)
+        finally:
+            if gc_enabled:
+                gc.enable()
+            self.buffer = cython.NULL
+            self.view.release()
+
+    @cython.cfunc
+    def setBuffer(self) -> cython.void:
+        # Keeping the memoryview around pins the buffer for as long as we use it
+        self.view = memoryview(self.data)
+        self.length = len(self.view)
+        if cython.compiled:
+            view = cython.declare(cython.const[cython.uchar][::1], self.view)
+            if self.length:
+                self.buffer = cython.cast(cython.p_uchar, cython.address(view[0]))
+
+    @cython.cfunc
+    @cython.inline
+    def need(self, size: cython.Py_ssize_t) -> cython.void:
+        if self.pos + size > self.length:
+            raise ParseError('Unexpected end of raP data at position {}'.format(self.pos))
+
+    @cython.cfunc
+    def readByte(self) -> cython.int:
+        byte: cython.int
+        self.need(1)
+        if cython.compiled:
+            byte = self.buffer[self.pos]
+        else:
+            byte = self.data[self.pos]
+        self.pos += 1
+        return byte
+
+    @cython.cfunc
+    def readUInt32(self) -> cython.uint:
+        value: cython.uint
+        self.need(4)
+        if cython.compiled:
+            p = cython.declare(cython.p_uchar, self.buffer + self.pos)
+            value = p[0] | (p[1] << 8) | (p[2] << 16) | (cython.cast(cython.uint, p[3]) << 24)
+        else:
+            value = _UINT32.unpack_from(self.data, self.pos)[0]
+        self.pos += 4
+        return value
+
+    @cython.cfunc
+    def readInt32(self) -> cython.int:
+        if cython.compiled:
+            return cython.cast(cython.int, self.readUInt32())
+        else:
+            self.need(4)
+            self.pos += 4
+            return _INT32.unpack_from(self.data, self.pos - 4)[0]
+
+    @cython.cfunc
+    def readInt64(self) -> cython.longlong:
+        low: cython.ulonglong
+        if cython.compiled:
+            low = self.readUInt32()
+            return cython.cast(cython.longlong, low | (cython.cast(cython.ulonglong, self.readUInt32()) << 32))
+        else:
+            self.need(8)
+            self.pos += 8
+            return _INT64.unpack_from(self.data, self.pos - 8)[0]
+
+    @cython.cfunc
+    def readCompressedInt(self) -> cython.Py_ssize_t:
+        result: cython.Py_ssize_t = 0
+        shift: cython.int = 0
+        byte: cython.int
+        while True:
+            byte = self.readByte()
+            result |= cython.cast(cython.Py_ssize_t, byte & 0x7f) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+            if shift > 56:
+                raise ParseError('Invalid compressed integer at position {}'.format(self.pos))
+
+    @cython.cfunc
+    def readString(self) -> str:
+        end: cython.Py_ssize_t
+        start: cython.Py_ssize_t = self.pos
+        if cython.compiled:
+            p = cython.declare(cython.p_void, cython.NULL)
+            if start < self.length:
+                p = memchr(self.buffer + start, 0, self.length - start)
+            if p == cython.NULL:
+                raise ParseError('Unterminated string at position {}'.format(start))
+            end = cython.cast(cython.p_uchar, p) - self.buffer
+            self.pos = end + 1
+            return PyUnicode_DecodeUTF8(cython.cast(cython.p_char, self.buffer + start), end - start,
+                                        b'surrogateescape')
+        else:
+            end = self.data.find(b'\0', start)
+            if end == -1:
+                raise ParseError('Unterminated string at position {}'.format(start))
+            self.pos = end + 1
+            return PyUnicode_DecodeUTF8(self.data[start:end], end - start, 'surrogateescape')
+
+    @cython.cfunc
+    def readName(self) -> str:
+        name: str = self.readString()
+        if self.interned is None:
+            return name
+        existing = self.interned.get(name)
+        if existing is None:
+            self.interned[name] = name
+            return name
+        return existing
+
+    @cython.cfunc
+    def readFloat(self):
+        bits: cython.uint = self.readUInt32()
+        value = self.floats.get(bits)
+        if value is None:
+            if cython.compiled:
+                f: cython.float
+                memcpy(cython.address(f), cython.address(bits), 4)
+                value = _shortest_float(bits, f)
+            else:
+                value = _shortest_float(bits, _FLOAT.unpack(_UINT32.pack(bits))[0])
+            self.floats[bits] = value
+        return value
+
+    @cython.cfunc
+    def readValue(self, subtype: cython.int):
+        if subtype == STRING:
+            value = self.readString()
+            if self.translations and value.startswith('$STR'):
+                return self.translations.get(value[1:], value)
+            if self.interned is not None and len(value) <= self.intern_max:
+                existing = self.interned.get(value)
+                if existing is None:
+                    self.interned[value] = value
+                    return value
+                return existing
+            return value
+        elif subtype == FLOAT:
+            return self.readFloat()
+        elif subtype == INT:
+            return self.readInt32()
+        elif subtype == NESTED_ARRAY:
+            return self.readArray()
+        elif subtype == EXPRESSION:
+            return _guess_expression(self.readString())
+        elif subtype == INT64:
+            return self.readInt64()
+        raise ParseError('Unknown value type {} at position {}'.format(subtype, self.pos - 1))
+
+    @cython.cfunc
+    def enter(self) -> cython.void:
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise ParseError('Nested more than {} levels deep at position {}'.format(MAX_DEPTH, self.pos))
+
+    @cython.cfunc
+    def readArray(self) -> list:
+        count: cython.Py_ssize_t = self.readCompressedInt()
+        i: cython.Py_ssize_t
+        result: list = []
+        self.enter()
+        for i in range(count):
+            result.append(self.readValue(self.readByte()))
+        self.depth -= 1
+        return result
+
+    @cython.cfunc
+    def readClassAt(self, offset: cython.Py_ssize_t, selection):
+        saved: cython.Py_ssize_t = self.pos
+        if offset < 16 or offset >= self.length:
+            raise ParseError('Invalid class offset {} at position {}'.format(offset, self.pos - 4))
+        if offset in self.classOffsets:
+            raise ParseError('Class at offset {} read twice, at position {}'.format(offset, self.pos - 4))
+
+        self.classOffsets.add(offset)
+        self.pos = offset
+        self.enter()
+        result = self.readClass(selection)
+        self.depth -= 1
+        self.pos = saved
+        return result
+
+    @cython.cfunc
+    def readClass(self, selection):
+        count: cython.Py_ssize_t
+        i: cython.Py_ssize_t
+        entry_type: cython.int
+        subtype: cython.int
+        flags: cython.uint
+        base = self.readName()
+        if self.patch:
+            result = _PatchClass(base or None)
+        else:
+            result = ConfigClass(base=base) if base else {}
+        count = self.readCompressedInt()
+        for i in range(count):
+            entry_type = self.readByte()
+
+            if entry_type == VALUE:
+                subtype = self.readByte()
+                name = self.readName()
+                value = self.readValue(subtype)
+            elif entry_type == CLASS:
+                name = self.readName()
+                offset = self.readUInt32()
+                if selection is None:
+                    result[name] = self.readClassAt(offset, None)
+                    continue
+
+                child = self.selector.child(selection, name)
+                if child is None:
+                    continue
+                value = self.readClassAt(offset, None if child is True else child)
+                if child is True or value:
+                    result[name] = value
+                continue
+            elif entry_type == ARRAY:
+                name = self.readName()
+                value = self.readArray()
+            elif entry_type == ARRAY_WITH_FLAGS:
+                flags = self.readUInt32()
+                name = self.readName()
+                value = self.readArray()
+                if self.patch:
+                    if flags == APPEND:
+                        value = _Append(value)
+                    elif flags != 0:
+                        raise ParseError('Unsupported array flags {} at position {}'.format(flags, self.pos))
+            elif entry_type == EXTERN:
+                name = self.readName()
+                value = _EXTERN if self.patch else {}
+            elif entry_type == DELETE:
+                name = self.readName()
+                if self.patch:
+                    result[name] = _DELETE
+                continue
+            else:
+                raise ParseError('Unknown entry type {} at position {}'.format(entry_type, self.pos - 1))
+
+            if selection is None or self.selector.child(selection, name) is True:
+                result[name] = value
+
+        return result
+
+
+def parse_rap(raw, *, translations=None, select=None, intern=None):
+    """Read a binarized (raP) config, such as config.bin or a binarized mission.sqm.
+
+    intern is an optional InternTable.
+    """
+    return RapReader(raw, translations, select, intern).read()
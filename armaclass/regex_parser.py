@@ -0,0 +1,379 @@
+import mmap
+import re
+
+from .parser import CaseInsensitiveClass, ConfigClass, Parser
+
+# Parsing engine used by parse() when the parser module has not been compiled with Cython (PyPy, pyodide,
+# platforms without wheels). Instead of reading the input one character at a time, whole statements, flat
+# arrays and strings are matched with compiled regular expressions and sliced out of the input. Like in
+# Parser, bytes input is matched in place and only the slices that end up in the result are decoded.
+#
+# The engine only accepts a subset of what Parser accepts: whenever a statement contains something unusual (a
+# name made of other characters, a syntax error...), that statement is handed over to Parser, which stores
+# the same result or raises the same error as it always does, and the next statements are matched again.
+
+_NAME = r'[a-zA-Z0-9_.\\]+'
+# Like in Parser, the end of a block comment is looked for from its first character, so `/*/` is a whole comment
+_COMMENT = r'(?://[^\n]*|/\*(?:/|.*?(?:\*/|\Z)))'
+_BLANKS = ''.join(map(chr, range(33)))
+
+# Parser skips a comment right after a token or after whitespace, but not two in a row
+_SPACE = r'[\x00-\x20]*(?:(?<=[\x00-\x20])' + _COMMENT + r'[\x00-\x20]*)*'
+
+# `""` and `" \n "` are part of the string. The closing quote cannot be followed by either of them, so there is
+# only one way to match a string, whatever follows it
+_STRING = r'"([^"]*(?:(?:""|" \\n ")[^"]*)*)"(?!"| \\n ")'
+_ESCAPE = re.compile(r'""|" \\n "')
+
+# An expression that is neither a string, an array nor a translation, read up to the next `;`, `}` or `,`
+# like Parser does. It cannot start with whitespace or a comment, which Parser would skip
+_EXPRESSION = r'[^;},"${/\x00-\x20][^;},]*'
+# Arrays without strings, nested arrays or translations are split on commas
+_FLAT_ITEM = r'[^;},"${/\x00-\x20][^;},"{]*'
+_FLAT_ITEMS = _FLAT_ITEM + r'(?:,[\x00-\x20]*' + _FLAT_ITEM + ')*'
+
+# Most statements fit in one of these, with only whitespace between their tokens. The empty group at the end
+# marks arrays that are not flat, which are parsed by parseArray() from their opening brace
+_PROPERTY = (
+    r'(' + _NAME + r')[\x00-\x20]*(?:'
+    r'=[\x00-\x20]*(?:' + _STRING + '|(' + _EXPRESSION + r'|))[\x00-\x20]*;'
+    r'|\[\][\x00-\x20]*\+?=[\x00-\x20]*(?:'
+    r'\{[\x00-\x20]*(?:(' + _FLAT_ITEMS + r')(?:,[\x00-\x20]*)?)?\}[\x00-\x20]*;|()(?=\{)))')
+_CLASS = r'class[\x00-\x20]+(' + _NAME + r')[\x00-\x20]*(?::[\x00-\x20]*(' + _NAME + r')[\x00-\x20]*)?([{;])'
+_FLAT_ARRAY = r'\{[\x00-\x20]*(?:(' + _FLAT_ITEMS + r')(?:,[\x00-\x20]*)?)?\}'
+_TRANSLATION = r'\$(STR[^;,}\x00-\x20]*)'
+
+_KEYWORDS = frozenset(['class', 'delete', 'import'])
+
+
+class _Syntax:
+    """The compiled expressions and the tokens for str input, or for UTF-8 encoded bytes."""
+
+    def __init__(self, encode):
+        def match(pattern, flags=0):
+            return re.compile(encode(pattern), flags).match
+
+        self.space_after_value = match(_SPACE, re.DOTALL)
+        self.space_after_token = match(_COMMENT + '?' + _SPACE, re.DOTALL)
+        self.property = match(_PROPERTY)
+        self.class_ = match(_CLASS)
+        self.flat_array = match(_FLAT_ARRAY)
+        self.name = match(_NAME)
+        self.string = match(_STRING)
+        self.expression_end = match(r'[^;},]*')
+        self.translation = match(_TRANSLATION)
+
+        self.semicolon = encode(';')
+        self.colon = encode(':')
+        self.equals = encode('=')
+        self.append = encode('+=')
+        self.square_brackets = encode('[]')
+        self.curly_open = encode('{')
+        self.curly_close = encode('}')
+        self.comma = encode(',')
+        self.quote = encode('"')
+        self.dollar = encode('$')
+        # Tokens that can end a translated string
+        self.value_ends = (self.semicolon, self.comma, self.curly_close)
+
+
+_SYNTAX_U = _Syntax(str)
+_SYNTAX_B = _Syntax(lambda s: s.encode('ascii'))
+
+
+class _Unsupported(Exception):
+    """Raised when a statement has to be parsed by Parser."""
+
+
+def _decode(data):
+    return str(data, 'utf8', 'surrogateescape')
+
+
+def _unescape(match):
+    return '"' if match.group() == '""' else '\n'
+
+
+def _guess_expression(s):
+    # Same as Parser.guessExpression()
+    s = s.strip()
+    length = len(s)
+
+    if length == 4 and s.lower() == 'true':
+        return True
+    elif length == 5 and s.lower() == 'false':
+        return False
+    elif s.startswith('0x'):
+        return int(s, 16)
+    elif '.' in s:
+        try:
+            return float(s)
+        except ValueError:
+            return s
+    else:
+        try:
+            return int(s)
+        except ValueError:
+            return s
+
+
+class RegexParser:
+    """Pure-Python equivalent of Parser.parse(), without the select, lazy, patch, positions and numeric_arrays
+    options.
+    """
+
+    def parse(self, raw, translations, intern=None, case_insensitive=False):
+        if isinstance(raw, str):
+            self.syntax = _SYNTAX_U
+            self.decode = str
+        elif isinstance(raw, (bytes, bytearray, mmap.mmap)):
+            self.syntax = _SYNTAX_B
+            self.decode = _decode
+        else:
+            return Parser().parse(raw, translations, None, False, False, intern, case_insensitive)
+
+        self.text = raw
+        self.translations = translations or {}
+        self.interned = intern.strings if intern is not None else None
+        self.intern_max = intern.max_length if intern is not None else 0
+        self.fold = case_insensitive
+        self.parser = None  # Created for the first statement that is handed over
+        try:
+            result = CaseInsensitiveClass() if case_insensitive else {}
+            self.parseStatements(result, self.syntax.space_after_token(raw).end(), True)
+            return result
+        finally:
+            if self.parser is not None:
+                self.parser.closeInput()
+                self.parser = None
+            self.text = None
+
+    def handOver(self, context, pos):
+        # Parse the statement at pos with Parser and return the position of the next statement
+        if self.parser is None:
+            self.parser = Parser()
+            self.parser.openInput(self.text, self.translations, self.interned, self.intern_max, self.fold)
+        return self.parser.parseStatementAt(context, pos)
+
+    def newClass(self, base):
+        if self.fold:
+            return CaseInsensitiveClass(base=base)
+        if base is None:
+            return {}
+        return ConfigClass(base=base)
+
+    def internString(self, s):
+        return self.interned.setdefault(s, s)
+
+    def internValue(self, value):
+        # Names are always interned, values only when they are short enough
+        if self.interned is not None and len(value) <= self.intern_max:
+            return self.interned.setdefault(value, value)
+        return value
+
+    def guessExpression(self, s):
+        value = _guess_expression(s)
+        if self.interned is not None and isinstance(value, str):
+            return self.internValue(value)
+        return value
+
+    def parseStatements(self, context, pos, top):
+        """Parse the statements from pos up to the closing brace of the class, or up to the end of the input at
+        the top level, and return the position of that brace.
+        """
+        text = self.text
+        length = len(text)
+        interned = self.interned
+        decode = self.decode
+        match_property = self.syntax.property
+        space_after_token = self.syntax.space_after_token
+        curly_close = self.syntax.curly_close
+        while pos < length:
+            if text[pos:pos + 1] == curly_close and not top:
+                return pos
+
+            m = match_property(text, pos)
+            name = None if m is None else decode(m.group(1))
+            if name is None or name in _KEYWORDS:
+                try:
+                    pos = self.parseOtherStatement(context, pos)
+                except _Unsupported:
+                    pos = self.handOver(context, pos)
+                continue
+
+            if interned is not None:
+                name = self.internString(name)
+            kind = m.lastindex
+            if kind == 5:
+                try:
+                    value, end = self.parseArray(m.end())
+                    end = self.parseSemicolon(end)
+                except _Unsupported:
+                    pos = self.handOver(context, pos)
+                else:
+                    context[name] = value
+                    pos = end
+                continue
+
+            if kind == 2:
+                value = decode(m.group(2))
+                if '"' in value:
+                    value = _ESCAPE.sub(_unescape, value)
+                value = self.internValue(value)
+            elif kind == 3:
+                value = self.guessExpression(decode(m.group(3)))
+            elif kind == 4:
+                value = self.parseFlatItems(m.group(4))
+            else:
+                value = []
+            context[name] = value
+            pos = space_after_token(text, m.end()).end()
+
+        if not top:
+            raise _Unsupported
+        return pos
+
+    def parseClassValue(self, pos, base):
+        # pos is at the opening brace. Returns the class and the position after the closing one and whitespace
+        space_after_token = self.syntax.space_after_token
+        context = self.newClass(base)
+        pos = self.parseStatements(context, space_after_token(self.text, pos + 1).end(), False)
+        return context, space_after_token(self.text, pos + 1).end()
+
+    def parseOtherStatement(self, context, pos):
+        # Returns the position of the next statement. Nothing is stored if the statement is not supported
+        text = self.text
+        syntax = self.syntax
+        interned = self.interned
+
+        m = syntax.class_(text, pos)
+        if m is not None:
+            name = self.decode(m.group(1))
+            base = m.group(2)
+            if base is not None:
+                base = self.decode(base)
+            if interned is not None:
+                self.internString('class')  # Like Parser, which reads it as a name
+                name = self.internString(name)
+                if base is not None:
+                    base = self.internString(base)
+            if m.group(3) == syntax.curly_open:
+                value, pos = self.parseClassValue(m.end() - 1, base)
+            else:
+                value, pos = self.newClass(base), m.end() - 1
+            pos = self.parseSemicolon(pos)
+            context[name] = value
+            return pos
+
+        # Everything else, with comments between the tokens
+        name, pos = self.parseName(pos)
+
+        if name == 'delete' or name == 'import':
+            pos = self.parseName(pos)[1]
+            return self.parseSemicolon(pos)
+
+        if name == 'class':
+            name, pos = self.parseName(pos)
+            base = None
+            if text[pos:pos + 1] == syntax.colon:
+                base, pos = self.parseName(syntax.space_after_token(text, pos + 1).end())
+
+            if text[pos:pos + 1] == syntax.curly_open:
+                value, pos = self.parseClassValue(pos, base)
+            elif text[pos:pos + 1] == syntax.semicolon:
+                value = self.newClass(base)
+            else:
+                raise _Unsupported
+
+        elif text[pos:pos + 2] == syntax.square_brackets:
+            pos = syntax.space_after_token(text, pos + 2).end()
+            if text[pos:pos + 1] == syntax.equals:
+                pos += 1
+            elif text[pos:pos + 2] == syntax.append:
+                pos += 2
+            else:
+                raise _Unsupported
+            pos = syntax.space_after_token(text, pos).end()
+            if text[pos:pos + 1] != syntax.curly_open:
+                raise _Unsupported
+            value, pos = self.parseArray(pos)
+
+        elif text[pos:pos + 1] == syntax.equals:
+            value, pos = self.parseValue(syntax.space_after_token(text, pos + 1).end())
+
+        else:
+            raise _Unsupported
+
+        pos = self.parseSemicolon(pos)
+        context[name] = value
+        return pos
+
+    def parseName(self, pos):
+        # Returns the name at pos and the position after the whitespace following it
+        m = self.syntax.name(self.text, pos)
+        if m is None:
+            raise _Unsupported
+        name = self.decode(m.group())
+        if self.interned is not None:
+            name = self.internString(name)
+        return name, self.syntax.space_after_token(self.text, m.end()).end()
+
+    def parseSemicolon(self, pos):
+        if self.text[pos:pos + 1] != self.syntax.semicolon:
+            raise _Unsupported
+        return self.syntax.space_after_token(self.text, pos + 1).end()
+
+    def parseFlatItems(self, items):
+        return [self.guessExpression(item.lstrip(_BLANKS)) for item in self.decode(items).split(',')]
+
+    def parseArray(self, pos):
+        # pos is at the opening brace. Returns the list and the position after the closing one and whitespace
+        text = self.text
+        syntax = self.syntax
+        m = syntax.flat_array(text, pos)
+        if m is not None:
+            items = m.group(1)
+            return [] if items is None else self.parseFlatItems(items), syntax.space_after_token(text, m.end()).end()
+
+        result = []
+        pos = syntax.space_after_token(text, pos + 1).end()
+        while text[pos:pos + 1] != syntax.curly_close:
+            value, pos = self.parseValue(pos)
+            result.append(value)
+            if text[pos:pos + 1] == syntax.comma:
+                pos = syntax.space_after_token(text, pos + 1).end()
+            elif text[pos:pos + 1] != syntax.curly_close:
+                raise _Unsupported
+        return result, syntax.space_after_token(text, pos + 1).end()
+
+    def parseValue(self, pos):
+        # Returns the value at pos and the position after the whitespace following it
+        text = self.text
+        syntax = self.syntax
+        c = text[pos:pos + 1]
+        if c == syntax.curly_open:
+            return self.parseArray(pos)
+
+        if c == syntax.quote:
+            m = syntax.string(text, pos)
+            if m is None:
+                raise _Unsupported
+            value = self.decode(m.group(1))
+            if '"' in value:
+                value = _ESCAPE.sub(_unescape, value)
+            return self.internValue(value), syntax.space_after_value(text, m.end()).end()
+
+        if c == syntax.dollar:
+            m = syntax.translation(text, pos)
+            if m is None:
+                raise _Unsupported
+            pos = syntax.space_after_value(text, m.end()).end()
+            if text[pos:pos + 1] not in syntax.value_ends:
+                raise _Unsupported
+            key = self.decode(m.group(1))
+            translated = self.translations.get(key)
+            return key if translated is None else translated, pos
+
+        m = syntax.expression_end(text, pos)
+        if m.end() == len(text):
+            raise _Unsupported
+        return self.guessExpression(self.decode(m.group())), m.end()
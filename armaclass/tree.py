@@ -0,0 +1,528 @@
+from array import array
+from collections.abc import ItemsView, Mapping, Sequence, ValuesView
+
+try:
+    import cython
+except ModuleNotFoundError:
+    from .cython_stubs import cython
+
+if not cython.compiled:
+    from .cython_stubs import cython
+
+from .parser import ConfigClass, _iter_chunks, _StatementScanner
+
+# Node kinds
+CLASS = 0
+ARRAY = 1
+STRING = 2
+INT = 3
+LONG = 4
+FLOAT = 5
+BOOL = 6
+OTHER = 7  # Anything that doesn't fit the typed columns, like integers above 64 bits
+
+INT32_MIN = -2**31
+INT32_MAX = 2**31 - 1
+INT64_MIN = -2**63
+INT64_MAX = 2**63 - 1
+
+# Classes with more children than this get a lookup table the first time they are searched
+INDEXED_CLASS_SIZE = 16
+
+
+@cython.cclass
+class _Builder:
+    kinds: object
+    parents: object
+    ends: object
+    key_ids: object
+    payloads: object
+    longs: object
+    floats: object
+    names: list
+    name_ids: dict
+    text: bytearray
+    offsets: object
+    string_ids: dict
+    objects: list
+    # Classes that are still being added, innermost last, and the index of their child for each name id
+    open_classes: list
+    open_children: list
+    # Classes in which a name has been added more than once
+    duplicates: list
+
+    def __init__(self):
+        self.kinds = array('b')
+        self.parents = array('i')
+        self.ends = array('i')
+        self.key_ids = array('i')
+        self.payloads = array('i')
+        self.longs = array('q')
+        self.floats = array('d')
+        self.names = []
+        self.name_ids = {}
+        self.text = bytearray()
+        self.offsets = array('q', [0])
+        self.string_ids = {}
+        self.objects = []
+        self.open_classes = [0]
+        self.open_children = [{}]
+        self.duplicates = []
+        self.add(CLASS, -1, -1, -1)
+
+    @cython.cfunc
+    def nameId(self, name) -> cython.int:
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    @cython.cfunc
+    def stringId(self, value) -> cython.int:
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.offsets) - 1
+            self.text += value.encode('utf8', 'surrogateescape')
+            self.offsets.append(len(self.text))
+        return string_id
+
+    @cython.cfunc
+    def add(self, kind: cython.int, parent: cython.int, key: cython.int, payload: cython.int) -> cython.int:
+        index: cython.int = len(self.kinds)
+        self.kinds.append(kind)
+        self.parents.append(parent)
+        self.ends.append(index + 1)
+        self.key_ids.append(key)
+        self.payloads.append(payload)
+        return index
+
+    @cython.cfunc
+    def addClass(self, parent: cython.int, key: cython.int, data) -> cython.int:
+        base = getattr(data, 'base', None)
+        index: cython.int = self.add(CLASS, parent, key, self.nameId(base) if base else -1)
+        for name, value in data.items():
+            self.addValue(index, self.nameId(name), value)
+        self.ends[index] = len(self.kinds)
+        return index
+
+    @cython.cfunc
+    def addValue(self, parent: cython.int, key: cython.int, value) -> cython.void:
+        index: cython.int
+        if isinstance(value, str):
+            self.add(STRING, parent, key, self.stringId(value))
+        elif isinstance(value, bool):
+            self.add(BOOL, parent, key, 1 if value else 0)
+        elif isinstance(value, int):
+            if INT32_MIN <= value <= INT32_MAX:
+                self.add(INT, parent, key, value)
+            elif INT64_MIN <= value <= INT64_MAX:
+                self.add(LONG, parent, key, len(self.longs))
+                self.longs.append(value)
+            else:
+                self.add(OTHER, parent, key, len(self.objects))
+                self.objects.append(value)
+        elif isinstance(value, float):
+            self.add(FLOAT, parent, key, len(self.floats))
+            self.floats.append(value)
+        elif isinstance(value, (list, tuple)):
+            index = self.add(ARRAY, parent, key, len(value))
+            for item in value:
+                self.addValue(index, -1, item)
+            self.ends[index] = len(self.kinds)
+        elif isinstance(value, Mapping):
+            self.addClass(parent, key, value)
+        else:
+            self.add(OTHER, parent, key, len(self.objects))
+            self.objects.append(value)
+
+    def build(self, data):
+        base = getattr(data, 'base', None)
+        if base:
+            self.payloads[0] = self.nameId(base)
+        self.addEntries(data)
+        return self.finish()
+
+    @cython.cfunc
+    def addChild(self, key: cython.int, index: cython.int) -> cython.void:
+        # Records the child of the innermost open class added at index
+        children: dict = self.open_children[len(self.open_children) - 1]
+        if key in children:
+            self.duplicates.append(self.open_classes[len(self.open_classes) - 1])
+        children[key] = index
+
+    def startClass(self, name, base):
+        parent: cython.int = self.open_classes[len(self.open_classes) - 1]
+        key: cython.int = self.nameId(name)
+        index: cython.int = self.add(CLASS, parent, key, self.nameId(base) if base else -1)
+        self.addChild(key, index)
+        self.open_classes.append(index)
+        self.open_children.append({})
+
+    def endClass(self):
+        index: cython.int = self.open_classes.pop()
+        self.open_children.pop()
+        self.ends[index] = len(self.kinds)
+
+    def addEntries(self, data):
+        parent: cython.int = self.open_classes[len(self.open_classes) - 1]
+        key: cython.int
+        for name, value in data.items():
+            key = self.nameId(name)
+            self.addChild(key, len(self.kinds))
+            self.addValue(parent, key, value)
+
+    @cython.cfunc
+    def removeDuplicates(self) -> cython.void:
+        # Rebuild the columns with the last value of each name at the position of the first one, like dicts do.
+        # Only the classes with duplicates and their ancestors are walked, other subtrees are copied as they are
+        rewritten = set()
+        index: cython.int
+        for index in self.duplicates:
+            while index >= 0 and index not in rewritten:
+                rewritten.add(index)
+                index = self.parents[index]
+
+        columns = (array('b'), array('i'), array('i'), array('i'), array('i'))
+        self.copyNode(0, -1, rewritten, columns)
+        self.kinds, self.parents, self.ends, self.key_ids, self.payloads = columns
+        self.duplicates = []
+
+    @cython.cfunc
+    def copyNode(self, index: cython.int, parent: cython.int, rewritten: set, columns: tuple) -> cython.void:
+        kinds, parents, ends, key_ids, payloads = columns
+        new_index: cython.int = len(kinds)
+        end: cython.int = self.ends[index]
+        shift: cython.int = new_index - index
+        if index not in rewritten:
+            kinds.extend(self.kinds[index:end])
+            key_ids.extend(self.key_ids[index:end])
+            payloads.extend(self.payloads[index:end])
+            parents.append(parent)
+            parents.extend([node_parent + shift for node_parent in self.parents[index + 1:end]])
+            ends.extend([node_end + shift for node_end in self.ends[index:end]])
+            return
+
+        kinds.append(self.kinds[index])
+        parents.append(parent)
+        ends.append(0)  # Known once the children have been copied
+        key_ids.append(self.key_ids[index])
+        payloads.append(self.payloads[index])
+
+        children = {}
+        child: cython.int = index + 1
+        while child < end:
+            children[self.key_ids[child]] = child
+            child = self.ends[child]
+        for child in children.values():
+            self.copyNode(child, new_index, rewritten, columns)
+        ends[new_index] = len(kinds)
+
+    def finish(self):
+        self.ends[0] = len(self.kinds)
+        if self.duplicates:
+            self.removeDuplicates()
+        return ConfigTree(self.kinds, self.parents, self.ends, self.key_ids, self.payloads, self.longs, self.floats,
+                          self.names, bytes(self.text), self.offsets, self.objects)
+
+
+class _TreeScanner(_StatementScanner):
+    """Adds the statements to a _Builder as they are parsed, instead of parsing the whole config to dicts first."""
+    descend_classes = True
+
+    def __init__(self, translations):
+        super().__init__(translations)
+        self._builder = _Builder()
+
+    def close(self):
+        self._finish()
+        return self._builder.finish()
+
+    def _statements(self, text):
+        self._builder.addEntries(self._parser.parse(text, self.translations))
+
+    def _start_class(self, name, base):
+        self._builder.startClass(name, base)
+
+    def _end_class(self, name):
+        self._builder.endClass()
+
+
+class _ItemsView(ItemsView):
+    __slots__ = ()
+
+    def __iter__(self):
+        return self._mapping._items()
+
+
+class _ValuesView(ValuesView):
+    __slots__ = ()
+
+    def __iter__(self):
+        for key, value in self._mapping._items():
+            yield value
+
+
+class ClassNode(Mapping):
+    """A class of a ConfigTree. Behaves like a read-only dict.
+
+    Nodes are only cursors into the arrays of the tree: they are created when accessed and hold nothing else.
+    Like in dicts, a name declared more than once in the same class keeps the position of its first
+    declaration and the value of its last one.
+    """
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def key(self):
+        """Name of the class, None for the root."""
+        key = self.tree.key_ids[self.index]
+        return self.tree.names[key] if key >= 0 else None
+
+    @property
+    def base(self):
+        """Name of the parent class, as written in the config."""
+        base = self.tree.payloads[self.index]
+        return self.tree.names[base] if base >= 0 else None
+
+    @property
+    def parent(self):
+        """The enclosing ClassNode, None for the root."""
+        parent = self.tree.parents[self.index]
+        if parent <= 0:
+            return self.tree if parent == 0 else None
+        return ClassNode(self.tree, parent)
+
+    def _children(self):
+        ends = self.tree.ends
+        child = self.index + 1
+        end = ends[self.index]
+        while child < end:
+            yield child
+            child = ends[child]
+
+    def _find(self, key):
+        tree = self.tree
+        name_id = tree._name_id(key)
+        if name_id is None:
+            return -1
+
+        table = tree._lookups.get(self.index)
+        if table is not None:
+            return table.get(name_id, -1)
+
+        keys = tree.key_ids
+        found = -1
+        count = 0
+        for child in self._children():
+            if keys[child] == name_id:
+                found = child
+            count += 1
+
+        if count > INDEXED_CLASS_SIZE:
+            tree._lookups[self.index] = {keys[child]: child for child in self._children()}
+        return found
+
+    def _items(self):
+        tree = self.tree
+        names = tree.names
+        keys = tree.key_ids
+        for child in self._children():
+            yield names[keys[child]], tree._value(child)
+
+    def __getitem__(self, key):
+        child = self._find(key) if isinstance(key, str) else -1
+        if child < 0:
+            raise KeyError(key)
+        return self.tree._value(child)
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __iter__(self):
+        names = self.tree.names
+        keys = self.tree.key_ids
+        for child in self._children():
+            yield names[keys[child]]
+
+    def __len__(self):
+        return sum(1 for _ in self._children())
+
+    def items(self):
+        return _ItemsView(self)
+
+    def values(self):
+        return _ValuesView(self)
+
+    def to_dict(self):
+        """Return the class as regular dicts and lists, like parse() does."""
+        base = self.base
+        result = {} if base is None else ConfigClass(base=base)
+        for key, value in self._items():
+            if isinstance(value, (ClassNode, ArrayNode)):
+                value = value.to_dict() if isinstance(value, ClassNode) else value.to_list()
+            result[key] = value
+        return result
+
+    def __repr__(self):
+        return '<{} {}{}>'.format(type(self).__name__, self.key or '(root)',
+                                  ' : ' + self.base if self.base else '')
+
+
+class ArrayNode(Sequence):
+    """An array of a ConfigTree. Behaves like a read-only list."""
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def parent(self):
+        parent = self.tree.parents[self.index]
+        if parent == 0:
+            return self.tree
+        return ClassNode(self.tree, parent) if self.tree.kinds[parent] == CLASS else ArrayNode(self.tree, parent)
+
+    def __iter__(self):
+        tree = self.tree
+        ends = tree.ends
+        child = self.index + 1
+        end = ends[self.index]
+        while child < end:
+            yield tree._value(child)
+            child = ends[child]
+
+    def __len__(self):
+        return self.tree.payloads[self.index]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return list(self)[item]
+
+        count = self.tree.payloads[self.index]
+        if item < 0:
+            item += count
+        if not 0 <= item < count:
+            raise IndexError('array index out of range')
+        return self.tree._value(self.tree._array_item(self.index, item))
+
+    def __eq__(self, other):
+        if isinstance(other, (ArrayNode, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def to_list(self):
+        return [value.to_dict() if isinstance(value, ClassNode) else
+                value.to_list() if isinstance(value, ArrayNode) else value
+                for value in self]
+
+    # Same name as for array.array and ndarray, which the generators write as arrays
+    tolist = to_list
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.to_list())
+
+
+class ConfigTree(ClassNode):
+    """A parsed config stored in flat arrays instead of nested dicts. It is also the root class.
+
+    Nodes are stored in pre-order. For each node, the arrays hold its kind, the index of its parent, the index
+    following its last descendant (so that siblings can be skipped over), the id of its name in `names` and a
+    payload: the value of an integer or boolean, the id of a string, the index of the value in `longs` or
+    `floats`, the number of items of arrays or, for classes, the id of the name of their parent class.
+    String values are stored once each, UTF-8 encoded in `text`, string n spanning offsets[n]:offsets[n + 1].
+    """
+    __slots__ = ('kinds', 'parents', 'ends', 'key_ids', 'payloads', 'longs', 'floats', 'names', 'text', 'offsets',
+                 'objects', '_name_ids', '_lookups')
+
+    def __init__(self, kinds, parents, ends, key_ids, payloads, longs, floats, names, text, offsets, objects):
+        super().__init__(self, 0)
+        self.kinds = kinds
+        self.parents = parents
+        self.ends = ends
+        self.key_ids = key_ids
+        self.payloads = payloads
+        self.longs = longs
+        self.floats = floats
+        self.names = names
+        self.text = text
+        self.offsets = offsets
+        self.objects = objects
+        self._name_ids = None
+        self._lookups = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a ConfigTree from parsed (or manually created) dicts."""
+        return _Builder().build(data)
+
+    @classmethod
+    def from_source(cls, source, *, translations=None, chunk_size=1 << 20):
+        """Parse source into a ConfigTree, one statement at a time, without building the dicts of the whole config.
+
+        source can be a str, bytes-like object, mmap, path or file object.
+        """
+        scanner = _TreeScanner(translations)
+        for chunk in _iter_chunks(source, chunk_size):
+            scanner.feed(chunk)
+        return scanner.close()
+
+    def _name_id(self, name):
+        if self._name_ids is None:
+            self._name_ids = {name: name_id for name_id, name in enumerate(self.names)}
+        return self._name_ids.get(name)
+
+    def _array_item(self, index, position):
+        # Returns the index of the item at position in the array at index
+        if self.ends[index] - index - 1 == self.payloads[index]:
+            return index + 1 + position  # No nested arrays, the items follow each other
+
+        items = self._lookups.get(index)
+        if items is None:
+            items = array('i')
+            child = index + 1
+            while child < self.ends[index]:
+                items.append(child)
+                child = self.ends[child]
+            self._lookups[index] = items
+        return items[position]
+
+    def _value(self, index):
+        kind = self.kinds[index]
+        payload = self.payloads[index]
+        if kind == STRING:
+            return self.text[self.offsets[payload]:self.offsets[payload + 1]].decode('utf8', 'surrogateescape')
+        elif kind == INT:
+            return payload
+        elif kind == CLASS:
+            return ClassNode(self, index)
+        elif kind == ARRAY:
+            return ArrayNode(self, index)
+        elif kind == FLOAT:
+            return self.floats[payload]
+        elif kind == BOOL:
+            return payload != 0
+        elif kind == LONG:
+            return self.longs[payload]
+        return self.objects[payload]
+
+    @property
+    def nbytes(self):
+        """Approximate memory used by the arrays and tables."""
+        size = len(self.text) + sum(len(column) * column.itemsize for column in (
+            self.kinds, self.parents, self.ends, self.key_ids, self.payloads, self.longs, self.floats, self.offsets))
+        return size + sum(len(name) + 49 for name in self.names)
+
+    def __reduce__(self):
+        # Only the arrays and tables are pickled, which is much cheaper than pickling nested dicts
+        return ConfigTree, (self.kinds, self.parents, self.ends, self.key_ids, self.payloads, self.longs, self.floats,
+                            self.names, self.text, self.offsets, self.objects)
+
+    def __repr__(self):
+        return '<{} {} nodes>'.format(type(self).__name__, len(self.kinds))
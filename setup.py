@@ -23,7 +23,8 @@ if not any(arg in sys.argv for arg in ['clean', 'check']) and \
             compiler_directives['linetrace'] = True
 
         ext_modules = cythonize(
-            str(this_directory / 'armaclass' / 'parser.py'),
+            [str(this_directory / 'armaclass' / name)
+             for name in ['parser.py', 'rap_parser.py', 'tree.py', 'arma_writer.py']],
             language_level=3,
             compiler_directives=compiler_directives,
         )
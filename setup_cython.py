@@ -6,7 +6,8 @@ from setuptools import setup
 this_directory = Path(__file__).parent
 
 setup(
-    ext_modules=cythonize(str(this_directory / 'armaclass' / 'parser.py'),
+    ext_modules=cythonize([str(this_directory / 'armaclass' / name)
+                           for name in ['parser.py', 'rap_parser.py', 'tree.py', 'arma_writer.py']],
                           language_level=3,
                           annotate=True,
                           ),
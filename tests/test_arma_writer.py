@@ -0,0 +1,93 @@
+import io
+import textwrap
+from array import array
+
+import pytest
+
+from armaclass import dump, generate, parse, ConfigClass
+from armaclass import arma_writer
+from armaclass.arma_generator import ArmaGenerator
+from armaclass.arma_writer import ArmaWriter
+
+STRUCTURE = {
+    'version': 53,
+    'Mission': ConfigClass({
+        'Intel': {'briefingName': 'Line one\nline two', 'startWind': 0.1, 'overcast': 2.0, 'empty': []},
+        'Entities': {
+            'items': 2,
+            'Item0': {'position': array('d', [1.5, 2, 3]), 'flags': [[1, [2]], [], ['a"b', True, -1.0]]},
+            'Item1': {},
+            'Item2': {'tab': 'a\tb', 'blank': ' ', 'Tuple': (1, 'x')},
+        },
+    }, base='Base'),
+    'raw': 'carriage\rreturn',
+    'breaks[]': ['\r', 'a\nb', ''],
+    'end': True,
+}
+
+
+class StreamingGenerator(ArmaGenerator):
+    # Overrides one of the methods, so that the text is generated by the methods instead of the writer
+    def generate_string(self, name, data):
+        return super().generate_string(name, data)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'indent': 1, 'use_tabs': True}, {'indent': 0}])
+def test_same_text(kwargs):
+    expected = StreamingGenerator(**kwargs).generate(STRUCTURE)
+    assert generate(STRUCTURE, **kwargs) == expected
+    assert ArmaGenerator(**kwargs).generate_class('Mission', STRUCTURE['Mission']) == \
+        StreamingGenerator(**kwargs).generate_class('Mission', STRUCTURE['Mission'])
+
+    f = io.StringIO()
+    dump(STRUCTURE, f, **kwargs)
+    assert f.getvalue() == expected
+
+
+def test_writer_used():
+    assert ArmaGenerator()._uses_writer()
+    assert not StreamingGenerator()._uses_writer()
+
+    class Subclass(ArmaGenerator):
+        pass
+
+    assert Subclass()._uses_writer()
+
+
+def test_overridden_methods():
+    class NoFloats(ArmaGenerator):
+        def generate_float(self, name, data):
+            return super().generate_float(name, round(data))
+
+    assert NoFloats().generate({'A': {'a': 1.5, 'b': [2.5]}}) == textwrap.dedent('''\
+        class A
+        {
+            a=2;
+            b[]=
+            {
+                2
+            };
+        };
+        ''')
+
+
+def test_writer():
+    writer = ArmaWriter(ArmaGenerator())
+    writer.writeClass('A', {'b': {'c': 1}})
+    writer.writeClass('D', {})
+    assert writer.getvalue() == 'class A\n{\n    class b\n    {\n        c=1;\n    };\n};\nclass D\n{\n};\n'
+
+
+@pytest.mark.parametrize('kwargs', [{'lazy': True}, {'container': 'compact'}])
+def test_mappings_are_written_directly(kwargs):
+    source = 'version=1;\nclass A: B { a[]={1, {2}}; class C { class D { s="x"; }; }; };\nclass E {};'
+    generator = ArmaGenerator()
+    generator.generate_item = None  # Classes that are not dicts do not go through the generator either
+    writer = ArmaWriter(generator)
+    writer.writeDocument(parse(source, **kwargs))
+    assert writer.getvalue() == generate(parse(source))
+
+
+def test_indent_text():
+    for text in ['a\n', 'a', '', ' \n', 'a\rb\n', 'a\n\nb', ' x']:
+        assert arma_writer.indent_text(text, '  ') == textwrap.indent(text, '  ')
@@ -1,3 +1,5 @@
+import sys
+
 import pytest
 
 from armaclass import parse, ParseError
@@ -16,6 +18,23 @@ def test_string():
     assert type(result['var']) == str
 
 
+@pytest.mark.parametrize('sqf, python', [
+    ('"a""b"""', 'a"b"'),
+    ('"""a""" \\n """b"""', '"a"\n"b"'),
+    ('"a" \\n "" \\n "é😀"', 'a\n\né😀'),
+])
+def test_string_escapes(sqf, python):
+    for source in ['var={};'.format(sqf), 'var={};'.format(sqf).encode('utf8')]:
+        assert parse(source) == {'var': python}
+
+
+def test_string_kind():
+    # Strings are as narrow as their contents, even when the input is not
+    result = parse('var="foo" \\n "bar"; other="😀";')
+    assert result['var'].isascii()
+    assert sys.getsizeof(result['var']) == sys.getsizeof('foo\nbar')
+
+
 def test_unquoted_string():
     expected = {'var': 'foo'}
     result = parse('var= foo ;')
@@ -0,0 +1,75 @@
+import mmap
+
+import pytest
+
+from armaclass import parse, parse_file, ParseError
+
+SOURCE = '''
+// Comment with "quotes" and ünïcödé
+version=12;
+class Moo : Foo {
+    name="Zażółć ""gęślą"" jaźń";
+    init="line1" \\n "line2";
+    values[]={1, 2.5, "three", {}};
+    title=$STR_TITLE;
+    /* block
+       comment */
+    unquoted= fo.o ;
+};
+'''
+
+EXPECTED = {
+    'version': 12,
+    'Moo': {
+        'name': 'Zażółć "gęślą" jaźń',
+        'init': 'line1\nline2',
+        'values': [1, 2.5, 'three', []],
+        'title': 'Translated',
+        'unquoted': 'fo.o',
+    }
+}
+
+TRANSLATIONS = {'STR_TITLE': 'Translated'}
+
+
+@pytest.mark.parametrize('convert', [bytes, bytearray])
+def test_parse_buffer(convert):
+    result = parse(convert(SOURCE.encode('utf8')), translations=TRANSLATIONS)
+    assert result == EXPECTED
+
+
+def test_parse_mmap(tmp_path):
+    path = tmp_path / 'config.cpp'
+    path.write_bytes(SOURCE.encode('utf8'))
+
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            assert parse(source, translations=TRANSLATIONS) == EXPECTED
+
+
+def test_parse_file(tmp_path):
+    path = tmp_path / 'config.cpp'
+    path.write_bytes(SOURCE.encode('utf8'))
+    assert parse_file(path, translations=TRANSLATIONS) == EXPECTED
+
+
+def test_parse_empty_file(tmp_path):
+    path = tmp_path / 'config.cpp'
+    path.write_bytes(b'')
+    assert parse_file(path) == {}
+
+
+def test_invalid_utf8_is_surrogateescaped():
+    raw = b'name="\xff\xfe";'
+    expected = {'name': raw[6:8].decode('utf8', errors='surrogateescape')}
+    assert parse(raw) == expected
+
+
+def test_buffer_hanging_quote():
+    with pytest.raises(ParseError, match=r'Got EOF'):
+        parse(b'v="')
+
+
+def test_unsupported_input_type():
+    with pytest.raises(TypeError):
+        parse(12)
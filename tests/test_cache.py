@@ -0,0 +1,145 @@
+import os
+import time
+
+import pytest
+
+from armaclass import cache as cache_module
+from armaclass import parse, parse_file, ParseCache
+
+SOURCE = 'version=12;\nclass Moo { name="Zażółć"; values[]={1, 2.5}; };\n'
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / 'config.cpp'
+    path.write_bytes(SOURCE.encode('utf8'))
+    return path
+
+
+def test_hit_and_miss(tmp_path, config):
+    cache = ParseCache(tmp_path / 'cache')
+    assert cache.parse_file(config) == parse(SOURCE)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert cache.parse_file(config) == parse(SOURCE)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_modified_file_is_parsed_again(tmp_path, config):
+    cache = ParseCache(tmp_path / 'cache')
+    cache.parse_file(config)
+    config.write_bytes(b'version=13;')
+    os.utime(config, ns=(0, 0))
+    assert cache.parse_file(config) == {'version': 13}
+    assert cache.misses == 2
+
+
+def test_same_content_is_shared(tmp_path, config):
+    cache = ParseCache(tmp_path / 'cache')
+    cache.parse_file(config)
+    copy = tmp_path / 'copy.cpp'
+    copy.write_bytes(config.read_bytes())
+    assert cache.parse_file(copy) == parse(SOURCE)
+    assert cache.hits == 1
+
+
+def test_options_are_part_of_the_key(tmp_path, config):
+    cache = ParseCache(tmp_path / 'cache')
+    cache.parse_file(config)
+    assert cache.parse_file(config, select=['version']) == {'version': 12}
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_select_order_is_not_part_of_the_key(tmp_path, config):
+    cache = ParseCache(tmp_path / 'cache')
+    cache.parse_file(config, select={'version', 'Moo'})
+    cache.parse_file(config, select=['Moo', 'version'])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize('name, value', [('CACHE_VERSION', 0), ('PACKAGE_VERSION', '0.0.1')])
+def test_other_versions_are_not_used(tmp_path, config, monkeypatch, name, value):
+    cache = ParseCache(tmp_path / 'cache')
+    monkeypatch.setattr(cache_module, name, value)
+    cache.parse_file(config)
+    monkeypatch.undo()
+    cache.parse_file(config)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='POSIX permissions')
+def test_directories_are_private(tmp_path):
+    ParseCache(tmp_path / 'cache')
+    for directory in ('cache', 'cache/entries', 'cache/stats'):
+        assert (tmp_path / directory).stat().st_mode & 0o077 == 0
+
+
+def test_lru_eviction(tmp_path):
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / 'config{}.cpp'.format(i))
+        paths[-1].write_bytes('value={};'.format(i).encode('ascii'))
+
+    cache = ParseCache(tmp_path / 'cache')
+    cache.parse_file(paths[0])
+    cache.max_size = cache.size() * 2
+
+    cache.parse_file(paths[1])
+    time.sleep(0.01)
+    cache.parse_file(paths[0])  # Now paths[1] is the least recently used one
+    time.sleep(0.01)
+    cache.parse_file(paths[2])
+    assert cache.size() <= cache.max_size
+
+    cache.parse_file(paths[0])
+    cache.parse_file(paths[2])
+    assert cache.hits == 3
+    cache.parse_file(paths[1])
+    assert cache.misses == 4
+
+
+def test_files_are_hashed_in_blocks(tmp_path, config, monkeypatch):
+    monkeypatch.setattr(cache_module, 'HASH_BLOCK_SIZE', 7)
+    assert cache_module._file_digest(config) == cache_module._digest(config.read_bytes())
+
+
+def test_stats_are_pruned(tmp_path):
+    cache = ParseCache(tmp_path / 'cache', max_stats=2)
+    for i in range(4):
+        path = tmp_path / 'config{}.cpp'.format(i)
+        path.write_bytes(b'value=1;')  # Same content, so only one entry
+        cache.parse_file(path)
+    (tmp_path / 'other.cpp').write_bytes(b'value=2;')
+    cache.parse_file(tmp_path / 'other.cpp')
+    assert len(os.listdir(tmp_path / 'cache' / 'stats')) == 2
+
+    # Signatures older than the remaining entries are removed with the entries
+    cache.max_size = cache.size() // 2
+    (tmp_path / 'last.cpp').write_bytes(b'value=3;')
+    cache.parse_file(tmp_path / 'last.cpp')
+    assert len(os.listdir(tmp_path / 'cache' / 'entries')) == 1
+    assert len(os.listdir(tmp_path / 'cache' / 'stats')) == 1
+    cache.parse_file(tmp_path / 'last.cpp')
+    assert (cache.hits, cache.misses) == (4, 3)
+
+
+def test_corrupted_entry_is_a_miss(tmp_path, config):
+    cache = ParseCache(tmp_path / 'cache')
+    cache.parse_file(config)
+    for entry in os.scandir(tmp_path / 'cache' / 'entries'):
+        with open(entry.path, 'wb') as f:
+            f.write(b'garbage')
+    assert cache.parse_file(config) == parse(SOURCE)
+    assert cache.misses == 2
+
+
+def test_parse_file_cache_dir(tmp_path, config):
+    assert parse_file(config, cache_dir=tmp_path / 'cache') == parse(SOURCE)
+    assert parse_file(config, cache_dir=tmp_path / 'cache') == parse(SOURCE)
+    assert ParseCache(tmp_path / 'cache').size() > 0
+
+
+def test_clear(tmp_path, config):
+    cache = ParseCache(tmp_path / 'cache')
+    cache.parse_file(config)
+    cache.clear()
+    assert cache.size() == 0
@@ -0,0 +1,94 @@
+import pickle
+
+import pytest
+
+from armaclass import parse, parse_file, generate, generate_rap, CaseInsensitiveClass, ConfigClass
+
+SOURCE = '''
+class CfgVehicles
+{
+    class Car { displayName = "Car"; maxSpeed = 100; };
+    class Truck : Car { displayName = "Truck"; class Turrets; };
+};
+'''
+
+
+def test_lookups():
+    result = parse(SOURCE, case_insensitive=True)
+    assert isinstance(result, CaseInsensitiveClass)
+    assert result == parse(SOURCE)
+    assert result['cfgvehicles']['CAR']['displayname'] == 'Car'
+    assert result['CfgVehicles']['Car']['displayName'] == 'Car'
+    assert 'cfgVEHICLES' in result
+    assert 'missing' not in result
+    assert result.get('CFGVEHICLES') is result['CfgVehicles']
+    assert result.get('missing', 1) == 1
+    with pytest.raises(KeyError):
+        result['missing']
+
+
+def test_spelling_is_kept():
+    result = parse(SOURCE, case_insensitive=True)
+    truck = result['cfgvehicles']['truck']
+    assert list(truck) == ['displayName', 'Turrets']
+    assert truck.key('TURRETS') == 'Turrets'
+    assert truck.key('missing') is None
+    assert truck.base == 'Car'
+    assert isinstance(truck['turrets'], CaseInsensitiveClass)
+    assert generate(result) == generate(parse(SOURCE))
+
+
+def test_redefined_names():
+    result = parse('value = 1; VALUE = 2; class Foo {}; class foo { a = 1; };', case_insensitive=True)
+    assert list(result) == ['value', 'Foo']
+    assert result['value'] == 2
+    assert result['FOO'] == {'a': 1}
+
+
+def test_mutations():
+    data = CaseInsensitiveClass({'Foo': 1, 'Bar': 2})
+    data['FOO'] = 3
+    assert dict(data) == {'Foo': 3, 'Bar': 2}
+    del data['foo']
+    assert 'Foo' not in data
+    assert data.pop('BAR') == 2
+    assert data.pop('bar', None) is None
+    assert data.setdefault('baz', 4) == 4
+    assert data.setdefault('BAZ', 5) == 4
+    assert data.popitem() == ('baz', 4)
+    assert 'baz' not in data
+    data.update(Foo=1)
+    data.clear()
+    assert 'foo' not in data
+
+
+def test_copy_and_pickle():
+    result = parse(SOURCE, case_insensitive=True)
+    for copy in [pickle.loads(pickle.dumps(result)), result.copy()]:
+        assert copy == result
+        assert copy['cfgvehicles']['truck']['DISPLAYNAME'] == 'Truck'
+    assert pickle.loads(pickle.dumps(result))['CfgVehicles']['Truck'].base == 'Car'
+
+
+def test_from_dict():
+    result = CaseInsensitiveClass.from_dict(parse(SOURCE))
+    assert result == parse(SOURCE)
+    assert result['CFGVEHICLES']['truck'].base == 'Car'
+    assert isinstance(result['CfgVehicles']['Car'], ConfigClass)
+
+
+def test_files(tmp_path):
+    path = tmp_path / 'config.cpp'
+    path.write_text(SOURCE)
+    assert parse_file(path, case_insensitive=True)['cfgvehicles']['car']['MAXSPEED'] == 100
+
+    path = tmp_path / 'config.bin'
+    path.write_bytes(generate_rap(parse(SOURCE)))
+    assert parse_file(path, case_insensitive=True)['cfgvehicles']['truck'].base == 'Car'
+
+
+def test_unsupported():
+    with pytest.raises(ValueError):
+        parse(SOURCE, lazy=True, case_insensitive=True)
+    with pytest.raises(ValueError):
+        parse(SOURCE, container='compact', case_insensitive=True)
@@ -0,0 +1,134 @@
+import pytest
+
+from armaclass import parse, ConfigDocument, ParseError
+
+SOURCE = '''// Mission file
+version=53;
+class Mission
+{
+	class Intel
+	{
+		briefingName="Test ""mission""";  // Shown in the lobby
+		overviewText="Line one" \\n "line two";
+		startWind=0.10000001;
+		year=2035;
+	};
+	class Entities
+	{
+		items=1;
+		class Item0 { position[]={1.50,2,3}; side="West"; };
+	};
+};
+'''
+
+
+def test_unchanged():
+    doc = ConfigDocument(SOURCE)
+    assert doc.changes() == []
+    assert doc.generate() == SOURCE
+
+
+def test_changed_value():
+    doc = ConfigDocument(SOURCE)
+    doc.data['Mission']['Intel']['year'] = 2040
+    assert doc.generate() == SOURCE.replace('year=2035;', 'year=2040;')
+    assert parse(doc.generate()) == doc.data
+
+
+def test_changed_array_on_a_shared_line():
+    doc = ConfigDocument(SOURCE)
+    doc.data['Mission']['Entities']['Item0']['position'][2] = 4
+    assert doc.generate() == SOURCE.replace('position[]={1.50,2,3};', 'position[]=\n\t\t{\n\t\t\t1.5, 2, 4\n\t\t};')
+    assert parse(doc.generate()) == doc.data
+
+
+def test_type_changes_are_changes():
+    doc = ConfigDocument('a=1;\nb[]={1};\n')
+    doc.data['a'] = True
+    doc.data['b'] = [True]
+    assert parse(doc.generate()) == {'a': True, 'b': [True]}
+    assert 'a=true;' in doc.generate()
+
+
+def test_added_and_removed():
+    doc = ConfigDocument(SOURCE)
+    del doc.data['Mission']['Intel']['startWind']
+    doc.data['Mission']['Intel']['month'] = 6
+    doc.data['Mission']['Entities']['Item0']['name'] = 'player'
+    doc.data['Mission']['Entities']['Item1'] = {'side': 'East'}
+    doc.data['end'] = 1
+    generated = doc.generate()
+    assert 'startWind' not in generated
+    assert '\t\tyear=2035;\n\t\tmonth=6;\n\t};' in generated
+    assert 'side="West";\n\t\t\tname="player";\n\t\t};' in generated
+    assert '\t\tclass Item1\n\t\t{\n\t\t\tside="East";\n\t\t};\n\t};' in generated
+    assert generated.endswith('};\nend=1;\n')
+    assert parse(generated) == doc.data
+
+
+def test_indent():
+    doc = ConfigDocument('class A\n{\n  a=1;\n};\n')
+    doc.data['A']['b'] = {'c': 1}
+    assert doc.generate() == 'class A\n{\n  a=1;\n  class b\n  {\n    c=1;\n  };\n};\n'
+
+
+def test_bytes(tmp_path):
+    path = tmp_path / 'mission.sqm'
+    path.write_bytes(SOURCE.encode('utf8').replace(b'Test', b'T\xc3\xa9st'))
+    doc = ConfigDocument.from_file(path)
+    doc.data['version'] = 54
+    doc.write(path)
+    assert path.read_bytes() == SOURCE.encode('utf8').replace(b'Test', b'T\xc3\xa9st').replace(b'53', b'54')
+
+
+def check_edit(doc, offset, removed, inserted):
+    doc.apply_edit(offset, removed, inserted)
+    expected, positions = parse(doc.source, positions=True)
+    assert doc.data == expected
+    assert doc.changes() == []
+    assert list(doc.positions.parents) == list(positions.parents)
+    assert list(doc.positions.starts) == list(positions.starts)
+    assert list(doc.positions.ends) == list(positions.ends)
+    assert doc.positions.names == positions.names
+
+
+def test_edit_inside_a_class():
+    doc = ConfigDocument(SOURCE)
+    mission = doc.data['Mission']
+    offset = SOURCE.index('2035')
+    check_edit(doc, offset, 4, '2040')
+    assert doc.data['Mission']['Intel']['year'] == 2040
+    assert doc.data['Mission'] is mission
+    assert doc.positions.location('Mission/Entities/Item0/side') == (15, 40)
+
+    check_edit(doc, doc.source.index('items=1;'), 0, 'added[]={1, 2};\n\t\t')
+    assert doc.data['Mission']['Entities']['added'] == [1, 2]
+    assert doc.data['Mission'] is mission
+    assert doc.positions.location('Mission/Entities/Item0/side') == (16, 40)
+
+
+def test_edit_changing_the_structure():
+    doc = ConfigDocument(SOURCE)
+    mission = doc.data['Mission']
+    check_edit(doc, doc.source.index('year=2035;'), 0, '}; class Moved { ')
+    assert doc.data['Mission'] is not mission
+    assert doc.data['Mission']['Moved'] == {'year': 2035}
+
+    check_edit(doc, doc.source.index('class Item0'), 0, '//')
+    assert 'Item0' not in doc.data['Mission']['Entities']
+    check_edit(doc, doc.source.index('//class Item0'), 2, '')
+    assert 'Item0' in doc.data['Mission']['Entities']
+
+
+def test_edit_at_the_top_level():
+    doc = ConfigDocument(SOURCE)
+    check_edit(doc, doc.source.index('version=53;'), 11, '')
+    assert 'version' not in doc.data
+
+
+def test_invalid_edit():
+    doc = ConfigDocument(SOURCE)
+    with pytest.raises(ParseError):
+        doc.apply_edit(doc.source.index('year=2035;'), 5, '')
+    assert doc.source == SOURCE
+    assert doc.data == parse(SOURCE)
@@ -0,0 +1,99 @@
+import io
+import textwrap
+from array import array
+
+import pytest
+
+import armaclass
+from armaclass import dump, generate, generate_iter, parse, ConfigClass
+from armaclass.arma_generator import ArmaGenerator
+
+STRUCTURE = {
+    'version': 53,
+    'Mission': ConfigClass({
+        'Intel': {'briefingName': 'Line one\nline two', 'startWind': 0.1, 'empty': []},
+        'Entities': {
+            'items': 2,
+            'Item0': {'position': array('d', [1.5, 2, 3]), 'flags': [[1, [2]], [], ['a"b']]},
+            'Item1': {},
+        },
+    }, base='Base'),
+    'raw': 'carriage\rreturn',
+    'end': True,
+}
+
+
+def old_generate_class(self, name, data):
+    # What generate_class() did before, indenting the text of the contents at every level
+    inner = [self.generate_item(key, val) for key, val in data.items()]
+    base = getattr(data, 'base', None)
+    return 'class {}{}\n{{\n{}}};\n'.format(name, ': ' + base if base else '', self._indent(''.join(inner)))
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'indent': 1, 'use_tabs': True}, {'indent': 0}])
+def test_same_text(kwargs):
+    class OldGenerator(ArmaGenerator):
+        generate_class = old_generate_class
+
+    expected = OldGenerator(**kwargs).generate(STRUCTURE)
+    assert generate(STRUCTURE, **kwargs) == expected
+    assert ''.join(generate_iter(STRUCTURE, **kwargs)) == expected
+
+    f = io.StringIO()
+    dump(STRUCTURE, f, **kwargs)
+    assert f.getvalue() == expected
+
+
+def test_chunks(monkeypatch):
+    monkeypatch.setattr(armaclass.arma_generator, 'DUMP_BUFFER_SIZE', 20)
+    chunks = list(generate_iter(STRUCTURE))
+    assert len(chunks) > 5
+    assert max(map(len, chunks)) < 100
+    assert ''.join(chunks).startswith('version=53;\n\nclass Mission: Base\n{\n    class Intel\n')
+    assert parse(''.join(chunks)) == parse(generate(STRUCTURE))
+
+
+def test_buffered_writes(monkeypatch):
+    monkeypatch.setattr(armaclass.arma_generator, 'DUMP_BUFFER_SIZE', 100)
+    writes = []
+
+    class File:
+        def write(self, text):
+            writes.append(text)
+
+    structure = {'Big': {'value{}'.format(i): i for i in range(100)}}
+    dump(structure, File())
+    assert len(writes) > 5
+    assert all(len(text) < 120 for text in writes)
+    assert ''.join(writes) == generate(structure)
+
+
+def test_overridden_methods():
+    class UpperGenerator(ArmaGenerator):
+        def generate_class(self, name, data):
+            return super().generate_class(name.upper(), data)
+
+        def generate_array(self, name, data):
+            return '{}[]={{}};\n'.format(name)
+
+    g = UpperGenerator()
+    text = ''.join(g.generate_iter({'A': {'b': [1], 'C': {'d': 1}}}))
+    assert text == textwrap.dedent('''\
+        class A
+        {
+            b[]={};
+            class C
+            {
+                d=1;
+            };
+        };
+        ''')
+    assert text == g.generate({'A': {'b': [1], 'C': {'d': 1}}})
+
+
+@pytest.mark.parametrize('kwargs', [{'lazy': True}, {'container': 'compact'}])
+def test_mappings(kwargs):
+    source = 'version=1;\nclass A: B { a[]={1, {2}}; class C { class D { s="x"; }; }; };\nclass E {};'
+    expected = generate(parse(source))
+    assert ''.join(generate_iter(parse(source, **kwargs))) == expected
+    assert generate(parse(source, **kwargs)) == expected
@@ -0,0 +1,98 @@
+import pytest
+
+from armaclass import parse, IncrementalParser, ParseError
+
+SOURCE = '''\
+version=12;
+// Line comment with a "quote
+class Mission
+{
+    /* block comment; with { braces */
+    class Intel
+    {
+        briefingName="Zażółć ""gęślą"" jaźń";
+        init="line1" \\n "line2";
+        startWeather=0.30000001;
+    };
+    class Entities : Base
+    {
+        items=2;
+        class Item0 { position[]={1954.6425,5.9796591,5538.1045}; name=$STR_NAME; };
+        class Item1;
+        delete Item2;
+    };
+    addons[] += {"A3_Characters_F", {}};
+};
+'''
+
+TRANSLATIONS = {'STR_NAME': 'Translated'}
+
+
+def _feed(source, chunk_size):
+    parser = IncrementalParser(translations=TRANSLATIONS)
+    for i in range(0, len(source), chunk_size):
+        parser.feed(source[i:i + chunk_size])
+    return parser.close()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 10000])
+def test_chunked_text(chunk_size):
+    assert _feed(SOURCE, chunk_size) == parse(SOURCE, translations=TRANSLATIONS)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 10000])
+def test_chunked_bytes(chunk_size):
+    # Splits multi-byte UTF-8 characters across chunks
+    assert _feed(SOURCE.encode('utf8'), chunk_size) == parse(SOURCE, translations=TRANSLATIONS)
+
+
+def test_buffer_is_bounded():
+    parser = IncrementalParser()
+    parser.feed('class Mission {\n')
+    for i in range(1000):
+        parser.feed('class Item{} {{ value={}; name="Item"; }};\n'.format(i, i))
+        assert len(parser._buffer) < 50
+
+    parser.feed('};')
+    assert len(parser.close()['Mission']) == 1000
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4])
+def test_statement_split_in_strings_and_comments(chunk_size):
+    source = 'a[] = {"x;}", /* }; **/ 1, // ;\n "y" \\n "z", /**/ {2}};\nb="c"; c=1; /*/ d=2;'
+    assert _feed(source, chunk_size) == parse(source)
+
+
+def test_long_statement_is_scanned_once():
+    parser = IncrementalParser()
+    parser.feed('a[] = {"x;}"')
+    assert parser._resume == (len('a[] = {"x;}"'), 1, 0)
+    parser.feed(', "y;')
+    assert parser._resume[1:] == (1, 1)  # In a string
+    parser.feed('"};')
+    assert parser._resume is None
+    assert parser.close() == {'a': ['x;}', 'y;']}
+
+
+def test_empty():
+    assert IncrementalParser().close() == {}
+
+
+def test_unterminated_class():
+    parser = IncrementalParser()
+    parser.feed('class Moo { value=1; ')
+    with pytest.raises(ParseError):
+        parser.close()
+
+
+def test_unterminated_string():
+    parser = IncrementalParser()
+    parser.feed('class Moo { value="abc')
+    with pytest.raises(ParseError, match=r'Got EOF'):
+        parser.close()
+
+
+def test_missing_semicolon_after_class():
+    parser = IncrementalParser()
+    with pytest.raises(ParseError):
+        parser.feed('class Moo { value=1; } value=2;')
@@ -0,0 +1,103 @@
+import pickle
+
+import pytest
+
+import armaclass
+from armaclass import parse, parse_rap, generate_rap, resolve, ConfigClass, IncrementalParser, LazyClass
+
+SOURCE = '''
+class CfgVehicles
+{
+    class Car
+    {
+        maxSpeed=100;
+        displayName="Car";
+        class Turrets { class MainTurret { gunnerName="Gunner"; }; };
+    };
+    class Offroad : car
+    {
+        displayName="Offroad";
+        class Turrets : Turrets
+        {
+            class MainTurret : MainTurret { optics=1; };
+        };
+    };
+    class Offroad_Armed : Offroad { maxSpeed=80; };
+    class Orphan : Missing {};
+    class LoopA : LoopB {};
+    class LoopB : LoopA {};
+};
+class CfgWeapons
+{
+    class Rifle;
+    class Special : Rifle { magazines[]={"30Rnd"}; };
+};
+'''
+
+
+def test_base_is_recorded():
+    result = parse(SOURCE)
+    assert isinstance(result['CfgVehicles']['Offroad'], ConfigClass)
+    assert result['CfgVehicles']['Offroad'].base == 'car'
+    assert type(result['CfgVehicles']['Car']) is dict
+    assert result['CfgVehicles']['Offroad'] == {
+        'displayName': 'Offroad',
+        'Turrets': {'MainTurret': {'optics': 1}},
+    }
+
+
+def test_base_is_recorded_by_every_reader():
+    lazy = parse(SOURCE, lazy=True)['CfgVehicles']
+    assert isinstance(lazy, LazyClass)
+    assert lazy['Offroad'].base == 'car'
+
+    incremental = IncrementalParser()
+    for i in range(0, len(SOURCE), 7):
+        incremental.feed(SOURCE[i:i + 7])
+    assert incremental.close()['CfgVehicles']['Offroad'].base == 'car'
+
+    assert parse_rap(generate_rap(parse(SOURCE)))['CfgVehicles']['Offroad_Armed'].base == 'Offroad'
+
+
+def test_generate_base():
+    generated = armaclass.generate(parse('class Moo : Foo { x=1; };'))
+    assert generated.startswith('class Moo: Foo\n')
+    assert parse(generated)['Moo'].base == 'Foo'
+
+
+def test_pickle():
+    data = parse(SOURCE)
+    assert pickle.loads(pickle.dumps(data))['CfgVehicles']['Offroad'].base == 'car'
+
+
+def test_resolved_values():
+    vehicles = resolve(parse(SOURCE))['CfgVehicles']
+    assert vehicles['Offroad_Armed']['maxSpeed'] == 80
+    assert vehicles['Offroad_Armed']['displayName'] == 'Offroad'
+    assert vehicles['offroad']['MAXSPEED'] == 100
+    assert vehicles['Offroad_Armed'].inherits_from('Car')
+    assert list(vehicles['Offroad_Armed']) == ['maxSpeed', 'displayName', 'Turrets']
+
+
+def test_resolved_nested_scopes():
+    turret = resolve(parse(SOURCE))['CfgVehicles']['Offroad_Armed']['Turrets']['MainTurret']
+    assert dict(turret) == {'optics': 1, 'gunnerName': 'Gunner'}
+
+
+def test_resolved_views_are_memoized():
+    vehicles = resolve(parse(SOURCE))['CfgVehicles']
+    assert vehicles['Offroad_Armed'].base_class is vehicles['Offroad']
+    assert vehicles['Offroad_Armed']['Turrets'] is vehicles['Offroad']['Turrets']
+
+
+@pytest.mark.parametrize('name', ['Orphan', 'LoopA'])
+def test_unresolvable_bases(name):
+    vehicle = resolve(parse(SOURCE))['CfgVehicles'][name]
+    assert vehicle.base_class is None
+    assert 'maxSpeed' not in vehicle
+
+
+def test_forward_declared_base():
+    special = resolve(parse(SOURCE))['CfgWeapons']['Special']
+    assert special.base_class.name == 'Rifle'
+    assert dict(special) == {'magazines': ['30Rnd']}
@@ -0,0 +1,70 @@
+from armaclass import parse, parse_rap, generate_rap, InternTable
+
+SOURCE = '''
+class CfgVehicles
+{
+    class Car { scope=2; model="\\a3\\car.p3d"; displayName=""; hidden=Yes; };
+    class Truck : Car { scope=2; model="\\a3\\car.p3d"; displayName=""; hidden=Yes; };
+};
+'''
+
+
+def test_shared_strings():
+    table = InternTable()
+    result = parse(SOURCE, intern=table)
+    car, truck = result['CfgVehicles']['Car'], result['CfgVehicles']['Truck']
+    assert result == parse(SOURCE)
+    for (car_key, car_value), (truck_key, truck_value) in zip(car.items(), truck.items()):
+        assert car_key is truck_key
+        if isinstance(car_value, str):
+            assert car_value is truck_value
+    assert 'Car' in table.strings
+
+
+def test_shared_between_calls():
+    table = InternTable()
+    first = parse(b'a = "same";', intern=table)
+    second = parse('a = "same";', intern=table)
+    assert first['a'] is second['a']
+    assert list(first)[0] is list(second)[0]
+
+
+def test_long_values_not_interned():
+    table = InternTable(max_length=3)
+    parse('a = "long value"; b[] = {"abc"};', intern=table)
+    assert 'long value' not in table.strings
+    assert 'abc' in table.strings
+
+
+def test_lazy():
+    table = InternTable()
+    result = parse('class A { value = "x"; };', lazy=True, intern=table)
+    assert result['A']['value'] is table.strings['x']
+
+
+def test_rap():
+    table = InternTable()
+    data = generate_rap(parse(SOURCE))
+    result = parse_rap(data, intern=table)
+    assert result == parse(SOURCE)
+    car, truck = result['CfgVehicles']['Car'], result['CfgVehicles']['Truck']
+    assert car['model'] is truck['model']
+    assert truck.base is table.strings['Car']
+
+
+def test_intern_all():
+    table = InternTable()
+    result = parse(SOURCE)
+    assert table.intern_all(result) == parse(SOURCE)
+    car, truck = result['CfgVehicles']['Car'], result['CfgVehicles']['Truck']
+    assert car['model'] is truck['model']
+    assert list(car)[0] is list(truck)[0]
+    assert list(result['CfgVehicles']) == ['Car', 'Truck']
+
+
+def test_parallel(tmp_path):
+    source = 'class A {' + ''.join('class C{} {{ v = "x"; }};'.format(i) for i in range(2000)) + '};'
+    table = InternTable()
+    result = parse(source, workers=2, intern=table)
+    assert result == parse(source)
+    assert result['A']['C0']['v'] is result['A']['C1999']['v']
@@ -0,0 +1,88 @@
+import io
+
+import pytest
+
+from armaclass import parse, iterparse, ParseError
+
+SOURCE = '''\
+version=12;
+class Mission : MissionBase
+{
+    // class Commented {};
+    name="Zażółć ""gęślą"" jaźń";
+    position[]={1, 2.5, {"nested"}};
+    class Empty;
+    class Entities { items=0; };
+};
+'''
+
+EXPECTED_EVENTS = [
+    ('property', 'version', 12),
+    ('start_class', 'Mission', 'MissionBase'),
+    ('property', 'name', 'Zażółć "gęślą" jaźń'),
+    ('array_start', 'position'),
+    ('array_item', 1),
+    ('array_item', 2.5),
+    ('array_item', ['nested']),
+    ('array_end', 'position'),
+    ('start_class', 'Empty', None),
+    ('end_class', 'Empty'),
+    ('start_class', 'Entities', None),
+    ('property', 'items', 0),
+    ('end_class', 'Entities'),
+    ('end_class', 'Mission'),
+]
+
+
+def _build(events):
+    stack = [{}]
+    for event in events:
+        if event[0] == 'start_class':
+            stack[-1][event[1]] = {}
+            stack.append(stack[-1][event[1]])
+        elif event[0] == 'end_class':
+            stack.pop()
+        elif event[0] == 'property':
+            stack[-1][event[1]] = event[2]
+        elif event[0] == 'array_start':
+            array = []
+        elif event[0] == 'array_item':
+            array.append(event[1])
+        elif event[0] == 'array_end':
+            stack[-1][event[1]] = array
+    return stack[0]
+
+
+def test_events():
+    assert list(iterparse(SOURCE)) == EXPECTED_EVENTS
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 1 << 20])
+def test_events_bytes(chunk_size):
+    assert list(iterparse(SOURCE.encode('utf8'), chunk_size=chunk_size)) == EXPECTED_EVENTS
+
+
+def test_events_file_object():
+    assert list(iterparse(io.BytesIO(SOURCE.encode('utf8')), chunk_size=5)) == EXPECTED_EVENTS
+
+
+def test_events_path(tmp_path):
+    path = tmp_path / 'mission.sqm'
+    path.write_bytes(SOURCE.encode('utf8'))
+    assert list(iterparse(path)) == EXPECTED_EVENTS
+
+
+def test_events_rebuild_parse_result():
+    assert _build(iterparse(SOURCE, chunk_size=7)) == parse(SOURCE)
+
+
+def test_events_are_lazy():
+    events = iterparse('x=1;\nclass Moo { y=2; };\n}', chunk_size=5)
+    assert next(events) == ('property', 'x', 1)
+    with pytest.raises(ParseError):
+        list(events)
+
+
+def test_unterminated_class():
+    with pytest.raises(ParseError, match=r'Got EOF'):
+        list(iterparse('class Moo { x=1;'))
@@ -0,0 +1,82 @@
+import pytest
+
+import armaclass
+from armaclass import parse, parse_file, LazyClass, ParseError
+
+SOURCE = '''
+version=12;
+class Moo : Foo
+{
+    name="Moo } {";
+    // };
+    class Nested { values[]={1, 2}; };
+};
+class Broken { x y; };
+'''
+
+
+def test_classes_are_not_parsed_upfront():
+    result = parse(SOURCE, lazy=True)
+    assert result['version'] == 12
+    assert isinstance(result['Moo'], LazyClass)
+    assert not result['Moo'].loaded
+    assert SOURCE[slice(*result['Moo'].span)].startswith('{')
+    assert SOURCE[slice(*result['Moo'].span)].endswith('}')
+
+
+def test_class_is_parsed_on_access():
+    moo = parse(SOURCE, lazy=True)['Moo']
+    assert moo['name'] == 'Moo } {'
+    assert moo.loaded
+    assert isinstance(moo['Nested'], LazyClass)
+    assert moo['Nested']['values'] == [1, 2]
+    assert list(moo) == ['name', 'Nested']
+    assert len(moo) == 2
+    assert 'name' in moo
+
+
+def test_errors_are_raised_on_access():
+    result = parse(SOURCE, lazy=True)
+    with pytest.raises(ParseError):
+        result['Broken']['x']
+
+
+def test_lazy_result_compares_equal():
+    source = SOURCE.replace('class Broken { x y; };', '')
+    assert parse(source, lazy=True) == parse(source)
+
+
+def test_lazy_parse_file(tmp_path):
+    path = tmp_path / 'config.cpp'
+    path.write_bytes('class Moo { name="Zażółć"; };'.encode('utf8'))
+    result = parse_file(path, lazy=True)
+    assert result['Moo']['name'] == 'Zażółć'
+
+
+def test_lazy_generate():
+    source = 'class Moo\n{\n    value=1;\n};'
+    assert armaclass.generate(parse(source, lazy=True)).strip() == source
+
+
+def test_lazy_and_select_are_exclusive():
+    with pytest.raises(ValueError):
+        parse(SOURCE, lazy=True, select=['Moo'])
+
+
+class SearchedBytes(bytearray):
+    # Records how many bytes are searched for the start of a comment
+    searched = 0
+
+    def find(self, sub, start=None, end=None):
+        if sub == b'/':
+            SearchedBytes.searched += (len(self) if end is None else end) - start
+        return super().find(sub, start, end)
+
+
+def test_loading_does_not_search_the_rest_of_the_source():
+    source = SearchedBytes(b''.join(b'class C%d { a=%d; };\n' % (i, i) for i in range(1000)) + b'// end\n')
+    result = parse(source, lazy=True)
+    SearchedBytes.searched = 0
+    assert [value['a'] for value in result.values()] == list(range(1000))
+    # Each class only searches its own body, instead of everything up to the end of the source
+    assert SearchedBytes.searched < 2 * len(source)
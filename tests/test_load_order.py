@@ -0,0 +1,73 @@
+import pytest
+
+from armaclass import generate_rap, parse, read_required_addons, resolve_load_order
+
+
+def write(tmp_path, name, patches, body=''):
+    source = 'class CfgPatches {\n'
+    for patch, required in patches.items():
+        source += '    class {} {{ units[]={{}}; requiredAddons[]={{{}}}; }};\n'.format(
+            patch, ', '.join('"{}"'.format(addon) for addon in required))
+    source += '};\n' + body
+    path = tmp_path / name
+    path.write_text(source)
+    return str(path)
+
+
+def test_read_required_addons(tmp_path):
+    path = write(tmp_path, 'a.cpp', {'A': ['B', 'C'], 'A_extra': []},
+                 'class CfgVehicles { class Car { requiredAddons[]={"ignored"}; }; };')
+    assert read_required_addons(path) == {'A': ['B', 'C'], 'A_extra': []}
+
+
+def test_read_required_addons_rap(tmp_path):
+    path = tmp_path / 'config.bin'
+    path.write_bytes(generate_rap(parse('class CfgPatches { class A { requiredAddons[]={"B"}; }; };')))
+    assert read_required_addons(str(path)) == {'A': ['B']}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_order(tmp_path, workers):
+    c = write(tmp_path, 'c.cpp', {'C': ['b', 'A']})
+    a = write(tmp_path, 'a.cpp', {'A': []})
+    d = write(tmp_path, 'd.cpp', {'D': []})
+    b = write(tmp_path, 'b.cpp', {'B': ['A']})
+
+    result = resolve_load_order([c, a, d, b], workers=workers)
+    assert result.order == [a, d, b, c]
+    assert result.addons == {'C': c, 'A': a, 'D': d, 'B': b}
+    assert result.requirements == {c: ['b', 'A'], b: ['A']}
+    assert result.missing == {}
+    assert result.cycles == []
+
+
+def test_missing_and_own_addons(tmp_path):
+    a = write(tmp_path, 'a.cpp', {'A': ['cba_main'], 'A_sub': ['A', 'ace_main']})
+    result = resolve_load_order([a], workers=1)
+    assert result.order == [a]
+    assert result.missing == {'A': ['cba_main'], 'A_sub': ['ace_main']}
+    assert result.requirements == {}
+
+
+def test_cycles(tmp_path):
+    a = write(tmp_path, 'a.cpp', {'A': ['C']})
+    b = write(tmp_path, 'b.cpp', {'B': []})
+    c = write(tmp_path, 'c.cpp', {'C': ['D']})
+    d = write(tmp_path, 'd.cpp', {'D': ['A']})
+    e = write(tmp_path, 'e.cpp', {'E': ['A']})
+
+    result = resolve_load_order([a, b, c, d, e], workers=1)
+    assert result.cycles == [[a, c, d]]
+    assert result.order == [a, c, d, b, e]
+
+
+def test_dependents_of_cycles(tmp_path):
+    e = write(tmp_path, 'e.cpp', {'E': ['A']})
+    a = write(tmp_path, 'a.cpp', {'A': ['C']})
+    c = write(tmp_path, 'c.cpp', {'C': ['A']})
+    f = write(tmp_path, 'f.cpp', {'F': ['B']})
+    b = write(tmp_path, 'b.cpp', {'B': ['E']})
+
+    result = resolve_load_order([e, a, c, f, b], workers=1)
+    assert result.cycles == [[a, c]]
+    assert result.order == [a, c, e, b, f]
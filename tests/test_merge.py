@@ -0,0 +1,143 @@
+import struct
+
+import pytest
+
+from armaclass import merge, parse, generate_rap, ConfigClass, ConfigMerger, ParseError
+
+BASE = '''
+class CfgPatches { class A3_Data { units[]={}; }; };
+class CfgVehicles
+{
+    class Car { maxSpeed=100; sounds[]={"engine"}; class Turrets { class MainTurret {}; }; };
+    class Truck : Car { maxSpeed=80; };
+    class Tank { armor=500; };
+};
+'''
+
+
+def test_class_extension():
+    result = merge(BASE, 'class CfgVehicles { class car { maxSpeed=120; fuel=50; }; };')
+    assert result['CfgVehicles']['Car'] == {
+        'maxSpeed': 120,
+        'sounds': ['engine'],
+        'Turrets': {'MainTurret': {}},
+        'fuel': 50,
+    }
+    assert list(result['CfgVehicles']) == ['Car', 'Truck', 'Tank']
+
+
+def test_delete():
+    result = merge(BASE, 'class CfgVehicles { delete Tank; class Car { class Turrets { delete maINTurret; }; }; };')
+    assert list(result['CfgVehicles']) == ['Car', 'Truck']
+    assert result['CfgVehicles']['Car']['Turrets'] == {}
+
+
+def test_removed_classes_are_not_indexed():
+    merger = ConfigMerger()
+    merger.apply(BASE)
+    merger.apply('class CfgVehicles { class Car { class Turrets { class MainTurret { x=1; }; }; }; class Tank {}; };')
+    vehicles = merger.config['CfgVehicles']
+    car, turrets, tank = vehicles['Car'], vehicles['Car']['Turrets'], vehicles['Tank']
+    assert {id(car), id(turrets), id(tank)} <= set(merger._indexes)
+
+    merger.apply('class CfgVehicles { delete car; tank = 1; };')
+    assert not {id(car), id(turrets), id(tank)} & set(merger._indexes)
+    assert vehicles == {'Truck': {'maxSpeed': 80}, 'Tank': 1}
+
+    merger.apply('class CfgVehicles { class Truck { class Sub {}; }; };')
+    truck = vehicles['Truck']
+    merger.apply('class CfgVehicles { Truck[] += {1}; };')
+    assert id(truck) not in merger._indexes
+
+    classes = [merger.config]
+    for data in classes:
+        classes.extend(value for value in data.values() if isinstance(value, dict))
+    assert set(merger._indexes) == set(map(id, classes))
+
+
+def test_array_append():
+    result = merge(BASE,
+                   'class CfgVehicles { class Car { sounds[] += {"horn"}; }; class Tank { tracks[] += {1}; }; };',
+                   'class CfgVehicles { class Car { sounds[] += {"brakes"}; }; };')
+    assert result['CfgVehicles']['Car']['sounds'] == ['engine', 'horn', 'brakes']
+    assert result['CfgVehicles']['Tank']['tracks'] == [1]
+
+
+def test_array_append_does_not_modify_patches():
+    patch = parse('class CfgVehicles { class Bike { wheels[]={1}; }; };')
+    result = merge(BASE, patch, 'class CfgVehicles { class Bike { wheels[] += {2}; }; };')
+    assert result['CfgVehicles']['Bike']['wheels'] == [1, 2]
+    assert patch['CfgVehicles']['Bike']['wheels'] == [1]
+
+
+def test_extern_does_not_override():
+    result = merge(BASE, 'class CfgVehicles { class Car; class Bike; class Truck : Car { seats=2; }; };')
+    assert result['CfgVehicles']['Car']['maxSpeed'] == 100
+    assert result['CfgVehicles']['Bike'] == {}
+    assert result['CfgVehicles']['Truck'] == {'maxSpeed': 80, 'seats': 2}
+
+
+def test_rebase():
+    result = merge(BASE, 'class CfgVehicles { class Tank : Car {}; };')
+    assert isinstance(result['CfgVehicles']['Tank'], ConfigClass)
+    assert result['CfgVehicles']['Tank'].base == 'Car'
+    assert result['CfgVehicles']['Tank'] == {'armor': 500}
+
+
+def test_delete_then_redefine():
+    result = merge(BASE, 'class CfgVehicles { delete Car; class Car { maxSpeed=10; }; };')
+    assert result['CfgVehicles']['Car'] == {'maxSpeed': 10}
+
+
+def test_parsed_base_is_updated_in_place():
+    base = parse(BASE)
+    assert merge(base, 'version=2;') is base
+    assert base['version'] == 2
+
+
+def test_merger_files(tmp_path):
+    first = tmp_path / 'first.cpp'
+    first.write_text(BASE)
+    second = tmp_path / 'second.bin'
+    second.write_bytes(generate_rap({'CfgVehicles': {'Car': {'maxSpeed': 130}}}))
+
+    merger = ConfigMerger()
+    merger.apply_file(first)
+    merger.apply_file(second)
+    assert merger.config['CfgVehicles']['Car']['maxSpeed'] == 130
+    assert merger.config['CfgVehicles']['Car']['sounds'] == ['engine']
+
+
+def rap_patch():
+    # class CfgVehicles { delete Tank; class Truck; class Car { sounds[] += {"horn"}; }; };
+    def body(*entries):
+        return b'\0' + bytes([len(entries)]) + b''.join(entries)
+
+    car = body(b'\x05' + struct.pack('<I', 1) + b'sounds\0' + b'\x01' + b'\x00horn\0')
+
+    def vehicles(car_offset):
+        return body(b'\x04Tank\0', b'\x03Truck\0', b'\x00Car\0' + struct.pack('<I', car_offset))
+
+    root_size = len(body(b'\x00CfgVehicles\0' + struct.pack('<I', 0)))
+    vehicles_offset = 16 + root_size
+    car_offset = vehicles_offset + len(vehicles(0))
+    root = body(b'\x00CfgVehicles\0' + struct.pack('<I', vehicles_offset))
+    return b'\0raP' + struct.pack('<III', 0, 8, 0) + root + vehicles(car_offset) + car
+
+
+def test_rap_patch(tmp_path):
+    result = merge(BASE, rap_patch())
+    assert 'Tank' not in result['CfgVehicles']
+    assert result['CfgVehicles']['Truck'] == {'maxSpeed': 80}
+    assert result['CfgVehicles']['Car']['sounds'] == ['engine', 'horn']
+
+    path = tmp_path / 'patch.bin'
+    path.write_bytes(rap_patch())
+    merger = ConfigMerger()
+    merger.apply(BASE)
+    assert merger.apply_file(path) == result
+
+
+def test_patch_errors():
+    with pytest.raises(ParseError):
+        merge(BASE, 'class CfgVehicles { delete; };')
@@ -0,0 +1,88 @@
+from array import array
+
+import pytest
+
+from armaclass import generate, generate_rap, merge, parse, parse_file, parse_rap
+
+SOURCE = '''
+class Item0
+{
+    position[] = {1.5, -2.25, 3.0e0, .5, 2.};
+    ids[]={1, -2, +3, 007, };
+    mixed[] = {1, 2.5};
+    nested[] = {{1, 2}, {0.5}};
+    big[] = {1234567890123456789, 1};
+    rounded[] = {12345678901234567, 0.5};
+    other[] = {1, "2", 3};
+    names[] = {1e5, 2};
+    hex[] = {0x10};
+    bools[] = {true, false};
+    comment[] = {1, /* two */ 2};
+    empty[] = {};
+};
+'''
+
+
+def test_packed_arrays():
+    result = parse(SOURCE, numeric_arrays='array')['Item0']
+    assert result['position'] == array('d', [1.5, -2.25, 3.0, 0.5, 2.0])
+    assert result['ids'] == array('q', [1, -2, 3, 7])
+    assert result['mixed'] == array('d', [1.0, 2.5])
+    assert result['nested'] == [array('q', [1, 2]), array('d', [0.5])]
+
+
+def test_other_arrays_are_lists():
+    result = parse(SOURCE, numeric_arrays='array')['Item0']
+    expected = parse(SOURCE)['Item0']
+    for name in ['big', 'rounded', 'other', 'names', 'hex', 'bools', 'comment', 'empty']:
+        assert type(result[name]) is list
+        assert result[name] == expected[name]
+
+
+def as_lists(value):
+    return [as_lists(item) for item in value] if isinstance(value, (list, array)) else value
+
+
+def test_same_values_as_lists():
+    for source in [SOURCE, SOURCE.encode('utf8'), SOURCE + 's="\U0001F600";']:
+        packed = parse(source, numeric_arrays='array')['Item0']
+        for name, value in parse(source)['Item0'].items():
+            assert as_lists(packed[name]) == value
+
+
+def test_generate():
+    result = parse(SOURCE, numeric_arrays='array')
+    assert parse(generate(result)) == parse(generate(parse(SOURCE)))
+
+
+def test_generate_rap():
+    result = parse(SOURCE, numeric_arrays='array')
+    assert parse_rap(generate_rap(result)) == parse_rap(generate_rap(parse(SOURCE)))
+
+
+def test_merge_append():
+    result = merge(parse(SOURCE, numeric_arrays='array'), 'class Item0 { ids[] += {5}; };')
+    assert result['Item0']['ids'] == [1, -2, 3, 7, 5]
+
+
+def test_numpy():
+    numpy = pytest.importorskip('numpy')
+    result = parse(SOURCE, numeric_arrays='numpy')['Item0']
+    assert isinstance(result['position'], numpy.ndarray)
+    assert result['position'].dtype == numpy.float64
+    assert result['ids'].tolist() == [1, -2, 3, 7]
+
+
+def test_files(tmp_path):
+    path = tmp_path / 'mission.sqm'
+    path.write_text(SOURCE)
+    assert parse_file(path, numeric_arrays='array')['Item0']['ids'] == array('q', [1, -2, 3, 7])
+
+
+def test_unsupported():
+    with pytest.raises(ValueError):
+        parse(SOURCE, numeric_arrays='list')
+    with pytest.raises(ValueError):
+        parse(SOURCE, lazy=True, numeric_arrays='array')
+    with pytest.raises(ValueError):
+        parse(SOURCE, positions=True, numeric_arrays='array')
@@ -0,0 +1,59 @@
+import pytest
+
+from armaclass import parse, parse_file, ParseError
+from armaclass import parallel
+
+SOURCE = '''
+version=12;
+class Big : Base
+{
+    name="Big } {";
+    // };
+    class Nested { values[]={1, 2}; };
+    value=1;
+};
+class Other { x=1; };
+value=2;
+class Big { value=3; };
+'''
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(parallel, 'MIN_CHUNK_SIZE', 1)
+
+
+def test_parallel_equals_parse(small_chunks):
+    result = parse(SOURCE, workers=2)
+    assert result == parse(SOURCE)
+    assert list(result) == list(parse(SOURCE))
+
+
+def test_parallel_bytes_and_files(small_chunks, tmp_path):
+    path = tmp_path / 'config.cpp'
+    path.write_bytes(SOURCE.encode('utf8'))
+    assert parse(SOURCE.encode('utf8'), workers=2) == parse(SOURCE)
+    assert parse_file(path, workers=2) == parse(SOURCE)
+
+
+def test_parallel_select(small_chunks):
+    assert parse(SOURCE, workers=2, select=['*/value']) == parse(SOURCE, select=['*/value'])
+
+
+def test_parallel_reports_errors_like_parse(small_chunks):
+    source = SOURCE + 'class Broken { x y; };'
+    with pytest.raises(ParseError) as expected:
+        parse(source)
+    with pytest.raises(ParseError) as error:
+        parse(source, workers=2)
+    assert str(error.value) == str(expected.value)
+
+
+def test_parallel_stray_brace(small_chunks):
+    with pytest.raises(ParseError):
+        parse(SOURCE + '};', workers=2)
+
+
+def test_parallel_and_lazy_are_exclusive():
+    with pytest.raises(ValueError):
+        parse(SOURCE, lazy=True, workers=2)
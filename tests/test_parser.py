@@ -154,6 +154,12 @@ def test_slash_asterisk_comments():
     assert parse('class Moo { /* foo comment*/};') == {'Moo': {}}
 
 
+def test_comment_markers_in_strings_and_adjacent_comments():
+    assert parse('x="//not a comment";/* a */ /* b */') == {'x': '//not a comment'}
+    assert parse('x="/*";\n// y=1;\n  // z=2;\nw=3;') == {'x': '/*', 'w': 3}
+    assert parse('class Moo {\n/**/\n//*/\nx=1;};') == {'Moo': {'x': 1}}
+
+
 def test_multiline_comments():
     expected = {
         'testClass': {'values': [0, 1]}
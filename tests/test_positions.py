@@ -0,0 +1,89 @@
+import pytest
+
+from armaclass import parse, parse_file, generate_rap, SourcePositions
+
+SOURCE = '''version = 12;
+class CfgVehicles
+{
+    // A comment
+    class Car : Base
+    {
+        maxSpeed = 100;
+        sounds[] = {"engine", {1, 2 }, 3 };
+    };
+    delete Old;
+    class Extern;
+};
+'''
+
+
+def test_spans():
+    result, positions = parse(SOURCE, positions=True)
+    assert result == parse(SOURCE)
+    assert isinstance(positions, SourcePositions)
+
+    def text(path):
+        start, end = positions.span(path)
+        return SOURCE[start:end]
+
+    assert text('version') == 'version = 12;'
+    assert text('CfgVehicles/Car/maxSpeed') == 'maxSpeed = 100;'
+    assert text('CfgVehicles/Car').startswith('class Car : Base\n')
+    assert text('CfgVehicles/Car').endswith('};')
+    assert text('CfgVehicles').endswith('class Extern;\n};')
+    assert text('CfgVehicles/Extern') == 'class Extern;'
+    assert text('CfgVehicles/Car/sounds') == 'sounds[] = {"engine", {1, 2 }, 3 };'
+    assert text('CfgVehicles/Car/sounds/0') == '"engine"'
+    assert text('CfgVehicles/Car/sounds/1') == '{1, 2 }'
+    assert text(['CfgVehicles', 'Car', 'sounds', 1, 1]) == '2'
+    assert text('CfgVehicles/Car/sounds/2') == '3'
+
+
+def test_entries():
+    _, positions = parse(SOURCE, positions=True)
+    assert len(positions) == 11
+    assert positions.names[:4] == ['version', 'CfgVehicles', 'Car', 'maxSpeed']
+    assert list(positions.parents[:4]) == [-1, -1, 1, 2]
+    assert 'Old' not in positions.names
+
+
+def test_lines_and_columns():
+    _, positions = parse(SOURCE, positions=True)
+    assert positions.location('version') == (1, 1)
+    assert positions.location('cfgvehicles/car') == (5, 5)
+    assert positions.location('CfgVehicles/Car/sounds/1/0') == (8, 32)
+    assert positions.line_column(len(SOURCE)) == (13, 1)
+    with pytest.raises(KeyError):
+        positions.find('CfgVehicles/Missing')
+
+
+def test_redefinition():
+    _, positions = parse('a = 1;\nA = 2;', positions=True)
+    assert positions.location('a') == (2, 1)
+
+
+def test_select():
+    result, positions = parse(SOURCE, select=['CfgVehicles/*/maxSpeed'], positions=True)
+    assert result == {'CfgVehicles': {'Car': {'maxSpeed': 100}}}
+    assert positions.names == ['CfgVehicles', 'Car', 'maxSpeed']
+    assert positions.location('CfgVehicles/Car/maxSpeed') == (7, 9)
+
+
+def test_files(tmp_path):
+    path = tmp_path / 'config.cpp'
+    path.write_text('a = "é";\nb = 2;', encoding='utf-8')
+    _, positions = parse_file(path, positions=True)
+    assert positions.span('b') == (10, 16)  # In bytes
+    assert positions.location('b') == (2, 1)
+
+    path.write_bytes(generate_rap({'a': 1}))
+    with pytest.raises(ValueError):
+        parse_file(path, positions=True)
+
+
+def test_off_by_default():
+    assert parse(SOURCE) == parse(SOURCE, positions=True)[0]
+    with pytest.raises(ValueError):
+        parse(SOURCE, lazy=True, positions=True)
+    with pytest.raises(ValueError):
+        parse(SOURCE, container='compact', positions=True)
@@ -0,0 +1,103 @@
+import pytest
+
+from armaclass import preprocess, Preprocessor, ParseError
+
+
+def test_object_macros():
+    assert preprocess('#define SPEED 100\nmaxSpeed = SPEED;') == '\nmaxSpeed = 100;'
+    assert preprocess('#define A B\n#define B 1\nx = A;') == '\n\nx = 1;'
+
+
+def test_no_expansion_in_strings():
+    assert preprocess('#define X 1\na = "X"; b = X; c = "a ""X"" b";') == '\na = "X"; b = 1; c = "a ""X"" b";'
+
+
+def test_function_macros():
+    source = '''#define QUOTE(var) #var
+#define DOUBLES(a,b) a##_##b
+#define ADDON my_addon
+#define GVAR(var) DOUBLES(ADDON,var)
+#define EMPTY() nothing
+a = QUOTE(GVAR(speed));
+b = GVAR(speed);
+c = EMPTY();
+d = QUOTE;
+'''
+    assert preprocess(source) == '\n\n\n\n\na = "my_addon_speed";\nb = my_addon_speed;\nc = nothing;\nd = QUOTE;\n'
+
+
+def test_multiline_call_and_continuation():
+    source = '#define SUM(a, b) {a, \\\n  b}\nx[] = SUM(1,\n  (2, 3));\n'
+    assert preprocess(source) == '\n\nx[] = {1,   (2, 3)};\n'
+
+
+def test_recursive_macro():
+    assert preprocess('#define X X + 1\na = X;') == '\na = X + 1;'
+
+
+def test_conditionals():
+    source = '''#define DEBUG
+#ifdef DEBUG
+a = 1;
+#ifndef DEBUG
+b = 2;
+#else
+c = 3;
+#endif
+#else
+d = 4;
+#pragma whatever
+#endif
+#undef DEBUG
+#ifdef DEBUG
+e = 5;
+#endif
+#if 0
+f = 6;
+#endif
+'''
+    assert preprocess(source).split() == ['a', '=', '1;', 'c', '=', '3;']
+
+
+def test_comments():
+    source = 'a = "//X"; // X\n/* X\n */ b = X;\n'
+    assert preprocess(source, defines={'X': '1'}) == 'a = "//X"; \n\n b = 1;\n'
+
+
+@pytest.mark.parametrize('source, message', [
+    ('#ifdef X\n', 'Unterminated #if'),
+    ('#endif\n', '#endif without #if'),
+    ('#pragma foo\n', 'Unknown preprocessor directive: #pragma foo'),
+    ('#define F(a, b) a\nF(1);', 'Macro F expects 2 arguments, got 1'),
+    ('#define F(a) a\nF(1', 'Unterminated macro call'),
+    ('#include "missing.hpp"\n', 'Included file not found: missing.hpp'),
+])
+def test_errors(source, message):
+    with pytest.raises(ParseError, match=message):
+        preprocess(source)
+
+
+def test_includes(tmp_path):
+    (tmp_path / 'x' / 'cba').mkdir(parents=True)
+    (tmp_path / 'x' / 'cba' / 'macros.hpp').write_text('#define QUOTE(var) #var\n')
+    (tmp_path / 'addon').mkdir()
+    (tmp_path / 'addon' / 'script_component.hpp').write_text(
+        '#define COMPONENT main\n#include "\\x\\cba\\macros.hpp"\n')
+    config = tmp_path / 'addon' / 'config.cpp'
+    config.write_text('#include "script_component.hpp"\nclass CfgPatches { class COMPONENT { name = QUOTE(COMPONENT); }; };\n')
+
+    preprocessor = Preprocessor(include_paths=[tmp_path])
+    assert preprocessor.parse_file(config) == {'CfgPatches': {'main': {'name': 'main'}}}
+
+    # Included files are only read once
+    (tmp_path / 'x' / 'cba' / 'macros.hpp').write_text('')
+    assert preprocessor.parse_file(config) == {'CfgPatches': {'main': {'name': 'main'}}}
+
+
+def test_streaming_parse():
+    source = '#define ITEM(n) class Item##n { value = n; };\n' + ''.join('ITEM({})\n'.format(i) for i in range(5000))
+    preprocessor = Preprocessor()
+    assert len(list(preprocessor.iter_preprocess(source))) > 1
+    result = preprocessor.parse(source)
+    assert len(result) == 5000
+    assert result['Item4999'] == {'value': 4999}
@@ -0,0 +1,133 @@
+import struct
+
+import pytest
+
+from armaclass import parse, parse_file, parse_rap, ParseError
+
+
+def asciiz(s):
+    return s.encode('utf8') + b'\0'
+
+
+def compressed(n):
+    result = b''
+    while n >= 0x80:
+        result += bytes([n & 0x7f | 0x80])
+        n >>= 7
+    return result + bytes([n])
+
+
+def array(items):
+    return compressed(len(items)) + b''.join(items)
+
+
+def build_rap():
+    # class Vehicle : Base { ... }; placed right after the root class body
+    vehicle = (
+        asciiz('Base') + compressed(4)
+        + b'\x01\x00' + asciiz('displayName') + asciiz('Car ""1""')
+        + b'\x01\x01' + asciiz('speed') + struct.pack('<f', 0.1)
+        + b'\x02' + asciiz('values') + array([
+            b'\x02' + struct.pack('<i', -5),
+            b'\x06' + struct.pack('<q', 1 << 40),
+            b'\x03' + array([b'\x00' + asciiz('nested')]),
+            b'\x04' + asciiz('true'),
+        ])
+        + b'\x05' + struct.pack('<I', 1) + asciiz('extra') + array([b'\x01' + struct.pack('<f', 2.5)])
+    )
+
+    def root(vehicle_offset):
+        return (
+            asciiz('') + compressed(6)
+            + b'\x01\x02' + asciiz('version') + struct.pack('<i', 12)
+            + b'\x03' + asciiz('Base')
+            + b'\x00' + asciiz('Vehicle') + struct.pack('<I', vehicle_offset)
+            + b'\x04' + asciiz('Deleted')
+            + b'\x01\x00' + asciiz('title') + asciiz('$STR_title')
+            + b'\x01\x04' + asciiz('flag') + asciiz('false')
+        )
+
+    vehicle_offset = 16 + len(root(0))
+    enum_offset = vehicle_offset + len(vehicle)
+    header = b'\0raP' + struct.pack('<III', 0, 8, enum_offset)
+    return header + root(vehicle_offset) + vehicle + struct.pack('<I', 0)
+
+
+EXPECTED = {
+    'version': 12,
+    'Base': {},
+    'Vehicle': {
+        'displayName': 'Car ""1""',
+        'speed': 0.1,
+        'values': [-5, 1 << 40, ['nested'], True],
+        'extra': [2.5],
+    },
+    'title': '$STR_title',
+    'flag': False,
+}
+
+
+def test_parse_rap():
+    assert parse_rap(build_rap()) == EXPECTED
+
+
+def test_parse_rap_translations():
+    assert parse_rap(build_rap(), translations={'STR_title': 'Title'})['title'] == 'Title'
+
+
+def test_parse_rap_select():
+    assert parse_rap(build_rap(), select=['Vehicle/speed', 'version']) == {
+        'version': 12,
+        'Vehicle': {'speed': 0.1},
+    }
+
+
+def test_parse_rap_matches_text_parser():
+    text = 'version=12;class Base;class Vehicle : Base { speed=0.1; values[]={-5, true}; };delete Deleted;'
+    rap = build_rap()
+    assert parse(text)['Vehicle']['speed'] == parse_rap(rap)['Vehicle']['speed']
+    assert parse(text)['Vehicle']['values'][-1] == parse_rap(rap)['Vehicle']['values'][-1]
+
+
+def test_parse_file_detects_rap(tmp_path):
+    path = tmp_path / 'config.bin'
+    path.write_bytes(build_rap())
+    assert parse_file(path) == EXPECTED
+
+
+@pytest.mark.parametrize('data', [b'class Moo {};', b'\0raP', build_rap()[:40]])
+def test_invalid_rap(data):
+    with pytest.raises(ParseError):
+        parse_rap(data)
+
+
+def class_chain(count, target=None):
+    # Root class with one subclass, nested count times, each body right after its parent's.
+    # The last subclass points at target instead when it is given
+    body_size = len(asciiz('') + compressed(1) + b'\x00' + asciiz('C') + struct.pack('<I', 0))
+    offsets = [16 + body_size * (i + 1) for i in range(count)]
+    if target is not None:
+        offsets[-1] = target
+    bodies = [asciiz('') + compressed(1) + b'\x00' + asciiz('C') + struct.pack('<I', offset) for offset in offsets]
+    return b'\0raP' + struct.pack('<III', 0, 8, 0) + b''.join(bodies) + asciiz('') + compressed(0)
+
+
+def test_nested_classes():
+    result = parse_rap(class_chain(100))
+    for _ in range(100):
+        result = result['C']
+    assert result == {}
+
+
+@pytest.mark.parametrize('data', [
+    class_chain(1000),
+    # Subclasses whose body is their parent's or their own
+    class_chain(1, 16),
+    class_chain(2, 25),
+    # Arrays nested too deep
+    b'\0raP' + struct.pack('<III', 0, 8, 0) + asciiz('') + compressed(1) + b'\x02' + asciiz('a')
+    + (compressed(1) + b'\x03') * 1000 + compressed(0),
+])
+def test_corrupt_nesting(data):
+    with pytest.raises(ParseError):
+        parse_rap(data)
@@ -0,0 +1,82 @@
+import io
+import math
+import struct
+
+import pytest
+
+from armaclass import generate_rap, parse, parse_file, parse_rap
+
+DATA = {
+    'version': 12,
+    'Moo': {
+        'name': 'Zażółć "gęślą" jaźń',
+        'speed': 0.5,
+        'rounded': 2.0,
+        'big': 1 << 40,
+        'enabled': True,
+        'values': [1, -2.25, 'three', False, [4, ['five']]],
+        'Nested': {'Empty': {}},
+        'After': 'nested',
+    },
+    'Other': {'x': -1},
+}
+
+
+def test_roundtrip():
+    expected = parse(
+        'version=12;'
+        'class Moo { name="Zażółć ""gęślą"" jaźń"; speed=0.5; rounded=2; big=1099511627776; enabled=true;'
+        '  values[]={1, -2.25, "three", false, {4, {"five"}}}; class Nested { class Empty {}; }; After="nested"; };'
+        'class Other { x=-1; };'
+    )
+    assert parse_rap(generate_rap(DATA)) == expected
+
+
+def test_layout():
+    data = generate_rap(DATA)
+    assert data[:4] == b'\0raP'
+    assert struct.unpack_from('<II', data, 4) == (0, 8)
+    enum_offset = struct.unpack_from('<I', data, 12)[0]
+    assert enum_offset == len(data) - 4
+    assert data[enum_offset:] == b'\0\0\0\0'
+
+
+def test_stream_to_file(tmp_path):
+    path = tmp_path / 'config.bin'
+    with open(path, 'wb') as f:
+        assert generate_rap(DATA, f) is None
+    assert path.read_bytes() == generate_rap(DATA)
+    assert parse_file(path) == parse_rap(generate_rap(DATA))
+
+
+def test_many_entries():
+    data = {'Class{}'.format(i): {'value': i, 'Sub': {'text': str(i)}} for i in range(200)}
+    fp = io.BytesIO()
+    generate_rap(data, fp)
+    assert parse_rap(fp.getvalue()) == data
+
+
+def test_numbers_out_of_range():
+    data = {
+        'integral': 1e20,
+        'big': 12345678901234567890123,
+        'int64': -2**63,
+        'below': -2**63 - 1,
+        'infinite': float('inf'),
+        'nan': float('nan'),
+        'huge': -1e300,
+        'values': [2.0, 1e300, 2**70, float('-inf')],
+    }
+    result = parse_rap(generate_rap(data))
+    assert math.isnan(result.pop('nan'))
+    del data['nan']
+    assert result == data
+    assert [type(value) for value in result.values()] == [float, int, int, int, float, float, list]
+    assert [type(value) for value in result['values']] == [float, float, int, float]
+
+
+def test_invalid_values():
+    with pytest.raises(ValueError):
+        generate_rap({'text': 'a\0b'})
+    with pytest.raises(Exception, match='handle item type'):
+        generate_rap({'value': None})
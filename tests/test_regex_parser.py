@@ -0,0 +1,99 @@
+import mmap
+import re
+
+import pytest
+
+import armaclass
+from armaclass import parse, InternTable, ParseError
+from armaclass import parser, regex_parser
+from armaclass.parser import Parser
+from armaclass.regex_parser import RegexParser
+
+
+def same(a, b):
+    # 1 == 1.0 == True, compare the types too
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return getattr(a, 'base', None) == getattr(b, 'base', None) and list(a) == list(b) and \
+            all(same(value, b[name]) for name, value in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(same, a, b))
+    return a == b
+
+
+SOURCES = [
+    'version=12;\n\nclass Moo  {\r\n value = 1; };',
+    'class A: B { x[] += {1, 2.5, -3, 0x1F, true, False, 1e5, text}; y[]={}; z[]={1,}; };',
+    'a="x""y" \\n "z";\nb[]={"a", {1, {}}, $STR_a, " "" \\n "};\nc=$STR_missing ;',
+    'a = 1 2 ;\nb = x /* ; */;\nc[]={1 /* a, b */};\nd=;\ne[]={,};',
+    '/* header */ class /*c*/ A /*c*/ : /*c*/ B /*c*/ { /*c*/ }; // end',
+    'a[] /*c*/ = /*c*/ {/*c*/ 1, //c\n 2 /*c*/ };\nb= //c\n "s" ;\n/*/ a=2; */',
+    'delete A;\nimport B;\nclass C;\nclass D: C;\nclass E {\n\tdelete F; class G { a=1; }; };',
+    'a="s"/*c*/;',
+    'a[]={"a" "b"};',
+    'class A { a=1; ',
+    'a=1',
+    '}',
+    'a=1;\nclass A { +=x; b[]={"é"}; };\nclass B: A { c=$STR_a; +=;',
+]
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_same_as_parser(source):
+    translations = {'STR_a': 'translated'}
+    try:
+        expected = Parser().parse(source, translations)
+    except ParseError as e:
+        with pytest.raises(ParseError, match=re.escape(str(e))):
+            RegexParser().parse(source, translations)
+    else:
+        assert same(RegexParser().parse(source, translations), expected)
+        assert same(RegexParser().parse(source.encode('utf8'), translations), expected)
+        assert same(RegexParser().parse(bytearray(source.encode('utf8')), translations), expected)
+
+
+def test_unsupported_statements_are_handed_over(monkeypatch, tmp_path):
+    starts = []
+
+    class RecordingParser(Parser):
+        def parse(self, *args, **kwargs):
+            raise AssertionError('The whole input is parsed again')
+
+        def parseStatementAt(self, context, start):
+            starts.append(start)
+            return super().parseStatementAt(context, start)
+
+    source = 'a=1;\nclass A { b="é"; +=x; class C {}; };\n+= //c\n y;\nd[]={"é", 2};'
+    expected = Parser().parse(source, None)
+    monkeypatch.setattr(regex_parser, 'Parser', RecordingParser)
+    assert same(RegexParser().parse(source, None), expected)
+    assert starts == [source.index('+=x'), source.index('+= //c')]
+
+    # Positions are offsets in the encoded input
+    starts.clear()
+    path = tmp_path / 'config.cpp'
+    path.write_bytes(source.encode('utf8'))
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source_map:
+        assert same(RegexParser().parse(source_map, None), expected)
+    encoded = source.encode('utf8')
+    assert starts == [encoded.index(b'+=x'), encoded.index(b'+= //c')]
+
+
+def test_options():
+    source = 'class Cfg { name="Some name"; class Sub: Base { text = t; }; };'
+    interned, expected_interned = InternTable(8), InternTable(8)
+    result = RegexParser().parse(source, None, interned, True)
+    expected = Parser().parse(source, None, None, False, False, expected_interned, True)
+    assert same(result, expected)
+    assert result['CFG']['sub']['TEXT'] == 't'
+    assert sorted(interned.strings) == sorted(expected_interned.strings)
+    assert result['Cfg']['Sub'].base is interned.strings['Base']
+
+
+def test_backend():
+    compiled = not parser.__file__.endswith('.py')
+    assert armaclass.backend == ('cython' if compiled else 'regex')
+    # Options that only Parser supports work with both backends
+    assert parse('a[]={1};', numeric_arrays='array')['a'].tolist() == [1]
+    assert parse('a=1;', positions=True)[1].span('a') == (0, 4)
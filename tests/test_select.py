@@ -0,0 +1,75 @@
+import pytest
+
+from armaclass import parse, ParseError
+
+SOURCE = '''
+version=12;
+class CfgVehicles
+{
+    class Car;
+    class Offroad : Car
+    {
+        scope=2;
+        displayName="Offroad";
+        class Turrets { class MainTurret { gunnerName="Gunner; {not a brace}"; }; };
+        hiddenSelections[]={"camo", "camo2"};
+    };
+    class Truck : Car
+    {
+        // displayName="Commented out";
+        /* scope=1; } */
+        armor=150;
+    };
+};
+class CfgWeapons
+{
+    class Rifle { displayName="Rifle"; magazines[]={"30Rnd"}; };
+};
+'''
+
+
+def test_select_property_of_every_class():
+    expected = {
+        'CfgVehicles': {
+            'Offroad': {'scope': 2, 'displayName': 'Offroad'},
+        }
+    }
+    assert parse(SOURCE, select=['CfgVehicles/*/displayName', 'CfgVehicles/*/scope']) == expected
+
+
+def test_select_whole_subtree():
+    full = parse(SOURCE)
+    assert parse(SOURCE, select=['CfgWeapons']) == {'CfgWeapons': full['CfgWeapons']}
+    assert parse(SOURCE, select='CfgWeapons/**') == {'CfgWeapons': full['CfgWeapons']}
+
+
+def test_select_recursive_wildcard():
+    expected = {
+        'CfgVehicles': {'Offroad': {'Turrets': {'MainTurret': {'gunnerName': 'Gunner; {not a brace}'}}}}
+    }
+    assert parse(SOURCE, select=['**/gunnerName']) == expected
+
+
+def test_select_is_case_insensitive_and_globs():
+    expected = {
+        'CfgVehicles': {'Offroad': {'hiddenSelections': ['camo', 'camo2']}},
+        'CfgWeapons': {'Rifle': {'displayName': 'Rifle'}},
+    }
+    assert parse(SOURCE, select=['cfg*/*/HIDDENSELECTIONS', 'cfgweapons/rifle/displayname']) == expected
+
+
+def test_select_forward_declaration():
+    assert parse(SOURCE, select=['CfgVehicles/Car']) == {'CfgVehicles': {'Car': {}}}
+
+
+def test_select_top_level_property():
+    assert parse(SOURCE, select=['version']) == {'version': 12}
+
+
+def test_select_nothing():
+    assert parse(SOURCE, select=[]) == {}
+
+
+def test_skipped_class_must_be_terminated():
+    with pytest.raises(ParseError):
+        parse('class Foo { x="}"; ', select=['Bar'])
@@ -0,0 +1,142 @@
+import pickle
+
+import pytest
+
+from armaclass import generate, parse, parse_file, ArrayNode, ClassNode, ConfigClass, ConfigTree, InternTable
+
+SOURCE = '''
+version = 12;
+class CfgVehicles
+{
+    class Car
+    {
+        maxSpeed = 100.5;
+        name = "Offroad ""4x4""";
+        big = 4294967296;
+        huge = 99999999999999999999;
+        enabled = true;
+        sounds[] = {"engine", {1, 2}, {}};
+        class Turrets {};
+    };
+    class Truck : Car { maxSpeed = 80; name = "Offroad ""4x4"""; };
+};
+'''
+
+
+@pytest.fixture
+def tree():
+    return parse(SOURCE, container='compact')
+
+
+def test_equal_to_dicts(tree):
+    assert isinstance(tree, ConfigTree)
+    assert tree == parse(SOURCE)
+    assert tree.to_dict() == parse(SOURCE)
+    assert tree.to_dict()['CfgVehicles']['Truck'].base == 'Car'
+
+
+def test_mapping_api(tree):
+    car = tree['CfgVehicles']['Car']
+    assert isinstance(car, ClassNode)
+    assert list(car) == ['maxSpeed', 'name', 'big', 'huge', 'enabled', 'sounds', 'Turrets']
+    assert len(car) == 7
+    assert car['maxSpeed'] == 100.5
+    assert car['name'] == 'Offroad "4x4"'
+    assert car['big'] == 4294967296
+    assert car['huge'] == 99999999999999999999
+    assert car['enabled'] is True
+    assert 'name' in car
+    assert 'missing' not in car
+    assert car.get('missing') is None
+    with pytest.raises(KeyError):
+        car['missing']
+    assert dict(tree['CfgVehicles']['Truck'].items()) == {'maxSpeed': 80, 'name': 'Offroad "4x4"'}
+    assert list(tree.values())[0] == 12
+
+
+def test_cursor(tree):
+    truck = tree['CfgVehicles']['Truck']
+    assert truck.key == 'Truck'
+    assert truck.base == 'Car'
+    assert truck.parent.key == 'CfgVehicles'
+    assert truck.parent.parent is tree
+    assert tree.parent is None
+    assert tree.key is None
+
+
+def test_arrays(tree):
+    sounds = tree['CfgVehicles']['Car']['sounds']
+    assert isinstance(sounds, ArrayNode)
+    assert len(sounds) == 3
+    assert sounds[0] == 'engine'
+    assert sounds[-2] == [1, 2]
+    assert sounds[1:] == [[1, 2], []]
+    assert sounds.to_list() == ['engine', [1, 2], []]
+    assert sounds.parent.key == 'Car'
+    assert sounds[1][-1] == 2
+    assert sounds[2] == []
+    assert tree['CfgVehicles']['Car']['sounds'][1][0] == 1
+    with pytest.raises(IndexError):
+        sounds[3]
+    with pytest.raises(IndexError):
+        sounds[-4]
+
+
+def test_big_class_lookup():
+    source = 'class A {' + ''.join('class C{} {{ v = {}; }};'.format(i, i) for i in range(100)) + '};'
+    tree = parse(source, container='compact')
+    assert tree['A']['C99']['v'] == 99
+    assert tree['A']['C0']['v'] == 0
+    assert 'C100' not in tree['A']
+
+
+def test_pickle(tree):
+    restored = pickle.loads(pickle.dumps(tree))
+    assert restored == tree
+    assert restored['CfgVehicles']['Truck'].base == 'Car'
+    truck = pickle.loads(pickle.dumps(tree['CfgVehicles']['Truck']))
+    assert truck == {'maxSpeed': 80, 'name': 'Offroad "4x4"'}
+
+
+def test_from_dict():
+    data = {'a': 1, 'b': ConfigClass({'c': [1.5, 'x']}, base='a')}
+    tree = ConfigTree.from_dict(data)
+    assert tree == data
+    assert tree['b'].base == 'a'
+
+
+def test_parse_file(tmp_path):
+    path = tmp_path / 'config.cpp'
+    path.write_text(SOURCE)
+    assert parse_file(path, container='compact') == parse(SOURCE)
+    assert parse_file(path, container='compact', select=['CfgVehicles/Truck']) == {
+        'CfgVehicles': {'Truck': {'maxSpeed': 80, 'name': 'Offroad "4x4"'}}}
+
+
+def test_generate(tree):
+    assert generate(tree) == generate(parse(SOURCE))
+
+
+@pytest.mark.parametrize('chunk_size', [1 << 20, 3])
+def test_repeated_names(chunk_size):
+    source = ('a=1; class B {}; class B { x=1; }; c[]={1, {2}}; a=2;\n'
+              'class D { class E { y=1; }; z=1; class E { y=2; w[]={3}; }; }; a=3;')
+    expected = parse(source)
+    for tree in (ConfigTree.from_source(source, chunk_size=chunk_size), ConfigTree.from_dict(expected)):
+        assert list(tree) == list(expected) == ['a', 'B', 'c', 'D']
+        assert len(tree) == 4
+        assert tree['a'] == 3
+        assert list(tree['D']) == ['E', 'z']
+        assert tree['D']['E'] == {'y': 2, 'w': [3]}
+        assert tree['c'][1] == [2]
+        assert tree.to_dict() == expected
+        assert list(tree.items()) == list(ConfigTree.from_dict(expected).items())
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        parse(SOURCE, container='compact', lazy=True)
+    with pytest.raises(ValueError):
+        parse(SOURCE, container='compact', intern=InternTable())
+    with pytest.raises(ValueError):
+        parse(SOURCE, container='list')
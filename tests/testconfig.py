@@ -93,7 +93,8 @@ def compare_dicts_equal(model, current, path=''):
         if isinstance(val_current, bytes):
             val_current = val_current.decode('utf-8')
 
-        if type(val_model) != type(val_current):
+        # Classes with a base are parsed as ConfigClass, a dict subclass
+        if type(val_model) != type(val_current) and not (type(val_model) == dict and isinstance(val_current, dict)):
             error = f'type({path}.{key_current}) == {type(val_current)} instead of {type(val_model)}'
             raise ValueError(error)
 
@@ -113,7 +114,7 @@ def compare_lists_equal(model, current, path=''):
         if isinstance(item_current, bytes):
             item_current = item_current.decode('utf-8')
 
-        if type(item_model) != type(item_current):
+        if type(item_model) != type(item_current) and not (type(item_model) == dict and isinstance(item_current, dict)):
             error = f'type({path}[{i}]) == {type(item_current)} instead of {type(item_model)}'
             raise ValueError(error)
 